@@ -15,9 +15,12 @@ from commands.parse_extremists import run_extremists_parse
 from commands.parse_inagents_cmd import get_parse_inagents_module
 from commands.update_inagents_cmd import run_update_inagents
 from models import Inagent, User, Role
+from services.enum import WordsListKey
+from services.fulltext_search.batch_declension import BatchDeclension
 from services.parser_feds_fm import ParserFedsFM
 from services.task.task import Task, _datetime_display_moscow
 from services.task.tasks import Tasks
+from services.words_list.phrase_list_index import PhraseListIndex
 from models.extremists_terrorists import (
     EXTREMIST_AREA_LABELS,
     EXTREMIST_TYPE_LABELS,
@@ -170,6 +173,7 @@ def _form_apply_extremist(form, et: ExtremistTerrorist) -> None:
     texts = form.getlist("search_terms_text")
     types = form.getlist("search_terms_type")
     et.search_terms = _search_terms_from_form(texts, types)
+    BatchDeclension().prepare_search_terms(et.search_terms)
 
 
 def _extremists_terrorists_count() -> int:
@@ -321,6 +325,7 @@ class WordsListView(BaseView):
                 return redirect(url_for(".index"))
             et.raw_source = new_text
             db.session.commit()
+            PhraseListIndex.invalidate(WordsListKey.EXTREMISTS_TERRORISTS)
             flash("Запись сохранена.")
             return redirect(url_for(".index"))
         list_record = ListRecord.query.filter_by(slug=self.list_slug).first()
@@ -345,6 +350,7 @@ class WordsListView(BaseView):
                 return redirect(url_for(".index"))
             db.session.delete(et)
             db.session.commit()
+            PhraseListIndex.invalidate(WordsListKey.EXTREMISTS_TERRORISTS)
             flash("Запись удалена из списка.")
             return redirect(url_for(".index"))
         list_record = ListRecord.query.filter_by(slug=self.list_slug).first()
@@ -377,6 +383,7 @@ class WordsListView(BaseView):
         et = ExtremistTerrorist.query.get_or_404(id)
         _form_apply_extremist(request.form, et)
         db.session.commit()
+        PhraseListIndex.invalidate(WordsListKey.EXTREMISTS_TERRORISTS)
         if request.headers.get("X-Requested-With") == "XMLHttpRequest":
             return jsonify(success=True)
         flash("Запись сохранена.")
@@ -473,6 +480,7 @@ def _form_apply_search_terms_only(form, inagent: Inagent) -> None:
     texts = form.getlist("search_terms_text")
     types = form.getlist("search_terms_type")
     inagent.search_terms = _search_terms_from_form(texts, types)
+    BatchDeclension().prepare_search_terms(inagent.search_terms)
 
 
 class InagentsListView(BaseView):
@@ -592,6 +600,7 @@ class InagentsListView(BaseView):
         inagent = Inagent.query.get_or_404(id)
         _form_apply_search_terms_only(request.form, inagent)
         db.session.commit()
+        PhraseListIndex.invalidate(WordsListKey.INAGENTS)
         if request.headers.get("X-Requested-With") == "XMLHttpRequest":
             return jsonify(success=True)
         flash("Иноагент сохранён.")
@@ -659,6 +668,7 @@ def form_to_inagent(form, inagent: Inagent) -> None:
     texts = form.getlist("search_terms_text")
     types = form.getlist("search_terms_type")
     inagent.search_terms = _search_terms_from_form(texts, types)
+    BatchDeclension().prepare_search_terms(inagent.search_terms)
 
 
 def _parse_date(s: str | None):
@@ -4,6 +4,7 @@ from extensions import db
 from models.phrase_list.list_phrase import ListPhrase
 from models.phrase_list.list_record import ListRecord
 from models.phrase_list.phrase_record import PhraseRecord
+from services.words_list.phrase_list_index import PhraseListIndex
 
 TABLE_PHRASES_LIMIT: int = 1000
 
@@ -108,6 +109,7 @@ def import_phrases_from_lines(list_record: ListRecord, lines: list[str]) -> int:
             added += 1
 
     db.session.commit()
+    PhraseListIndex.invalidate(list_record.name)
 
     return added
 
@@ -130,6 +132,7 @@ def minusate_phrases_from_lines(list_record: ListRecord, lines: list[str]) -> in
             db.session.delete(link)
             removed += 1
     db.session.commit()
+    PhraseListIndex.invalidate(list_record.name)
     return removed
 
 
@@ -152,6 +155,9 @@ def update_phrase_in_list(list_record: ListRecord, phrase_id: int, new_text: str
         return "Фраза не найдена"
     phrase_record.phrase = new_text
     db.session.commit()
+    # phrase record is shared by every list it is linked to
+    for linked in ListPhrase.query.filter_by(phrase_id=phrase_id).all():
+        PhraseListIndex.invalidate(linked.list_record.name)
     return None
 
 
@@ -161,6 +167,7 @@ def remove_phrase_from_list(list_record: ListRecord, phrase_id: int) -> bool:
         return False
     db.session.delete(link)
     db.session.commit()
+    PhraseListIndex.invalidate(list_record.name)
     return True
 
 
@@ -14,7 +14,7 @@ from services.words_list.list_colors import DEFAULT_LIST_COLOR_HEX
 class ResultsController:
     _EXCLUDED_TEMPLATE_KEYS = {
         'task_id', 'word_stats_sorted', 'phrase_stats_sorted', '_task_id_ref',
-        'word_stats', 'phrase_stats', 'stats'
+        'word_stats', 'phrase_stats', 'stats', 'render_params'
     }
 
     @staticmethod
@@ -1,10 +1,11 @@
 import os
 import shutil
+import threading
 import time
 import uuid
 import json
 from datetime import datetime, timezone
-from typing import List
+from typing import List, Optional
 
 from utils.decorators import require_query_params
 
@@ -23,7 +24,7 @@ from services.task.result import TaskResult
 
 from flask import (
     request, redirect, url_for, Blueprint, current_app, render_template,
-    session, send_file, jsonify, flash, get_flashed_messages
+    session, send_file, jsonify, flash, get_flashed_messages, make_response
 )
 
 from services.highlight_upload import (
@@ -33,6 +34,7 @@ from services.pymorphy_service import (
     reset_caches
 )
 from services.analysis.analyser_pdf import AnalyserPdf
+from services.analysis.render_plan import RenderPlan
 from services.words_list import ListFromText, ListFromTextExclude
 from .redis_tasks import get_redis_tasks_client as _get_redis_client
 
@@ -40,6 +42,72 @@ from .redis_tasks import get_redis_tasks_client as _get_redis_client
 highlight_bp = Blueprint('highlight', __name__, template_folder='templates')
 
 _EXECUTOR_FUTURES_REGISTRY = {}
+# deferred render jobs by task id, removed when done
+_RENDER_FUTURES_REGISTRY = {}
+_RENDER_FUTURES_LOCK = threading.Lock()
+_RENDER_RETRY_SECONDS = 3
+
+
+def _analyse_document(
+        source_path: str,
+        task_id: str,
+        output_path: Optional[str],
+        progress_task_id: Optional[str],
+        is_docx_source,
+        perform_ocr,
+        selected_list_keys: List[str],
+        inagents_fiz_search_text: bool = True,
+        inagents_fiz_search_surnames: bool = True,
+        inagents_fiz_search_full_names: bool = True,
+        render_plan_path: Optional[str] = None,
+):
+    """
+    Searches the document with the task lists; highlights it and saves to output_path when given.
+    The highlights are saved to render_plan_path when given, for _render_document.
+    """
+    analyse_data = AnalysisData()
+    analyse_data.load_user_list(task_id=task_id)
+
+    if selected_list_keys:
+        analyse_data.load_predefined_lists(
+            selected_list_keys,
+            inagents_fiz_search_text=inagents_fiz_search_text,
+            inagents_fiz_search_surnames=inagents_fiz_search_surnames,
+            inagents_fiz_search_full_names=inagents_fiz_search_full_names,
+        )
+
+    analyse_data.apply_exclude_user_list(task_id)
+    highlight: bool = output_path is not None
+
+    if is_docx_source:
+        analyser = AnalyserDocx(source_path)
+        analyser.set_analyse_data(analyse_data)
+        analysis_results = analyser.analyse_and_highlight(task_id=progress_task_id, highlight=highlight)
+    else:
+        analyser = AnalyserPdf(source_path)
+        analyser.set_analyse_data(analyse_data)
+        analysis_results = analyser.analyse_and_highlight(
+            task_id=progress_task_id, use_ocr=perform_ocr, highlight=highlight,
+        )
+
+    if highlight:
+        analyser.save(output_path)
+
+    if render_plan_path is not None:
+        analyser.render_plan.save(render_plan_path)
+
+    return analysis_results
+
+
+def _render_document(source_path: str, output_path: str, render_plan_path: str, is_docx_source) -> None:
+    """Highlights the document by a render plan of _analyse_document, without searching, and saves it."""
+    if is_docx_source:
+        analyser = AnalyserDocx(source_path)
+    else:
+        analyser = AnalyserPdf(source_path)
+
+    analyser.render(RenderPlan.load(render_plan_path))
+    analyser.save(output_path)
 
 
 def _perform_highlight_processing(
@@ -93,6 +161,9 @@ def _perform_highlight_processing(
 
     output_path = None
     final_status_for_redis = TaskStatus.COMPLETED
+    # highlights for the deferred render, a companion of the source archive
+    render_plan_filename: str = f"source_{task_id}.render.json"
+    render_plan_path: str | None = os.path.join(RESULT_DIR, render_plan_filename) if RESULT_DIR else None
 
     try:
         reset_caches()
@@ -102,29 +173,24 @@ def _perform_highlight_processing(
         # [start] perform analyze
         # analysis_results -- структура вроде {'word_stats': {'word': {'c': 1, 'f': {'word': 1}}}, 'phrase_stats': {}, 'total_matches': 1}
 
-        analyse_data = AnalysisData()
-        analyse_data.load_user_list(task_id=task_id)
-
-        if selected_list_keys:
-            analyse_data.load_predefined_lists(
-                selected_list_keys,
-                inagents_fiz_search_text=inagents_fiz_search_text,
-                inagents_fiz_search_surnames=inagents_fiz_search_surnames,
-                inagents_fiz_search_full_names=inagents_fiz_search_full_names,
-            )
-
-        analyse_data.apply_exclude_user_list(task_id)
-
-        if is_docx_source:
-            analyser = AnalyserDocx(source_path)
-            analyser.set_analyse_data(analyse_data)
-            analysis_results = analyser.analyse_and_highlight(task_id=task_id)
-            analyser.save(output_path)
-        else:
-            analyser = AnalyserPdf(source_path)
-            analyser.set_analyse_data(analyse_data)
-            analysis_results = analyser.analyse_and_highlight(task_id=task_id, use_ocr=perform_ocr)
-            analyser.save(output_path)
+        # deferred: only search now, the result file is rendered from the source archive on first download
+        deferred_render: bool = bool(app_config_dict.get('HIGHLIGHT_DEFERRED_RENDER'))
+        search_params = {
+            'is_docx_source': is_docx_source,
+            'perform_ocr': perform_ocr,
+            'selected_list_keys': selected_list_keys,
+            'inagents_fiz_search_text': inagents_fiz_search_text,
+            'inagents_fiz_search_surnames': inagents_fiz_search_surnames,
+            'inagents_fiz_search_full_names': inagents_fiz_search_full_names,
+        }
+        analysis_results = _analyse_document(
+            source_path,
+            task_id,
+            output_path=None if deferred_render else output_path,
+            progress_task_id=task_id,
+            render_plan_path=render_plan_path if deferred_render else None,
+            **search_params,
+        )
 
         if analysis_results is None:
             task_result_data['error'] = 'Ошибка анализа документа (сервис анализа вернул None).'
@@ -132,7 +198,14 @@ def _perform_highlight_processing(
 
         # [end]
 
-        if os.path.exists(output_path) and os.path.isfile(output_path):
+        if deferred_render:
+            task_result_data['result_filename'] = result_filename_task
+            task_result_data['render_pending'] = True
+            task_result_data['render_params'] = {
+                'is_docx_source': is_docx_source,
+                'render_plan_filename': render_plan_filename,
+            }
+        elif os.path.exists(output_path) and os.path.isfile(output_path):
             task_result_data['result_filename'] = result_filename_task
 
         task_result_data.update(analysis_results)
@@ -157,6 +230,17 @@ def _perform_highlight_processing(
             except OSError as e_copy:
                 logger.warning(f"[Task {task_id}] Failed to archive source to '{archive_path}': {e_copy}")
 
+        # deferred render needs the source archive
+        if task_result_data.get('render_pending') and (task_result_data.get('error') or not source_archived_filename):
+            task_result_data['render_pending'] = False
+            task_result_data['result_filename'] = None
+
+        if not task_result_data.get('render_pending') and render_plan_path and os.path.exists(render_plan_path):
+            try:
+                os.remove(render_plan_path)
+            except Exception as e_del:
+                logger.warning(f"[Task {task_id}] Failed to delete render plan '{render_plan_path}': {e_del}")
+
         if redis_client:
             try:
                 status_message = "Обработка успешно завершена." if not task_result_data.get('error') else task_result_data.get(
@@ -212,6 +296,99 @@ def _perform_highlight_processing(
     return task_result_data
 
 
+def _perform_highlight_render(task_id: str, result_dir: str) -> None:
+    """
+    Second phase of a deferred task: highlights the source archive by the render plan
+    of the search phase and saves the result file. Lists are not searched again, so the
+    file shows exactly the matches of the stored stats.
+    """
+    logger = current_app.logger
+    task_result_data = TaskResult.load(task_id)
+
+    if not task_result_data or not task_result_data.get('render_pending'):
+        return
+
+    render_params: dict = task_result_data.get('render_params', {})
+    result_filename: str = task_result_data['result_filename']
+    file_ext: str = os.path.splitext(result_filename)[1]
+    source_path: str = os.path.join(result_dir, f"source_{task_id}{file_ext}")
+    # tasks searched before render plans were stored have none and fail to render
+    render_plan_path: str = os.path.join(result_dir, render_params.get('render_plan_filename', ''))
+    output_path: str = os.path.join(result_dir, result_filename)
+    # saved aside and moved in place: a download never gets a partially written file
+    render_path: str = f"{output_path}.{uuid.uuid4().hex}.part"
+    start_time_render = time.time()
+
+    try:
+        _render_document(source_path, render_path, render_plan_path, render_params.get('is_docx_source'))
+        os.replace(render_path, output_path)
+        task_result_data['render_time'] = round(time.time() - start_time_render, 2)
+    except Exception as e:
+        logger.error(f"[Task {task_id}] Error during deferred render: {e}", exc_info=True)
+        task_result_data['result_filename'] = None
+        task_result_data['render_error'] = f'Не удалось подготовить документ: {str(e)}'
+
+        if os.path.exists(render_path):
+            try:
+                os.remove(render_path)
+            except Exception as e_del:
+                logger.warning(f"[Task {task_id}] Failed to delete render file '{render_path}': {e_del}")
+
+    task_result_data['render_pending'] = False
+    TaskResult.save(task_id, task_result_data)
+
+    if os.path.isfile(render_plan_path):
+        try:
+            os.remove(render_plan_path)
+        except Exception as e_del:
+            logger.warning(f"[Task {task_id}] Failed to delete render plan '{render_plan_path}': {e_del}")
+
+
+def _forget_deferred_render(task_id: str) -> None:
+    with _RENDER_FUTURES_LOCK:
+        _RENDER_FUTURES_REGISTRY.pop(task_id, None)
+
+
+def _start_deferred_render(filename: str, result_dir: str) -> bool:
+    """
+    Starts rendering of a deferred task result, once per task.
+
+    Returns:
+        True while the file is being rendered
+    """
+    if not filename.startswith("highlighted_"):
+        return False
+
+    task_id: str = os.path.splitext(filename)[0][len("highlighted_"):]
+
+    # concurrent downloads of one task must not start two jobs
+    with _RENDER_FUTURES_LOCK:
+        if task_id in _RENDER_FUTURES_REGISTRY:
+            return True
+
+        task_result_data = TaskResult.load(task_id)
+
+        if not task_result_data or not task_result_data.get('render_pending'):
+            return False
+
+        if task_result_data.get('result_filename') != filename:
+            return False
+
+        executor = current_app.extensions.get('executor')
+
+        if not executor:
+            current_app.logger.critical(f"[Task {task_id}] Executor not found in current_app.extensions!")
+            return False
+
+        future = executor.submit(_perform_highlight_render, task_id, result_dir)
+        _RENDER_FUTURES_REGISTRY[task_id] = future
+
+    # outside of the lock: a job that is already done runs the callback right here
+    future.add_done_callback(lambda _: _forget_deferred_render(task_id))
+
+    return True
+
+
 @highlight_bp.route('/')
 def index():
     session.pop('last_task_id_highlight', None)
@@ -339,6 +516,7 @@ def process_async():
         app_config_dict = {
             'RESULT_DIR_HIGHLIGHT': current_app.config.get('RESULT_DIR_HIGHLIGHT'),
             'RESULT_DIR': current_app.config.get('RESULT_DIR'),
+            'HIGHLIGHT_DEFERRED_RENDER': current_app.config.get('HIGHLIGHT_DEFERRED_RENDER', False),
         }
 
         future = executor.submit(
@@ -511,6 +689,11 @@ def download_result(filename):
 
     if os.path.exists(filepath_abs) and os.path.isfile(filepath_abs):
         return send_file(filepath_abs, as_attachment=True)
+    elif _start_deferred_render(filename, RESULT_DIR):
+        # the page reloads itself until the file is rendered
+        response = make_response("Документ подготавливается, скачивание начнётся автоматически...", 202)
+        response.headers['Refresh'] = str(_RENDER_RETRY_SECONDS)
+        return response
     else:
         logger.error(f"Download failed: File not found at {filepath_abs}")
         # Optionally, redirect to an error page or back to results with a message
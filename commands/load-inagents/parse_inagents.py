@@ -10,7 +10,10 @@ from typing import Any, Optional, Union
 from flask import current_app
 
 from models.inagents import AGENT_TYPE_MAP
+from services.fulltext_search.batch_declension import BatchDeclension
 from services.parser.parser import Parser
+from services.enum import WordsListKey
+from services.words_list.phrase_list_index import PhraseListIndex
 from services.words_list.search_term import SearchTerm, EType
 
 with warnings.catch_warnings():
@@ -192,6 +195,7 @@ class InagentsXlsxParser(Parser):
         """Upsert rows: by registry_number update existing or insert. Returns (inserted, updated). Requires Flask app context."""
         inserted: int = 0
         updated: int = 0
+        written_search_terms: list[dict] = []
 
         for row in rows:
             registry_number = row.get("registry_number")
@@ -208,14 +212,18 @@ class InagentsXlsxParser(Parser):
 
                 if inagent.search_terms is None or len(inagent.search_terms) == 0:
                     inagent.search_terms = self._parse_search_terms(inagent.full_name)
+                    written_search_terms.extend(inagent.search_terms)
 
                 updated += 1
             else:
                 payload["search_terms"] = self._parse_search_terms(payload["full_name"])
+                written_search_terms.extend(payload["search_terms"])
                 db.session.add(Inagent(**payload))
                 inserted += 1
 
         db.session.commit()
+        BatchDeclension().prepare_search_terms(written_search_terms)
+        PhraseListIndex.invalidate(WordsListKey.INAGENTS)
 
         self._last_inserted = inserted
         self._last_updated = updated
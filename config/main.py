@@ -2,6 +2,11 @@ import os
 
 # Redis TTL for highlight task hashes and related keys (seconds). Default: 7 days.
 _HIGHLIGHT_TASK_REDIS_TTL_DEFAULT: int = 7 * 24 * 60 * 60
+_EXECUTOR_MAX_WORKERS_DEFAULT: int = 5
+
+
+def get_executor_max_workers() -> int:
+    return int(os.environ.get("EXECUTOR_MAX_WORKERS", _EXECUTOR_MAX_WORKERS_DEFAULT))
 
 
 def get_config(base_dir: str) -> dict:
@@ -12,7 +17,9 @@ def get_config(base_dir: str) -> dict:
             else _HIGHLIGHT_TASK_REDIS_TTL_DEFAULT
         ),
         "EXECUTOR_TYPE": os.environ.get("EXECUTOR_TYPE", "thread"),
-        "EXECUTOR_MAX_WORKERS": int(os.environ.get("EXECUTOR_MAX_WORKERS", 5)),
+        "EXECUTOR_MAX_WORKERS": get_executor_max_workers(),
+        # highlight tasks only search; the highlighted file is rendered on first download
+        "HIGHLIGHT_DEFERRED_RENDER": os.environ.get("HIGHLIGHT_DEFERRED_RENDER", "false").lower() == "true",
         "UPLOAD_DIR": os.path.join(base_dir, "uploads"),
         "RESULT_DIR": os.path.join(base_dir, "results"),
         "PREDEFINED_LISTS_DIR": os.path.join(base_dir, "predefined_lists"),
@@ -1,7 +1,9 @@
-from typing import List, Tuple, TYPE_CHECKING, Union
+from typing import Dict, List, Tuple, TYPE_CHECKING, Union
 
 from services.analysis.analysis_match import AnalysisMatch, AnalysisMatchKind
+from services.analysis.render_plan import RenderPlan
 from services.analysis.stats.match_serializer import matches_to_dict_list
+from services.fulltext_search.phrase import Phrase
 from services.fulltext_search.search_match import FTSRegexMatch, FTSTextMatch
 from services.utils.color import Color
 from services.words_list import WordsList
@@ -14,9 +16,12 @@ DEFAULT_HEX_HIGHLIGHT: str = "#00ff00"
 
 class Analyser:
     analyse_data: 'AnalysisData'
+    # highlights of the last analysis, render() applies them to a fresh copy of the source
+    render_plan: RenderPlan
 
     def __init__(self) -> None:
         self._default_color: Color = Color(DEFAULT_HEX_HIGHLIGHT)
+        self.render_plan = RenderPlan()
 
     def get_highlight_color_pdf(self) -> Tuple[float, float, float]:
         return self._default_color.rgb()
@@ -39,6 +44,7 @@ class Analyser:
         Convert FTSMatch results to AnalysisMatch results.
         """
         analyser_matches: List[AnalysisMatch] = []
+        Analyser._attach_models(fts_matches)
 
         # Create lookup dict for O(1) phrase access by text instead of O(n) list search
         for fts_match in fts_matches:
@@ -67,6 +73,21 @@ class Analyser:
 
         return analyser_matches
 
+    @staticmethod
+    def _attach_models(fts_matches: List[Union[FTSTextMatch, FTSRegexMatch]]) -> None:
+        """Load models of matched phrases with one query per list instead of one per phrase."""
+        phrases_by_list: Dict[int, List[Phrase]] = {}
+        lists: Dict[int, WordsList] = {}
+
+        for fts_match in fts_matches:
+            if isinstance(fts_match, FTSTextMatch) and fts_match.search_phrase.model_id is not None:
+                source_list: WordsList = fts_match.search_phrase.source_list
+                lists[id(source_list)] = source_list
+                phrases_by_list.setdefault(id(source_list), []).append(fts_match.search_phrase)
+
+        for list_id, phrases in phrases_by_list.items():
+            lists[list_id].attach_models(phrases)
+
     def _get_stats_result(self, matches: List[AnalysisMatch]) -> dict:
         return {
             'matches': matches_to_dict_list(matches),
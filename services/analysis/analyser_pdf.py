@@ -1,19 +1,24 @@
 import re
+from bisect import bisect_right
 import pymupdf
 
-from typing import List, Optional, Tuple, Dict
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from services.analysis import AnalysisMatch
 from services.analysis.analyser import Analyser
 from services.fulltext_search.phrase import Phrase
 from services.progress.combined_progress.combined_progress import CombinedProgress
 from services.progress.combined_progress.process_particle import ProgressParticle
-from services.tokenization import Token
+from services.tokenization import Token, TokenSequence, TokenStream
 from services.tokenization.tokenizer import Tokenizer
 from services.fulltext_search.fulltext_search import FulltextSearch, SearchStrategy
+from services.utils.interval import Interval, group_overlapping
 from services.utils.timeit import timeit
 from services.analysis.pdf.pua_map import PuaMap, logger
 from services.analysis.pdf.page_analyser import PageAnalyser
+from services.analysis.pdf.page_collector import PageCollector
+from services.analysis.annot_content import get_annot_title_content, get_multiple_get_annot_title_content
+from services.analysis.render_plan import PdfAnnot, RenderPlan
 
 WORDS_EXTRACT_PATTERN = re.compile(r'[a-zA-Zа-яА-ЯёЁ]+', re.UNICODE)
 PUNCT_STRIP_PATTERN = re.compile(r"^[^\w\s]+|[^\w\s]+$", re.UNICODE)
@@ -23,6 +28,10 @@ MAX_LINE_JUMP_MERGE = 150
 HORIZONTAL_INDENT_THRESHOLD = 200
 MIN_CONF_FOR_MERGE = 5
 USE_STEM_FALLBACK = True
+# streaming analysis of long documents by page windows
+STREAM_MIN_PAGES = 200
+STREAM_WINDOW_PAGES = 50
+STREAM_OVERLAP_PAGES = 1
 
 
 class AnalyserPdf(Analyser):
@@ -30,74 +39,187 @@ class AnalyserPdf(Analyser):
     source_path: str
 
     _progress: Optional['CombinedProgress']
+    _highlight: bool
 
     def __init__(self, source_path: str):
         super().__init__()
         self.source_path = source_path
         self.document = None
         self._progress = None
+        self._highlight = True
 
     @timeit
-    def analyse_and_highlight(self, task_id: Optional[str] = None, use_ocr: bool = False) -> dict:
+    def analyse_and_highlight(
+        self,
+        task_id: Optional[str] = None,
+        use_ocr: bool = False,
+        stream: Optional[bool] = None,
+        highlight: bool = True,
+    ) -> dict:
+        """
+        Args:
+            task_id: Task id for progress events; without it progress is not tracked
+            use_ocr: Not implemented yet
+            stream: Analyse by page windows in bounded memory; by default enabled
+                for documents longer than STREAM_MIN_PAGES
+            highlight: Add highlight annotations for save(); without it only
+                matches and render_plan are collected and the document is closed
+        """
         self.document = pymupdf.open(self.source_path)
+        self._highlight = highlight
+        self.render_plan = RenderPlan()
 
-        self._progress = CombinedProgress(task_id, [
-            ProgressParticle(
-                key='collect_pages',
-                description='Индексация страниц',
-            ),
-            ProgressParticle(
-                key=Tokenizer.PARTICLE_KEY,
-                description='Токенизация',
-            ),
-            ProgressParticle(
-                key=FulltextSearch.PARTICLE_KEY,
-                description='Поиск',
-            )
-        ])
+        if stream is None:
+            stream = len(self.document) > STREAM_MIN_PAGES
+
+        self._progress = None
+
+        if stream:
+            if task_id is not None:
+                self._progress = CombinedProgress(task_id, [
+                    ProgressParticle(
+                        key='analyse_pages',
+                        description='Анализ страниц',
+                    ),
+                ])
+
+            matches: List[AnalysisMatch] = self._analyse_stream()
+        else:
+            if task_id is not None:
+                self._progress = CombinedProgress(task_id, [
+                    ProgressParticle(
+                        key='collect_pages',
+                        description='Индексация страниц',
+                    ),
+                    ProgressParticle(
+                        key=Tokenizer.PARTICLE_KEY,
+                        description='Токенизация',
+                    ),
+                    ProgressParticle(
+                        key=FulltextSearch.PARTICLE_KEY,
+                        description='Поиск',
+                    )
+                ])
+
+            matches: List[AnalysisMatch] = self._analyse_whole()
+
+        if use_ocr:
+            # todo: ocr not implemented
+            logger.warning(f'ocr not implemented')
+
+        if not highlight:
+            self.document.close()
+            self.document = None
+
+        return self._get_stats_result(matches)
 
+    def _analyse_whole(self) -> List[AnalysisMatch]:
         # [start] Collect pages
         pages_to_process = len(self.document)
-        pua_map = PuaMap()
         pages = []
 
-        for page_num in range(pages_to_process):
-            page = self.document.load_page(page_num)
-            page_analyser = PageAnalyser(page=page, pua_map=pua_map, highlight_color=self.get_highlight_color_pdf())
-            page_analyser.collect()
+        for page_num, page_analyser in enumerate(self._page_collector().iter_pages(list(range(pages_to_process)))):
             pages.append(page_analyser)
 
-            if page_num % 50 == 0:
+            if page_num % 50 == 0 and self._progress is not None:
                 self._progress.set_particle_value('collect_pages', page_num / pages_to_process * 100)
         # [end]
 
-        self._progress.set_particle_value('collect_pages', 100)
+        if self._progress is not None:
+            self._progress.set_particle_value('collect_pages', 100)
 
         # [start] tokenize document and run search
-        whole_document_text = ''
+        whole_document_text, page_offsets, page_lengths = self._join_pages(pages)
+        all_tokens: TokenStream = Tokenizer(self._progress).tokenize_stream(whole_document_text)
+        matches: List[AnalysisMatch] = self._search_tokens(all_tokens, self._progress)
+        self._assign_pages(matches, all_tokens, page_offsets, page_lengths, 0)
+        self._plan_and_highlight(matches, all_tokens, pages, page_offsets, page_lengths)
+        # [end]
 
-        for page_analyser in pages:
-            whole_document_text += page_analyser.to_text() + ' '
+        return matches
+
+    def _analyse_stream(self) -> List[AnalysisMatch]:
+        """
+        Analyses STREAM_WINDOW_PAGES pages at a time. Each window also reads
+        STREAM_OVERLAP_PAGES following pages so phrases crossing the window
+        border are found; the window keeps only matches starting on its own
+        pages, the rest are found by the next window. Pages are highlighted
+        and their char data dropped as soon as their window is done.
+        """
+        pages_total: int = len(self.document)
+        pages_iter: Iterator[PageAnalyser] = self._page_collector().iter_pages(list(range(pages_total)))
+        window: List[PageAnalyser] = []
+        window_start: int = 0
+        matches: List[AnalysisMatch] = []
+
+        while window_start < pages_total:
+            own_end: int = min(window_start + STREAM_WINDOW_PAGES, pages_total)
+            window_end: int = min(own_end + STREAM_OVERLAP_PAGES, pages_total)
+
+            # overlap pages of the previous window are already collected
+            while window_start + len(window) < window_end:
+                window.append(next(pages_iter))
+
+            text, page_offsets, page_lengths = self._join_pages(window)
+            # plain token list: matches keep their own tokens after the window is dropped
+            tokens: List[Token] = Tokenizer(None).tokenize_text(text)
+            own_pages_count: int = own_end - window_start
+            own_text_end: int = page_offsets[own_pages_count] if own_end < window_end else len(text)
+            window_matches: List[AnalysisMatch] = [
+                match
+                for match in self._search_tokens(tokens, None)
+                if tokens[match.search_match.start_token_idx].start < own_text_end
+            ]
+
+            self._assign_pages(window_matches, tokens, page_offsets, page_lengths, window_start)
+            self._plan_and_highlight(window_matches, tokens, window, page_offsets, page_lengths)
+
+            matches.extend(window_matches)
+
+            window = window[own_pages_count:]
+            window_start = own_end
+
+            if self._progress is not None:
+                self._progress.set_particle_value('analyse_pages', window_start / pages_total * 100)
+
+        return matches
+
+    def _page_collector(self) -> PageCollector:
+        return PageCollector(
+            document=self.document,
+            source_path=self.source_path,
+            pua_map=PuaMap(),
+            highlight_color=self.get_highlight_color_pdf(),
+        )
 
-        # [start] calculate page offsets and lengths in combined text
-        page_offsets: List[int] = [0]
+    @staticmethod
+    def _join_pages(pages: List[PageAnalyser]) -> Tuple[str, List[int], List[int]]:
+        """
+        Returns:
+            Text of pages each followed by a space, page start offsets and page text lengths in it
+        """
+        page_texts: List[str] = [page_analyser.to_text() for page_analyser in pages]
+        page_offsets: List[int] = []
         page_lengths: List[int] = []
         current_offset: int = 0
 
-        for page_analyser in pages:
-            page_text = page_analyser.to_text()
-            page_len = len(page_text)
-            page_lengths.append(page_len)
-            current_offset += page_len + 1
+        for page_text in page_texts:
             page_offsets.append(current_offset)
-        # [end]
+            page_lengths.append(len(page_text))
+            current_offset += len(page_text) + 1
 
-        all_tokens: List[Token] = Tokenizer(self._progress).tokenize_text(whole_document_text)
+        return ''.join(page_text + ' ' for page_text in page_texts), page_offsets, page_lengths
+
+    def _search_tokens(
+        self,
+        tokens: TokenSequence,
+        progress: Optional[CombinedProgress],
+    ) -> List[AnalysisMatch]:
         phrases_list = self.analyse_data.phrases
         search_phrases_for_search: List[Tuple[Phrase, List[Token]]] = [
             (phrase, phrase.tokens) for phrase in phrases_list
         ]
-        fulltext_search = FulltextSearch(all_tokens, self._progress)
+        fulltext_search = FulltextSearch(tokens, progress)
         regex_patterns_dict = None
 
         if self.analyse_data.regex_patterns:
@@ -119,42 +241,68 @@ class AnalyserPdf(Analyser):
             fts_matches.extend(fts_match)
         # [end]
 
-        matches: List[AnalysisMatch] = self._convert_fts_matches(fts_matches)
-
-        # [start] determine page number for each match
+        return self._convert_fts_matches(fts_matches)
+
+    @staticmethod
+    def _assign_pages(
+        matches: List[AnalysisMatch],
+        tokens: TokenSequence,
+        page_offsets: List[int],
+        page_lengths: List[int],
+        first_page_num: int,
+    ) -> None:
+        """Sets 1-based page number of the page that contains the start of each match."""
         for match in matches:
             search_match = match.search_match
             start_token_idx: int = search_match.start_token_idx
-            start_char_pos: int = all_tokens[start_token_idx].start
+            start_char_pos: int = tokens[start_token_idx].start
 
             # find page that contains the start of this match
-            for page_idx in range(len(pages)):
-                page_start_offset: int = page_offsets[page_idx]
-                page_text_len: int = page_lengths[page_idx]
-                page_end_offset: int = page_start_offset + page_text_len - 1
-
-                if page_start_offset <= start_char_pos <= page_end_offset:
-                    match.page = page_idx + 1
-                    break
-        # [end]
-
-        if use_ocr:
-            # todo: ocr not implemented
-            logger.warning(f'ocr not implemented')
-
-        # [start] highlight matches
-        # key is tuple(page, start_index, end_index)
-        highlighting_map: Dict[(PageAnalyser, int, int), List[AnalysisMatch]] = {}
+            page_idx: int = bisect_right(page_offsets, start_char_pos) - 1
+
+            if page_idx >= 0 and start_char_pos <= page_offsets[page_idx] + page_lengths[page_idx] - 1:
+                match.page = first_page_num + page_idx + 1
+
+    def _plan_and_highlight(
+        self,
+        matches: List[AnalysisMatch],
+        tokens: TokenSequence,
+        pages: List[PageAnalyser],
+        page_offsets: List[int],
+        page_lengths: List[int],
+    ) -> None:
+        annots: List[PdfAnnot] = self._plan_annots(matches, tokens, pages, page_offsets, page_lengths)
+        self.render_plan.pdf_annots.extend(annots)
+
+        if self._highlight:
+            self._apply_annots({page.page.number: page for page in pages}, annots)
+
+    def _plan_annots(
+        self,
+        matches: List[AnalysisMatch],
+        tokens: TokenSequence,
+        pages: List[PageAnalyser],
+        page_offsets: List[int],
+        page_lengths: List[int],
+    ) -> List[PdfAnnot]:
+        # local (start, end) ranges of matches on every page
+        page_ranges: Dict[PageAnalyser, List[Tuple[int, int, AnalysisMatch]]] = {}
 
         for match in matches:
             search_match = match.search_match
             start_token_idx: int = search_match.start_token_idx
             end_token_idx: int = search_match.end_token_idx
-            start_char_pos: int = all_tokens[start_token_idx].start
-            end_char_pos: int = all_tokens[end_token_idx].end
+            start_char_pos: int = tokens[start_token_idx].start
+            end_char_pos: int = tokens[end_token_idx].end
+
+            # [start] find pages that contain this match
+            first_page_idx: int = max(bisect_right(page_offsets, start_char_pos) - 1, 0)
 
-            # [start] find pages that contain this match and highlight it
-            for page_idx, page_analyser in enumerate(pages):
+            for page_idx in range(first_page_idx, len(pages)):
+                if page_offsets[page_idx] > end_char_pos:
+                    break
+
+                page_analyser: PageAnalyser = pages[page_idx]
                 page_start_offset: int = page_offsets[page_idx]
                 page_text_len: int = page_lengths[page_idx]
                 page_end_offset: int = page_start_offset + page_text_len - 1
@@ -169,30 +317,61 @@ class AnalyserPdf(Analyser):
 
                 # convert global indices to local page character indices
                 local_start: int = match_start_in_page - page_start_offset
-                local_end: int = match_end_in_page - page_start_offset
-
-                # add match into map
-                key = (page_analyser, local_start, local_end - 1)
+                local_end: int = match_end_in_page - page_start_offset - 1
 
-                if highlighting_map.get(key) is None:
-                    highlighting_map[key] = []
+                # empty range is not highlighted
+                if local_start > local_end:
+                    continue
 
-                highlighting_map[key].append(match)
+                page_ranges.setdefault(page_analyser, []).append((local_start, local_end, match))
             # [end]
 
-        # [start] build highlighting map
-        for key, map_matches in highlighting_map.items():
-            page, start, end = key
-            color: Tuple[float, float, float] = self._highlight_color_for_match(map_matches[0]).rgb()
+        # [start] overlapping matches of a page are one annotation
+        annots: List[PdfAnnot] = []
 
-            if len(map_matches) == 1:
-                page.highlight_range(start, end, map_matches[0], color)
-            else:
-                page.highlight_range(start, end, map_matches, color)
-        # [end]
+        for page, ranges in page_ranges.items():
+            for interval, group in group_overlapping(ranges, lambda r: Interval(r[0], r[1])):
+                map_matches: List[AnalysisMatch] = [match for _, _, match in group]
+                color: Tuple[float, float, float] = self._highlight_color_for_match(map_matches[0]).rgb()
+
+                if len(map_matches) == 1:
+                    title, content = get_annot_title_content(map_matches[0])
+                else:
+                    title, content = get_multiple_get_annot_title_content(map_matches)
+
+                annots.append((page.page.number, interval.begin, interval.end, color, title, content))
         # [end]
 
-        return self._get_stats_result(matches)
+        return annots
+
+    @staticmethod
+    def _apply_annots(pages: Dict[int, PageAnalyser], annots: List[PdfAnnot]) -> None:
+        for page_num, start, end, color, title, content in annots:
+            pages[page_num].add_highlight(start, end, color, title, content)
+
+    def render(self, plan: RenderPlan) -> None:
+        """
+        Adds the highlight annotations of a plan for save(), without searching.
+        Only pages with annotations are read, one at a time, and PUA glyphs are
+        not recognized: highlighting needs char positions only.
+        """
+        self.document = pymupdf.open(self.source_path)
+        self.render_plan = plan
+        annots_by_page: Dict[int, List[PdfAnnot]] = {}
+
+        for annot in plan.pdf_annots:
+            annots_by_page.setdefault(annot[0], []).append(annot)
+
+        pua_map: PuaMap = PuaMap()
+
+        for page_num in sorted(annots_by_page):
+            page_analyser = PageAnalyser(
+                page=self.document.load_page(page_num),
+                pua_map=pua_map,
+                highlight_color=self.get_highlight_color_pdf(),
+            )
+            page_analyser.collect_layout()
+            self._apply_annots({page_num: page_analyser}, annots_by_page[page_num])
 
     def save(self, output_path: str) -> None:
         if self.document is None:
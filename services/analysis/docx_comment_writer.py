@@ -0,0 +1,120 @@
+import datetime as dt
+import re
+from copy import deepcopy
+from typing import List, Tuple
+from xml.sax.saxutils import escape
+
+import docx
+from docx.oxml import OxmlElement, CT_R, parse_xml
+from docx.oxml.ns import nsdecls, qn
+from docx.oxml.simpletypes import ST_DateTime
+from docx.oxml.xmlchemy import BaseOxmlElement
+
+# (first run, last run, author, text)
+_PendingComment = Tuple[CT_R, CT_R, str, str]
+
+# run text chars written as elements, as python-docx Run.text does
+_RUN_SPECIAL_CHARS = re.compile(r'([\t\r])')
+
+
+class DocxCommentWriter:
+    """
+    Collects Word comments and writes them to the document in one pass.
+
+    Document.add_comment looks up a free id over all existing comments, so adding
+    comments one by one is quadratic in their number. Here ids are counted from
+    the largest existing one, the w:comment elements are parsed from one XML
+    string and appended together, and range markers are put around the runs.
+    Comments and markers are the same as python-docx writes.
+    """
+
+    def __init__(self, document: docx.Document) -> None:
+        self.document = document
+        self._pending: List[_PendingComment] = []
+
+    def add(self, runs: List[CT_R], author: str, text: str) -> None:
+        """Comment on the range from the first to the last of runs."""
+        self._pending.append((runs[0], runs[-1], author, text))
+
+    def write(self) -> None:
+        if len(self._pending) == 0:
+            return
+
+        # the part is created on first access, as with Document.add_comment
+        comments_element = self.document.part._comments_part.element
+        next_id: int = max((int(x) for x in comments_element.xpath('./w:comment/@w:id')), default=-1) + 1
+        date: str = ST_DateTime.convert_to_xml(dt.datetime.now(dt.timezone.utc))
+
+        # [start] comments part
+        comments_xml: List[str] = [f'<w:comments {nsdecls("w")}>']
+
+        for i, (_, _, author, text) in enumerate(self._pending):
+            comments_xml.append(DocxCommentWriter._comment_xml(next_id + i, author, text, date))
+
+        comments_xml.append('</w:comments>')
+        comments_element.extend(list(parse_xml(''.join(comments_xml))))
+        # [end]
+
+        # [start] range markers in document
+        range_start: BaseOxmlElement = OxmlElement('w:commentRangeStart')
+        range_end: BaseOxmlElement = OxmlElement('w:commentRangeEnd')
+        reference_run: CT_R = parse_xml(
+            f'<w:r {nsdecls("w")}><w:rPr><w:rStyle w:val="CommentReference"/></w:rPr>'
+            f'<w:commentReference/></w:r>'
+        )
+        id_attribute: str = qn('w:id')
+
+        for i, (first_run, last_run, _, _) in enumerate(self._pending):
+            comment_id: str = str(next_id + i)
+            start_element = deepcopy(range_start)
+            start_element.set(id_attribute, comment_id)
+            end_element = deepcopy(range_end)
+            end_element.set(id_attribute, comment_id)
+            reference_element = deepcopy(reference_run)
+            reference_element[1].set(id_attribute, comment_id)
+
+            first_run.addprevious(start_element)
+            last_run.addnext(reference_element)
+            last_run.addnext(end_element)
+        # [end]
+
+        self._pending = []
+
+    @staticmethod
+    def _comment_xml(comment_id: int, author: str, text: str, date: str) -> str:
+        paragraphs: List[str] = []
+
+        for i, paragraph_text in enumerate(text.split('\n') if text else ['']):
+            runs: str = ''
+
+            if i == 0:
+                runs += '<w:r><w:rPr><w:rStyle w:val="CommentReference"/></w:rPr><w:annotationRef/></w:r>'
+
+            if paragraph_text:
+                runs += f'<w:r>{DocxCommentWriter._run_content_xml(paragraph_text)}</w:r>'
+
+            paragraphs.append(f'<w:p><w:pPr><w:pStyle w:val="CommentText"/></w:pPr>{runs}</w:p>')
+
+        return (
+            f'<w:comment w:id="{comment_id}" w:author={DocxCommentWriter._attribute(author)}'
+            f' w:initials="" w:date="{date}">{"".join(paragraphs)}</w:comment>'
+        )
+
+    @staticmethod
+    def _run_content_xml(text: str) -> str:
+        content: List[str] = []
+
+        for part in _RUN_SPECIAL_CHARS.split(text):
+            if part == '\t':
+                content.append('<w:tab/>')
+            elif part == '\r':
+                content.append('<w:br/>')
+            elif part:
+                space: str = ' xml:space="preserve"' if len(part.strip()) < len(part) else ''
+                content.append(f'<w:t{space}>{escape(part)}</w:t>')
+
+        return ''.join(content)
+
+    @staticmethod
+    def _attribute(value: str) -> str:
+        return '"' + escape(value, {'"': '&quot;', '\n': '&#10;', '\r': '&#13;', '\t': '&#9;'}) + '"'
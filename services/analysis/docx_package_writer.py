@@ -0,0 +1,184 @@
+import os
+import struct
+import time
+import zipfile
+import zlib
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple, Union
+
+import docx
+from docx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+from docx.opc.part import Part
+from docx.opc.pkgwriter import _ContentTypesItem
+
+_LOCAL_HEADER = struct.Struct('<4sHHHHHLLLHH')
+_CENTRAL_HEADER = struct.Struct('<4sHHHHHHLLLHHHHHLL')
+_END_RECORD = struct.Struct('<4sHHHHLLH')
+
+_VERSION: int = 20
+_FLAG_ENCRYPTED: int = 0x01
+_FLAG_DATA_DESCRIPTOR: int = 0x08
+_FLAG_UTF8: int = 0x800
+# offsets and sizes past this need zip64 records
+_ZIP32_LIMIT: int = 0xFFFFFFFF
+_ZIP32_MAX_ENTRIES: int = 0xFFFF
+
+
+class _ZipEntry:
+    def __init__(
+            self,
+            name: bytes,
+            flags: int,
+            method: int,
+            dos_time: Tuple[int, int],
+            crc: int,
+            compress_size: int,
+            file_size: int,
+            external_attr: int,
+    ) -> None:
+        self.name = name
+        self.flags = flags
+        self.method = method
+        self.dos_time = dos_time
+        self.crc = crc
+        self.compress_size = compress_size
+        self.file_size = file_size
+        self.external_attr = external_attr
+        self.header_offset: int = 0
+
+
+class _ZipStreamWriter:
+    """Writes ZIP entries one after another: deflated from data or as raw compressed bytes."""
+
+    def __init__(self, stream: BinaryIO) -> None:
+        self._stream: BinaryIO = stream
+        self._entries: List[_ZipEntry] = []
+
+    @staticmethod
+    def _dos_time(date_time: Tuple[int, ...]) -> Tuple[int, int]:
+        year, month, day, hour, minute, second = date_time[:6]
+
+        return (hour << 11) | (minute << 5) | (second // 2), ((year - 1980) << 9) | (month << 5) | day
+
+    def _write_entry(self, entry: _ZipEntry, data: bytes) -> None:
+        entry.header_offset = self._stream.tell()
+        self._stream.write(_LOCAL_HEADER.pack(
+            b'PK\x03\x04', _VERSION, entry.flags, entry.method, entry.dos_time[0], entry.dos_time[1],
+            entry.crc, entry.compress_size, entry.file_size, len(entry.name), 0,
+        ))
+        self._stream.write(entry.name)
+        self._stream.write(data)
+        self._entries.append(entry)
+
+    def write(self, name: str, data: Union[bytes, str]) -> None:
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+
+        compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+        compressed: bytes = compressor.compress(data) + compressor.flush()
+        name_bytes: bytes = name.encode('utf-8')
+
+        self._write_entry(_ZipEntry(
+            name=name_bytes,
+            flags=_FLAG_UTF8 if not name.isascii() else 0,
+            method=zipfile.ZIP_DEFLATED,
+            dos_time=_ZipStreamWriter._dos_time(time.localtime(time.time())),
+            crc=zlib.crc32(data),
+            compress_size=len(compressed),
+            file_size=len(data),
+            external_attr=0o600 << 16,
+        ), compressed)
+
+    def copy_raw(self, source: BinaryIO, info: zipfile.ZipInfo) -> None:
+        """Copies a source entry without decompressing it."""
+        source.seek(info.header_offset)
+        header: bytes = source.read(_LOCAL_HEADER.size)
+
+        if len(header) != _LOCAL_HEADER.size or header[:4] != b'PK\x03\x04':
+            raise zipfile.BadZipFile(f"bad local header of {info.filename}")
+
+        name_length, extra_length = struct.unpack('<HH', header[26:30])
+        source.seek(info.header_offset + _LOCAL_HEADER.size + name_length + extra_length)
+        compressed: bytes = source.read(info.compress_size)
+
+        # sizes go to the local header, so no data descriptor follows the data
+        self._write_entry(_ZipEntry(
+            name=info.filename.encode('utf-8'),
+            flags=(info.flag_bits & ~_FLAG_DATA_DESCRIPTOR) | (_FLAG_UTF8 if not info.filename.isascii() else 0),
+            method=info.compress_type,
+            dos_time=_ZipStreamWriter._dos_time(info.date_time),
+            crc=info.CRC,
+            compress_size=info.compress_size,
+            file_size=info.file_size,
+            external_attr=info.external_attr,
+        ), compressed)
+
+    def close(self) -> None:
+        central_offset: int = self._stream.tell()
+
+        for entry in self._entries:
+            self._stream.write(_CENTRAL_HEADER.pack(
+                b'PK\x01\x02', _VERSION, _VERSION, entry.flags, entry.method, entry.dos_time[0],
+                entry.dos_time[1], entry.crc, entry.compress_size, entry.file_size, len(entry.name),
+                0, 0, 0, 0, entry.external_attr, entry.header_offset,
+            ))
+            self._stream.write(entry.name)
+
+        central_size: int = self._stream.tell() - central_offset
+
+        if central_offset + central_size > _ZIP32_LIMIT or len(self._entries) > _ZIP32_MAX_ENTRIES:
+            raise zipfile.LargeZipFile("package needs zip64 records")
+
+        self._stream.write(_END_RECORD.pack(
+            b'PK\x05\x06', 0, 0, len(self._entries), len(self._entries), central_size, central_offset, 0,
+        ))
+
+
+class DocxPackageWriter:
+    """
+    Saves a python-docx document loaded from source_path, copying unchanged parts.
+
+    Writes the same package as Document.save: content types, package rels, then
+    every part followed by its rels. Parts in modified_parts and parts absent from
+    the source archive are serialized; all others are copied from the source ZIP
+    as raw compressed bytes, without parsing or recompressing. Content types and
+    rels are always serialized, they are small.
+    """
+
+    def __init__(self, source_path: str) -> None:
+        self.source_path = source_path
+
+    def can_stream(self) -> bool:
+        # zip64 archives are left to python-docx
+        return os.path.getsize(self.source_path) < _ZIP32_LIMIT // 2
+
+    def save(self, document: docx.Document, output_path: str, modified_parts: Iterable[Part]) -> None:
+        package = document.part.package
+        parts: List[Part] = list(package.iter_parts())
+        modified: List[Part] = list(modified_parts)
+
+        for part in parts:
+            part.before_marshal()
+
+        with zipfile.ZipFile(self.source_path) as source_zip, open(self.source_path, 'rb') as source, \
+                open(output_path, 'wb') as output:
+            source_entries: Dict[str, zipfile.ZipInfo] = {
+                info.filename: info
+                for info in source_zip.infolist()
+                if not info.flag_bits & _FLAG_ENCRYPTED
+            }
+            writer: _ZipStreamWriter = _ZipStreamWriter(output)
+            writer.write(CONTENT_TYPES_URI.membername, _ContentTypesItem.from_parts(parts).blob)
+            writer.write(PACKAGE_URI.rels_uri.membername, package.rels.xml)
+
+            for part in parts:
+                source_entry: Optional[zipfile.ZipInfo] = source_entries.get(part.partname.membername)
+
+                if source_entry is None or any(part is modified_part for modified_part in modified):
+                    writer.write(part.partname.membername, part.blob)
+                else:
+                    writer.copy_raw(source, source_entry)
+
+                if len(part.rels):
+                    writer.write(part.partname.rels_uri.membername, part.rels.xml)
+
+            writer.close()
@@ -0,0 +1,165 @@
+from bisect import bisect_right
+from copy import deepcopy
+from typing import Dict, List, Optional, Tuple
+
+from docx.oxml import OxmlElement, CT_R
+from docx.oxml.ns import qn
+from docx.oxml.text.font import CT_RPr
+
+# run children that make up run.text, see CT_R.text
+_TEXT_TAGS = {qn('w:br'), qn('w:cr'), qn('w:noBreakHyphen'), qn('w:ptab'), qn('w:t'), qn('w:tab')}
+# rPr children that follow w:shd in the schema sequence
+_SHD_SUCCESSORS: Tuple[str, ...] = (
+    'w:fitText', 'w:vertAlign', 'w:rtl', 'w:cs', 'w:em', 'w:lang', 'w:eastAsianLayout', 'w:specVanish', 'w:oMath',
+)
+
+# (start, end) char range in the text of the runs, end exclusive
+CharRange = Tuple[int, int]
+
+
+class DocxRunSplitter:
+    """
+    Highlights char ranges of a run batch, splitting every run once.
+
+    Highlights are collected first; apply() cuts each touched run at all
+    highlight boundaries inside it, moves its content into the pieces and
+    shades the highlighted ones. A run covered whole is shaded in place.
+    Where highlights overlap, the one added last gives the fill.
+    """
+
+    def __init__(self, runs: List[CT_R]) -> None:
+        self._runs: List[CT_R] = runs
+        self._run_starts: List[int] = []
+        self._run_texts: List[str] = []
+        # (start, end, highlight idx) per run, in run-local offsets
+        self._run_ranges: Dict[int, List[Tuple[int, int, int]]] = {}
+        self._fills: List[str] = []
+
+        offset: int = 0
+
+        for run in runs:
+            text: str = run.text
+            self._run_starts.append(offset)
+            self._run_texts.append(text)
+            offset += len(text)
+
+    def add(self, ranges: List[CharRange], fill: str) -> int:
+        """Adds one highlight of several char ranges; returns its index in apply() result."""
+        highlight_idx: int = len(self._fills)
+        self._fills.append(fill)
+
+        for start, end in ranges:
+            run_idx: int = max(bisect_right(self._run_starts, start) - 1, 0)
+
+            while run_idx < len(self._runs) and self._run_starts[run_idx] < end:
+                run_start: int = self._run_starts[run_idx]
+                local_start: int = max(start, run_start) - run_start
+                local_end: int = min(end, run_start + len(self._run_texts[run_idx])) - run_start
+
+                if local_start < local_end:
+                    self._run_ranges.setdefault(run_idx, []).append((local_start, local_end, highlight_idx))
+
+                run_idx += 1
+
+        return highlight_idx
+
+    def apply(self) -> List[List[CT_R]]:
+        """
+        Rewrites the runs in their parents.
+
+        Returns:
+            Highlighted run elements of every highlight, in document order
+        """
+        highlight_runs: List[List[CT_R]] = [[] for _ in self._fills]
+
+        for run_idx in sorted(self._run_ranges):
+            run: CT_R = self._runs[run_idx]
+            ranges: List[Tuple[int, int, int]] = self._run_ranges[run_idx]
+            bounds: List[int] = sorted({0, len(self._run_texts[run_idx])}.union(*((s, e) for s, e, _ in ranges)))
+            pieces: List[Tuple[int, int]] = list(zip(bounds, bounds[1:]))
+
+            if len(pieces) == 1:
+                piece_runs: List[CT_R] = [run]
+            else:
+                piece_runs: List[CT_R] = DocxRunSplitter._split_run(run, pieces)
+
+            for (piece_start, piece_end), piece_run in zip(pieces, piece_runs):
+                covering: List[int] = [idx for s, e, idx in ranges if s <= piece_start and piece_end <= e]
+
+                if len(covering) == 0:
+                    continue
+
+                DocxRunSplitter._set_shading(piece_run, self._fills[max(covering)])
+
+                for idx in covering:
+                    highlight_runs[idx].append(piece_run)
+
+        return highlight_runs
+
+    @staticmethod
+    def _split_run(run: CT_R, pieces: List[Tuple[int, int]]) -> List[CT_R]:
+        """Replaces run by one run per piece, each with a copy of its properties."""
+        rPr: Optional[CT_RPr] = run.rPr
+        piece_runs: List[CT_R] = []
+
+        for _ in pieces:
+            piece_run: CT_R = OxmlElement('w:r')
+
+            if rPr is not None:
+                piece_run.append(deepcopy(rPr))
+
+            piece_runs.append(piece_run)
+
+        # [start] move content into pieces, w:t text is cut at piece bounds
+        offset: int = 0
+        piece_idx: int = 0
+
+        for child in list(run):
+            if child is rPr:
+                continue
+
+            text: str = str(child) if child.tag in _TEXT_TAGS else ''
+
+            if child.tag != qn('w:t'):
+                # tabs, breaks, drawings, fields: whole, in the piece of their position
+                while piece_idx < len(pieces) - 1 and pieces[piece_idx][1] <= offset:
+                    piece_idx += 1
+
+                piece_runs[piece_idx].append(child)
+                offset += len(text)
+                continue
+
+            text_pos: int = 0
+
+            while text_pos < len(text):
+                while pieces[piece_idx][1] <= offset:
+                    piece_idx += 1
+
+                part_len: int = min(len(text) - text_pos, pieces[piece_idx][1] - offset)
+                text_element = OxmlElement('w:t')
+                text_element.text = text[text_pos:text_pos + part_len]
+                text_element.set(qn('xml:space'), 'preserve')
+                piece_runs[piece_idx].append(text_element)
+                text_pos += part_len
+                offset += part_len
+        # [end]
+
+        for piece_run in piece_runs:
+            run.addprevious(piece_run)
+
+        run.getparent().remove(run)
+
+        return piece_runs
+
+    @staticmethod
+    def _set_shading(run: CT_R, fill: str) -> None:
+        rPr: CT_RPr = run.get_or_add_rPr()
+
+        for shd in rPr.findall(qn('w:shd')):
+            rPr.remove(shd)
+
+        shd = OxmlElement('w:shd')
+        shd.set(qn('w:val'), 'clear')
+        shd.set(qn('w:fill'), fill)
+        shd.set(qn('w:color'), 'auto')
+        rPr.insert_element_before(shd, *_SHD_SUCCESSORS)
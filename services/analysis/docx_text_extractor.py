@@ -0,0 +1,123 @@
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from docx.oxml import CT_P, CT_R
+from docx.oxml.ns import qn
+from docx.oxml.xmlchemy import BaseOxmlElement
+
+_TAG_P: str = qn('w:p')
+_TAG_TBL: str = qn('w:tbl')
+_TAG_TR: str = qn('w:tr')
+_TAG_TC: str = qn('w:tc')
+_TAG_SDT: str = qn('w:sdt')
+_TAG_SDT_CONTENT: str = qn('w:sdtContent')
+# block containers walked for paragraphs, by the path step they add
+_CONTAINER_STEPS: Dict[str, str] = {_TAG_TBL: 'tbl', _TAG_TR: 'tr', _TAG_TC: 'tc', _TAG_SDT: 'sdt'}
+
+
+@dataclass
+class DocxParagraph:
+    element: CT_P
+    # element indices from the body, e.g. body/tbl[0]/tr[1]/tc[0]/p[0]
+    path: str
+
+
+@dataclass
+class DocxSegment:
+    """Runs of a paragraph or hyperlink, searched as one text."""
+    runs: List[CT_R]
+    paragraph: DocxParagraph
+    paragraph_number: int
+    start: int  # offset of segment text in document text
+    text: str
+
+
+class DocxTextExtractor:
+    """
+    Paragraphs and search text of a document body, collected in one walk over its XML.
+
+    Paragraphs come in reading order: body paragraphs and tables as they appear,
+    cells row by row, tables nested in cells and content controls in place. A
+    merged cell is one w:tc, so its paragraphs come once. Paths count elements of
+    one tag among siblings and are the same for every load of the document.
+    Segments and text are built once and shared by all passes.
+    """
+
+    # joins segment texts in document text; matches crossing it are dropped
+    SEGMENT_SEPARATOR: str = '\n'
+
+    def __init__(self, body: BaseOxmlElement) -> None:
+        self.paragraphs: List[DocxParagraph] = []
+        self._segments: Optional[List[DocxSegment]] = None
+        self._text: Optional[str] = None
+
+        self._walk(body, 'body')
+
+    def _walk(self, container: BaseOxmlElement, path: str) -> None:
+        counters: Dict[str, int] = {}
+
+        for child in container:
+            if child.tag == _TAG_P:
+                index: int = counters.get('p', 0)
+                counters['p'] = index + 1
+                self.paragraphs.append(DocxParagraph(element=child, path=f'{path}/p[{index}]'))
+                continue
+
+            step: Optional[str] = _CONTAINER_STEPS.get(child.tag)
+
+            if step is None:
+                continue
+
+            index: int = counters.get(step, 0)
+            counters[step] = index + 1
+
+            if child.tag == _TAG_SDT:
+                sdt_content: Optional[BaseOxmlElement] = child.find(_TAG_SDT_CONTENT)
+
+                if sdt_content is not None:
+                    self._walk(sdt_content, f'{path}/sdt[{index}]/sdtContent')
+            else:
+                self._walk(child, f'{path}/{step}[{index}]')
+
+    def segments(self, on_paragraph_proceed: Optional[Callable[[int], None]] = None) -> List[DocxSegment]:
+        """Run batches of paragraphs and their hyperlinks, in reading order."""
+        if self._segments is not None:
+            return self._segments
+
+        segments: List[DocxSegment] = []
+        text_offset: int = 0
+
+        for paragraph_number, paragraph in enumerate(self.paragraphs, start=1):
+            elements: List[BaseOxmlElement] = [paragraph.element]
+            elements.extend(paragraph.element.hyperlink_lst)
+
+            for element in elements:
+                runs: List[CT_R] = list(element.r_lst)
+
+                if len(runs) == 0:
+                    continue
+
+                text: str = ''.join([run.text for run in runs])
+                segments.append(DocxSegment(
+                    runs=runs,
+                    paragraph=paragraph,
+                    paragraph_number=paragraph_number,
+                    start=text_offset,
+                    text=text,
+                ))
+                text_offset += len(text) + len(DocxTextExtractor.SEGMENT_SEPARATOR)
+
+            if on_paragraph_proceed is not None:
+                on_paragraph_proceed(paragraph_number)
+
+        self._segments = segments
+
+        return segments
+
+    @property
+    def text(self) -> str:
+        """Segment texts joined by SEGMENT_SEPARATOR, as searched."""
+        if self._text is None:
+            self._text = DocxTextExtractor.SEGMENT_SEPARATOR.join(segment.text for segment in self.segments())
+
+        return self._text
@@ -0,0 +1,12 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class CollectedPage:
+    """Compact result of PageAnalyser.collect() for one page, cheap to pickle between processes."""
+    page_num: int
+    text: str  # one char per collected Char
+    bboxes: np.ndarray  # (len(text), 4) float32, NaN rows for chars without bbox
+    wrap_indices: np.ndarray  # int32
@@ -0,0 +1,93 @@
+import logging
+import os
+import time
+from typing import Dict, Iterable, List, Optional
+
+import redis
+
+from services.redis.connection import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+
+class GlyphCache:
+    """
+    Persistent cross-task cache of OCR'd PUA glyphs in Redis.
+
+    Each glyph is a separate key "<prefix><font>:<glyph bitmap hash>" (see
+    PuaMap) holding the recognized char, with a TTL, so rarely seen glyphs
+    expire. When Redis is unavailable the cache is skipped for RETRY_AFTER
+    seconds and PuaMap falls back to OCR.
+    """
+
+    KEY_PREFIX: str = "pua_glyph:v2:"
+    # unbounded hash of the previous format, removed on first write
+    LEGACY_REDIS_KEY: str = "pua_glyphs:v1"
+    TTL_ENV: str = "PUA_GLYPH_CACHE_TTL"
+    DEFAULT_TTL: int = 30 * 24 * 60 * 60
+    RETRY_AFTER: float = 60.0
+
+    _instance: Optional['GlyphCache'] = None
+
+    def __init__(self) -> None:
+        self._connection: Optional[redis.Redis] = None
+        self._disabled_until: float = 0.0
+        self._is_legacy_removed: bool = False
+        self._ttl: int = int(os.environ.get(GlyphCache.TTL_ENV, GlyphCache.DEFAULT_TTL))
+
+    @staticmethod
+    def get_instance() -> 'GlyphCache':
+        if GlyphCache._instance is None:
+            GlyphCache._instance = GlyphCache()
+
+        return GlyphCache._instance
+
+    def _get_connection(self) -> Optional[redis.Redis]:
+        if time.monotonic() < self._disabled_until:
+            return None
+
+        if self._connection is None:
+            self._connection = get_redis_connection(decode_responses=True, socket_connect_timeout=2)
+
+        return self._connection
+
+    def _disable(self, error: Exception) -> None:
+        logger.warning(f"PUA glyph cache disabled for {GlyphCache.RETRY_AFTER:.0f}s: {error}")
+        self._disabled_until = time.monotonic() + GlyphCache.RETRY_AFTER
+        self._connection = None
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """Returns cached chars for known glyph keys; unknown keys are absent."""
+        keys_list: List[str] = list(keys)
+        connection: Optional[redis.Redis] = self._get_connection()
+
+        if connection is None or len(keys_list) == 0:
+            return {}
+
+        try:
+            values: List[Optional[str]] = connection.mget([GlyphCache.KEY_PREFIX + key for key in keys_list])
+        except redis.RedisError as e:
+            self._disable(e)
+            return {}
+
+        return {key: value for key, value in zip(keys_list, values) if value is not None}
+
+    def put_many(self, items: Dict[str, str]) -> None:
+        connection: Optional[redis.Redis] = self._get_connection()
+
+        if connection is None or len(items) == 0:
+            return
+
+        try:
+            pipeline = connection.pipeline(transaction=False)
+
+            for key, value in items.items():
+                pipeline.set(GlyphCache.KEY_PREFIX + key, value, ex=self._ttl)
+
+            if not self._is_legacy_removed:
+                pipeline.unlink(GlyphCache.LEGACY_REDIS_KEY)
+
+            pipeline.execute()
+            self._is_legacy_removed = True
+        except redis.RedisError as e:
+            self._disable(e)
@@ -1,12 +1,15 @@
 import logging
+from bisect import bisect_left
 from typing import List, Optional, Tuple, TYPE_CHECKING, Union
 
+import numpy as np
 import pymupdf
 
 from services.analysis import AnalysisMatch
 from services.analysis.annot_content import get_annot_title_content, get_multiple_get_annot_title_content
 from services.analysis.pdf.char import Char
-from services.analysis.pdf.pua_map import PuaMap
+from services.analysis.pdf.collected_page import CollectedPage
+from services.analysis.pdf.pua_map import PuaGlyph, PuaMap
 from services.fulltext_search.search_match import FTSTextMatch
 
 logger = logging.getLogger(__name__)
@@ -29,7 +32,12 @@ class PageAnalyser:
         self.page: 'pymupdf.Page' = page
         self.pua_map: PuaMap = pua_map
         self.highlight_color: Tuple[float, float, float] = highlight_color
+        # collected chars not packed yet
         self._chars: List[Char] = []
+        # packed chars: text and (len(text), 4) float32 bboxes, NaN rows for chars without bbox
+        self._text: str = ''
+        self._bboxes: np.ndarray = np.empty((0, 4), dtype=np.float32)
+        # sorted char indices after which a line is wrapped
         self._wrap_indices: List[int] = []
         self._last_y: Optional[float] = None
         self._is_first_char: bool = True
@@ -53,12 +61,64 @@ class PageAnalyser:
         self._is_first_char = False
 
     def get_chars(self) -> List[Char]:
-        return self._chars
+        self._pack()
+
+        return [
+            Char(char=char_str, bbox=bbox.tolist() if not np.isnan(bbox[0]) else None)
+            for char_str, bbox in zip(self._text, self._bboxes)
+        ]
+
+    def _chars_count(self) -> int:
+        return len(self._text) + len(self._chars)
+
+    def _last_char_str(self) -> Optional[str]:
+        if self._chars:
+            return self._chars[-1].char
+
+        return self._text[-1] if self._text else None
+
+    def _pack(self) -> None:
+        """
+        Переносит собранные Char в компактные text + bboxes.
+        """
+        if not self._chars:
+            return
+
+        bboxes = np.full((len(self._chars), 4), np.nan, dtype=np.float32)
+
+        for i, char in enumerate(self._chars):
+            if char.bbox and len(char.bbox) >= 4:
+                bboxes[i] = char.bbox[:4]
+
+        self._text += ''.join(char.char for char in self._chars)
+        self._bboxes = np.concatenate((self._bboxes, bboxes)) if len(self._bboxes) else bboxes
+        self._chars = []
 
     def collect(self) -> None:
         """
         Собирает символы из страницы PDF.
         """
+        # unknown PUA chars are resolved for the whole page at once
+        pua_chars: List[Char] = []
+        pua_glyphs: List[PuaGlyph] = []
+
+        self._collect_raw_dict(pua_chars, pua_glyphs)
+
+        if pua_glyphs:
+            for char_obj, char_str in zip(pua_chars, self.pua_map.resolve_page(self.page, pua_glyphs)):
+                char_obj.char = char_str
+
+        self._pack()
+
+    def collect_layout(self) -> None:
+        """
+        Собирает символы без распознавания PUA-глифов, для подсветки по готовым диапазонам.
+        Индексы и bbox символов те же, что после collect(): глиф всегда занимает один символ.
+        """
+        self._collect_raw_dict([], [])
+        self._pack()
+
+    def _collect_raw_dict(self, pua_chars: List[Char], pua_glyphs: List[PuaGlyph]) -> None:
         raw_dict = self.page.get_text("rawdict")
 
         for block in raw_dict['blocks']:
@@ -74,7 +134,12 @@ class PageAnalyser:
                     font_name = span.get('font', '')
 
                     for j, char in enumerate(span['chars']):
-                        char_str = self.pua_map.char_to_str(char, font_name, self.page)
+                        char_str = self.pua_map.lookup(char, font_name)
+                        is_pua_pending = char_str is None
+
+                        if is_pua_pending:
+                            char_str = char.get('c', '')
+
                         bbox = char.get('bbox', [])
 
                         # if line ends with a hyphen then it is a word wrap
@@ -83,26 +148,58 @@ class PageAnalyser:
                         if char_str in WRAP_HYPHEN_CHARS and is_last_span and is_last_char_in_span:
                             has_wrap = True
 
-                            if self._chars:
-                                self._wrap_indices.append(len(self._chars) - 1)
+                            if self._chars_count():
+                                self._wrap_indices.append(self._chars_count() - 1)
 
                             continue
 
                         # add char into collected text
                         char_obj = Char(char=char_str, bbox=bbox)
                         self.add_char(char_obj)
+
+                        if is_pua_pending:
+                            pua_chars.append(char_obj)
+                            pua_glyphs.append((char, font_name))
                 # [end]
 
                 # [start] add space as lines separator
                 is_last_line = i == len(block['lines']) - 1
 
-                if not has_wrap and not is_last_line and self._chars:
-                    last_char = self._chars[-1]
-
-                    if last_char.char != ' ':
+                if not has_wrap and not is_last_line and self._chars_count():
+                    if self._last_char_str() != ' ':
                         self.add_char(Char(' '))
                 # [end]
 
+    def export(self, page_num: int) -> CollectedPage:
+        """
+        Упаковывает собранные символы в компактный CollectedPage для передачи между процессами.
+        """
+        self._pack()
+
+        return CollectedPage(
+            page_num=page_num,
+            text=self._text,
+            bboxes=self._bboxes,
+            wrap_indices=np.array(self._wrap_indices, dtype=np.int32),
+        )
+
+    @staticmethod
+    def from_collected(
+        page: 'pymupdf.Page',
+        pua_map: PuaMap,
+        highlight_color: Tuple[float, float, float],
+        collected: CollectedPage,
+    ) -> 'PageAnalyser':
+        """
+        Восстанавливает PageAnalyser из результата collect(), выполненного в другом процессе.
+        """
+        page_analyser = PageAnalyser(page=page, pua_map=pua_map, highlight_color=highlight_color)
+        page_analyser._text = collected.text
+        page_analyser._bboxes = collected.bboxes
+        page_analyser._wrap_indices = collected.wrap_indices.tolist()
+
+        return page_analyser
+
     def to_text(self) -> str:
         """
         Выполняет простую склейку всех символов в готовый текст.
@@ -110,7 +207,9 @@ class PageAnalyser:
         Returns:
             Склеенный текст из всех символов
         """
-        return ''.join(char_obj.char for char_obj in self._chars)
+        self._pack()
+
+        return self._text
 
     def normalize(self) -> str:
         return self.to_text()
@@ -131,58 +230,74 @@ class PageAnalyser:
             match: match details
             color: RGB (0..1) for this highlight; if None use instance default
         """
-        if not self._chars:
+        title, content = "", ""
+
+        if isinstance(match, AnalysisMatch):
+            title, content = get_annot_title_content(match)
+        elif isinstance(match, List):
+            title, content = get_multiple_get_annot_title_content(matches=match)
+
+        self.add_highlight(start, end, color, title, content)
+
+    def add_highlight(
+        self,
+        start: int,
+        end: int,
+        color: Optional[Tuple[float, float, float]],
+        title: str,
+        content: str,
+    ) -> None:
+        """
+        Добавляет аннотацию выделения с готовыми заголовком и текстом.
+
+        Args:
+            start: Начальный индекс символа (включительно)
+            end: Конечный индекс символа (включительно)
+            color: RGB (0..1) for this highlight; if None use instance default
+            title: Заголовок аннотации
+            content: Текст аннотации
+        """
+        self._pack()
+
+        if not self._text:
             return
 
         stroke_color: Tuple[float, float, float] = color if color is not None else self.highlight_color
 
         # [start] validate and clamp range
         start = max(0, start)
-        end = min(len(self._chars) - 1, end)
+        end = min(len(self._text) - 1, end)
 
         if start > end:
             return
         # [end]
 
         # [start] split range by word wraps
-        wrap_index = next((i for i in self._wrap_indices if start <= i < end), None)
+        wrap_pos = bisect_left(self._wrap_indices, start)
 
-        if wrap_index is not None:
-            self.highlight_range(start, wrap_index, match, color)
-            self.highlight_range(wrap_index + 1, end, None, color)
+        if wrap_pos < len(self._wrap_indices) and self._wrap_indices[wrap_pos] < end:
+            wrap_index = self._wrap_indices[wrap_pos]
+            self.add_highlight(start, wrap_index, color, title, content)
+            self.add_highlight(wrap_index + 1, end, color, "", "")
 
             return
         # [end]
 
         # [start] collect valid bboxes from range
-        valid_chars: List[Char] = []
-
-        for i in range(start, end + 1):
-            char = self._chars[i]
-
-            if char.bbox and len(char.bbox) >= 4:
-                valid_chars.append(char)
+        bboxes = self._bboxes[start:end + 1]
+        bboxes = bboxes[~np.isnan(bboxes[:, 0])]
         # [end]
 
-        if not valid_chars:
+        if len(bboxes) == 0:
             return
 
         # [start] calculate bounding rect
-        x0 = min(char.bbox[0] for char in valid_chars)
-        y0 = min(char.bbox[1] for char in valid_chars)
-        x1 = max(char.bbox[2] for char in valid_chars)
-        y1 = max(char.bbox[3] for char in valid_chars)
+        x0, y0 = bboxes[:, :2].min(axis=0).tolist()
+        x1, y1 = bboxes[:, 2:].max(axis=0).tolist()
         # [end]
 
         rect = pymupdf.Rect(x0, y0, x1, y1)
         annot: pymupdf.Annot = self.page.add_highlight_annot(rect)
         annot.set_colors(stroke=stroke_color)
-        title, content = "", ""
-
-        if isinstance(match, AnalysisMatch):
-            title, content = get_annot_title_content(match)
-        elif isinstance(match, List):
-            title, content = get_multiple_get_annot_title_content(matches=match)
-
         annot.set_info({"title": title, "content": content})
         annot.update()
@@ -0,0 +1,129 @@
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Deque, Iterator, List, Optional, Tuple
+
+import pymupdf
+
+from services.analysis.pdf.collected_page import CollectedPage
+from services.analysis.pdf.page_analyser import PageAnalyser
+from services.analysis.pdf.pua_map import PuaMap
+from services.utils.worker_processes import get_spawn_context, get_worker_processes
+
+# PuaMap of a worker process, reused by all chunks the worker collects
+_worker_pua_map: Optional[PuaMap] = None
+
+
+def _collect_chunk(
+    source_path: str,
+    page_nums: List[int],
+    highlight_color: Tuple[float, float, float],
+) -> List[CollectedPage]:
+    """Worker: opens the document itself and collects given pages."""
+    global _worker_pua_map
+
+    if _worker_pua_map is None:
+        _worker_pua_map = PuaMap()
+
+    collected: List[CollectedPage] = []
+
+    with pymupdf.open(source_path) as document:
+        for page_num in page_nums:
+            page_analyser = PageAnalyser(
+                page=document.load_page(page_num),
+                pua_map=_worker_pua_map,
+                highlight_color=highlight_color,
+            )
+            page_analyser.collect()
+            collected.append(page_analyser.export(page_num))
+
+    return collected
+
+
+class PageCollector:
+    """
+    Collects PDF pages (rawdict text + PUA mapping) in a process pool.
+
+    Pages are yielded in document order as PageAnalyser objects bound to the
+    caller's document, so highlighting works as with serial collect(). Only
+    a few chunks are in flight at once, consumers may stream the pages.
+    Small documents and PDF_COLLECT_WORKERS=1 are collected in-process. By
+    default CPUs are divided between the tasks of the executor, so concurrent
+    tasks do not oversubscribe the host.
+    """
+
+    WORKERS_ENV: str = "PDF_COLLECT_WORKERS"
+    PARALLEL_MIN_PAGES: int = 32
+    CHUNK_PAGES: int = 8
+    # chunks submitted per worker ahead of the consumer
+    PREFETCH_CHUNKS: int = 2
+
+    def __init__(
+        self,
+        document: pymupdf.Document,
+        source_path: str,
+        pua_map: PuaMap,
+        highlight_color: Tuple[float, float, float],
+    ) -> None:
+        self._document: pymupdf.Document = document
+        self._source_path: str = source_path
+        self._pua_map: PuaMap = pua_map
+        self._highlight_color: Tuple[float, float, float] = highlight_color
+
+    @staticmethod
+    def get_workers_count(pages_count: int) -> int:
+        if pages_count < PageCollector.PARALLEL_MIN_PAGES:
+            return 1
+
+        return get_worker_processes(PageCollector.WORKERS_ENV)
+
+    def iter_pages(self, page_nums: List[int]) -> Iterator[PageAnalyser]:
+        workers_count: int = PageCollector.get_workers_count(len(page_nums))
+
+        if workers_count == 1:
+            yield from self._iter_serial(page_nums)
+        else:
+            yield from self._iter_parallel(page_nums, workers_count)
+
+    def _iter_serial(self, page_nums: List[int]) -> Iterator[PageAnalyser]:
+        for page_num in page_nums:
+            page_analyser = PageAnalyser(
+                page=self._document.load_page(page_num),
+                pua_map=self._pua_map,
+                highlight_color=self._highlight_color,
+            )
+            page_analyser.collect()
+
+            yield page_analyser
+
+    def _iter_parallel(self, page_nums: List[int], workers_count: int) -> Iterator[PageAnalyser]:
+        chunks: List[List[int]] = [
+            page_nums[i:i + PageCollector.CHUNK_PAGES]
+            for i in range(0, len(page_nums), PageCollector.CHUNK_PAGES)
+        ]
+        max_in_flight: int = workers_count * PageCollector.PREFETCH_CHUNKS
+        in_flight: Deque[Future] = deque()
+        next_chunk: int = 0
+
+        # spawn: forking a process with app threads (socketio, executor) is unsafe
+        with ProcessPoolExecutor(
+            max_workers=min(workers_count, len(chunks)),
+            mp_context=get_spawn_context(),
+        ) as executor:
+            while next_chunk < len(chunks) or in_flight:
+                while next_chunk < len(chunks) and len(in_flight) < max_in_flight:
+                    in_flight.append(executor.submit(
+                        _collect_chunk,
+                        self._source_path,
+                        chunks[next_chunk],
+                        self._highlight_color,
+                    ))
+                    next_chunk += 1
+
+                # futures are consumed in submit order, so pages keep document order
+                for collected in in_flight.popleft().result():
+                    yield PageAnalyser.from_collected(
+                        page=self._document.load_page(collected.page_num),
+                        pua_map=self._pua_map,
+                        highlight_color=self._highlight_color,
+                        collected=collected,
+                    )
@@ -1,23 +1,39 @@
+import hashlib
 import logging
-import io
 import pymupdf
+import numpy as np
 from PIL import Image
-from typing import Optional, Dict, Tuple
-from services.ocr_service import setup_tesseract_path, ocr_single_character
+from typing import Optional, Dict, List, Tuple
+from services.analysis.pdf.glyph_cache import GlyphCache
+from services.ocr_service import setup_tesseract_path, ocr_characters_strip
 
 setup_tesseract_path()
 
 logger = logging.getLogger(__name__)
 
+# (char dict from rawdict, font name)
+PuaGlyph = Tuple[Dict, str]
+
 
 class PuaMap:
     """
     Класс для маппинга PUA (Private Use Area) символов Unicode.
     Хранит маппинг <шрифт>+<код символа> -> распознанный символ.
+
+    Неизвестные символы страницы распознаются пачкой (resolve_page):
+    сначала ищутся в постоянном GlyphCache по шрифту и хешу изображения
+    глифа, промахи распознаются одним вызовом Tesseract. В GlyphCache
+    сохраняются только однозначные чтения (одна рамка Tesseract на глиф).
     """
 
-    def __init__(self) -> None:
+    # масштаб рендеринга глифа для OCR
+    GLYPH_ZOOM: int = 3
+    # порог бинаризации отпечатка глифа (0..255)
+    GLYPH_INK_THRESHOLD: int = 128
+
+    def __init__(self, glyph_cache: Optional[GlyphCache] = None) -> None:
         self._mapping: Dict[Tuple[str, int], str] = {}
+        self._glyph_cache: GlyphCache = glyph_cache if glyph_cache is not None else GlyphCache.get_instance()
 
     @staticmethod
     def _is_pua_char(char: str) -> bool:
@@ -31,18 +47,19 @@ class PuaMap:
 
         return 0xE000 <= code <= 0xF8FF
 
-    def char_to_str(self, char: Dict, font_name: str, page: pymupdf.Page) -> str:
+    @staticmethod
+    def _font_key(font_name: str) -> str:
         """
-        Преобразует символ из PDF в строку.
-        Если символ PUA и не найден в кэше - выполняет OCR и сохраняет результат.
+        Имя шрифта без префикса подмножества (ABCDEF+Font), общее для разных документов.
+        """
+        prefix, sep, name = font_name.partition('+')
 
-        Args:
-            char: Словарь символа из PDF с ключами 'c' (символ) и 'bbox' (координаты)
-            font_name: Имя шрифта
-            page: Страница PDF для выполнения OCR
+        return name if sep and len(prefix) == 6 else font_name
 
-        Returns:
-            Распознанный символ или исходный символ, если не PUA
+    def lookup(self, char: Dict, font_name: str) -> Optional[str]:
+        """
+        Возвращает строку для обычного или уже известного символа.
+        None - неизвестный PUA символ, который нужно распознать через resolve_page.
         """
         char_value = char.get('c', '')
 
@@ -50,35 +67,123 @@ class PuaMap:
         if not self._is_pua_char(char_value):
             return char_value
 
-        # [start] get char from maps
-        char_code = ord(char_value[0])
-        cache_key = (font_name, char_code)
+        return self._mapping.get((font_name, ord(char_value[0])))
+
+    def _render_glyph(self, page: pymupdf.Page, bbox: List[float]) -> Image.Image:
+        x0, y0, x1, y1 = bbox
+        pix = page.get_pixmap(
+            clip=pymupdf.Rect(x0, y0, x1, y1),
+            matrix=pymupdf.Matrix(PuaMap.GLYPH_ZOOM, PuaMap.GLYPH_ZOOM),
+            colorspace=pymupdf.csGRAY,
+            alpha=False,
+        )
+
+        return Image.frombytes('L', (pix.width, pix.height), pix.samples)
+
+    @staticmethod
+    def _fingerprint(img: Image.Image) -> str:
+        """
+        Хеш глифа, не зависящий от положения символа на странице: бинаризованное изображение, обрезанное по краске.
+        """
+        ink = np.asarray(img) < PuaMap.GLYPH_INK_THRESHOLD
+        rows = np.flatnonzero(ink.any(axis=1))
+        cols = np.flatnonzero(ink.any(axis=0))
+
+        if len(rows) == 0:
+            return 'blank'
+
+        ink = ink[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+        digest = hashlib.sha1(np.packbits(ink, axis=1).tobytes()).hexdigest()
+
+        return f'{ink.shape[0]}x{ink.shape[1]}:{digest}'
+
+    def resolve_page(self, page: pymupdf.Page, glyphs: List[PuaGlyph]) -> List[str]:
+        """
+        Распознает неизвестные PUA символы одной страницы.
+
+        Args:
+            page: Страница PDF для рендеринга глифов
+            glyphs: (символ из rawdict, имя шрифта) для каждого символа
 
-        if cache_key in self._mapping:
-            return self._mapping[cache_key]
+        Returns:
+            Строка для каждого символа; нераспознанные символы остаются как есть
+        """
+        # [start] unique unknown glyphs of the page
+        to_resolve: Dict[Tuple[str, int], Dict] = {}
+
+        for char, font_name in glyphs:
+            char_value = char.get('c', '')
+
+            if self.lookup(char, font_name) is None:
+                to_resolve.setdefault((font_name, ord(char_value[0])), char)
         # [end]
 
-        # [start] try ocr to get unknown char
-        bbox = char.get('bbox', [])
+        # [start] fingerprint glyphs and look them up in persistent cache
+        images: Dict[Tuple[str, int], Image.Image] = {}
+        cache_keys: Dict[Tuple[str, int], str] = {}
 
-        if len(bbox) != 4:
-            return char_value
+        for cache_key, char in to_resolve.items():
+            bbox = char.get('bbox', [])
 
-        x0, y0, x1, y1 = bbox
-        char_rect = pymupdf.Rect(x0, y0, x1, y1)
-        pix = page.get_pixmap(clip=char_rect, matrix=pymupdf.Matrix(3, 3))
+            if len(bbox) != 4:
+                continue
+
+            images[cache_key] = self._render_glyph(page, bbox)
+            cache_keys[cache_key] = f'{self._font_key(cache_key[0])}:{self._fingerprint(images[cache_key])}'
 
-        img_bytes = pix.tobytes("png")
-        img_pil = Image.open(io.BytesIO(img_bytes))
+        cached: Dict[str, str] = self._glyph_cache.get_many(set(cache_keys.values()))
+        # [end]
 
-        ocr_char = ocr_single_character(img_pil, languages='rus')
+        # [start] ocr cache misses in one call
+        misses: List[Tuple[str, int]] = [key for key in images if cache_keys[key] not in cached]
+        ocr_boxes: List[List[str]] = ocr_characters_strip([images[key] for key in misses], languages='rus')
+        recognized: Dict[str, str] = {}
+        confident: Dict[str, str] = {}
 
-        if ocr_char:
-            self._mapping[cache_key] = ocr_char
+        for cache_key, box_chars in zip(misses, ocr_boxes):
+            if box_chars:
+                recognized[cache_keys[cache_key]] = box_chars[0]
 
-            return ocr_char
+            # a glyph read as several boxes is a guess, it stays in this document only
+            if len(box_chars) == 1:
+                confident[cache_keys[cache_key]] = box_chars[0]
 
-        self._mapping[cache_key] = char_value
+        self._glyph_cache.put_many(confident)
+        cached.update(recognized)
         # [end]
 
-        return char_value
+        for cache_key, char in to_resolve.items():
+            if cache_key not in cache_keys:
+                # no bbox to render: keep the char, next occurrence may have one
+                continue
+
+            self._mapping[cache_key] = cached.get(cache_keys[cache_key], char.get('c', ''))
+
+        result: List[str] = []
+
+        for char, font_name in glyphs:
+            char_value = char.get('c', '')
+            mapped = self.lookup(char, font_name)
+            result.append(mapped if mapped is not None else char_value)
+
+        return result
+
+    def char_to_str(self, char: Dict, font_name: str, page: pymupdf.Page) -> str:
+        """
+        Преобразует символ из PDF в строку.
+        Если символ PUA и не найден в кэше - распознает его и сохраняет результат.
+
+        Args:
+            char: Словарь символа из PDF с ключами 'c' (символ) и 'bbox' (координаты)
+            font_name: Имя шрифта
+            page: Страница PDF для выполнения OCR
+
+        Returns:
+            Распознанный символ или исходный символ, если не PUA
+        """
+        mapped = self.lookup(char, font_name)
+
+        if mapped is not None:
+            return mapped
+
+        return self.resolve_page(page, [(char, font_name)])[0]
@@ -0,0 +1,69 @@
+import json
+from dataclasses import dataclass, field
+from typing import ClassVar, List, Tuple
+
+# (page number, first char, last char, rgb color, title, content), chars of the page text
+PdfAnnot = Tuple[int, int, int, Tuple[float, float, float], str, str]
+# (char ranges of a match relative to the segment, hex color)
+DocxRange = Tuple[List[Tuple[int, int]], str]
+# (indices of the commented ranges, author, text)
+DocxComment = Tuple[List[int], str, str]
+
+
+@dataclass
+class DocxSegmentPlan:
+    segment_idx: int
+    ranges: List[DocxRange] = field(default_factory=list)
+    comments: List[DocxComment] = field(default_factory=list)
+
+
+@dataclass
+class RenderPlan:
+    """
+    Highlights planned from the matches of a document.
+
+    Holds everything the result file needs, so it is rendered from the source
+    later without loading the lists and searching again: the result always
+    shows the matches of the stored stats.
+    """
+
+    FORMAT_VERSION: ClassVar[int] = 1
+
+    pdf_annots: List[PdfAnnot] = field(default_factory=list)
+    docx_segments: List[DocxSegmentPlan] = field(default_factory=list)
+
+    def save(self, path: str) -> None:
+        data = {
+            'version': RenderPlan.FORMAT_VERSION,
+            'pdf_annots': self.pdf_annots,
+            'docx_segments': [
+                [segment.segment_idx, segment.ranges, segment.comments]
+                for segment in self.docx_segments
+            ],
+        }
+
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    @staticmethod
+    def load(path: str) -> 'RenderPlan':
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        if data.get('version') != RenderPlan.FORMAT_VERSION:
+            raise ValueError(f"Unsupported render plan version: {data.get('version')}")
+
+        return RenderPlan(
+            pdf_annots=[
+                (page_num, start, end, tuple(color), title, content)
+                for page_num, start, end, color, title, content in data['pdf_annots']
+            ],
+            docx_segments=[
+                DocxSegmentPlan(
+                    segment_idx=segment_idx,
+                    ranges=[([tuple(r) for r in ranges], color) for ranges, color in segment_ranges],
+                    comments=[(indices, author, text) for indices, author, text in segment_comments],
+                )
+                for segment_idx, segment_ranges, segment_comments in data['docx_segments']
+            ],
+        )
@@ -0,0 +1,126 @@
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from services.utils.get_project_root import get_project_root
+
+# (kind, rules version, name)
+DeclensionKey = Tuple[str, str, str]
+
+
+class DeclensionCache:
+    """
+    Persistent cross-process name -> declined forms cache in a SQLite file.
+
+    Keyed by kind (surname / full name), version of the declension rules
+    (see BatchDeclension) and normalized name, so changed rules or an upgraded
+    library never reuse old forms. Recently used entries are kept in an in-process LRU in front of the file.
+    One connection per process (re-opened after fork), guarded by a lock.
+    """
+
+    FORMAT_VERSION: int = 2
+    PATH_ENV: str = "DECLENSION_CACHE_PATH"
+    # keep below SQLite host parameters limit
+    QUERY_CHUNK_SIZE: int = 500
+    LRU_SIZE: int = 50000
+
+    KIND_SURNAME: str = "surname"
+    KIND_FULL_NAME: str = "full_name"
+
+    _instance: Optional['DeclensionCache'] = None
+
+    def __init__(self, path: Path) -> None:
+        self._path: Path = path
+        self._lock: threading.Lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._lru: OrderedDict[DeclensionKey, List[str]] = OrderedDict()
+
+    @staticmethod
+    def get_instance() -> 'DeclensionCache':
+        if DeclensionCache._instance is None:
+            default_path: Path = get_project_root() / "cache" / f"declension_cache.v{DeclensionCache.FORMAT_VERSION}.sqlite3"
+            DeclensionCache._instance = DeclensionCache(Path(os.environ.get(DeclensionCache.PATH_ENV, default_path)))
+
+        return DeclensionCache._instance
+
+    def _get_connection(self) -> sqlite3.Connection:
+        if self._connection is not None and self._pid == os.getpid():
+            return self._connection
+
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        connection: sqlite3.Connection = sqlite3.connect(str(self._path), timeout=30, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS declension ("
+            "kind TEXT NOT NULL, version TEXT NOT NULL, name TEXT NOT NULL, forms TEXT NOT NULL, "
+            "PRIMARY KEY (kind, version, name))"
+        )
+        connection.commit()
+
+        self._connection = connection
+        self._pid = os.getpid()
+
+        return connection
+
+    def _remember(self, key: DeclensionKey, forms: List[str]) -> None:
+        self._lru[key] = forms
+        self._lru.move_to_end(key)
+
+        if len(self._lru) > DeclensionCache.LRU_SIZE:
+            self._lru.popitem(last=False)
+
+    def get_many(self, kind: str, version: str, names: Iterable[str]) -> Dict[str, List[str]]:
+        """Returns cached forms for known names; unknown names are absent."""
+        found: Dict[str, List[str]] = {}
+        misses: List[str] = []
+
+        with self._lock:
+            for name in set(names):
+                key: DeclensionKey = (kind, version, name)
+                forms: Optional[List[str]] = self._lru.get(key)
+
+                if forms is None:
+                    misses.append(name)
+                else:
+                    self._lru.move_to_end(key)
+                    found[name] = forms
+
+            if len(misses) == 0:
+                return found
+
+            connection: sqlite3.Connection = self._get_connection()
+
+            for i in range(0, len(misses), DeclensionCache.QUERY_CHUNK_SIZE):
+                chunk: List[str] = misses[i:i + DeclensionCache.QUERY_CHUNK_SIZE]
+                placeholders: str = ",".join("?" * len(chunk))
+                rows = connection.execute(
+                    f"SELECT name, forms FROM declension WHERE kind = ? AND version = ? AND name IN ({placeholders})",
+                    [kind, version, *chunk],
+                )
+
+                for name, forms_json in rows:
+                    found[name] = json.loads(forms_json)
+                    self._remember((kind, version, name), found[name])
+
+        return found
+
+    def put_many(self, kind: str, version: str, items: Dict[str, List[str]]) -> None:
+        if len(items) == 0:
+            return
+
+        with self._lock:
+            connection: sqlite3.Connection = self._get_connection()
+            connection.executemany(
+                "INSERT OR REPLACE INTO declension (kind, version, name, forms) VALUES (?, ?, ?, ?)",
+                [(kind, version, name, json.dumps(forms, ensure_ascii=False)) for name, forms in items.items()],
+            )
+            connection.commit()
+
+            for name, forms in items.items():
+                self._remember((kind, version, name), forms)
@@ -0,0 +1,112 @@
+import functools
+import hashlib
+from importlib.metadata import version as package_version
+from pathlib import Path
+from types import ModuleType
+from typing import Dict, Iterable, List, Optional
+
+from services.declension_name import declension as full_name_declension
+from services.declension_name import person_name
+from services.declension_name.declension import Declension
+from services.declension_name.declension_cache import DeclensionCache
+from services.fulltext_search.phrase import EType
+from services.fulltext_search.strategies.surname_strategy import declension as surname_declension
+from services.fulltext_search.strategies.surname_strategy import surname as surname_module
+from services.fulltext_search.strategies.surname_strategy.surname import Surname
+from services.utils import normalize_text
+
+
+class BatchDeclension:
+    """
+    Declines surnames and full names in bulk through the persistent DeclensionCache.
+
+    Names are keyed by normalize_text(); only cache misses are declined
+    (rule-based for surnames, Petrovich for full names) and written back.
+    Cache entries are versioned by a hash of the rule modules and the
+    Petrovich version.
+    """
+
+    def __init__(self, cache: Optional[DeclensionCache] = None) -> None:
+        self._cache: DeclensionCache = cache if cache is not None else DeclensionCache.get_instance()
+        self._declension: Optional[Declension] = None
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def rules_version(kind: str) -> str:
+        """Hash of the sources (and library version) the forms of `kind` are computed by."""
+        modules: List[ModuleType] = (
+            [surname_module, surname_declension]
+            if kind == DeclensionCache.KIND_SURNAME
+            else [full_name_declension, person_name]
+        )
+        digest = hashlib.sha1()
+
+        for module in modules:
+            digest.update(Path(module.__file__).read_bytes())
+
+        if kind == DeclensionCache.KIND_FULL_NAME:
+            digest.update(package_version("petrovich").encode("utf-8"))
+
+        return digest.hexdigest()[:16]
+
+    def _get_declension(self) -> Declension:
+        if self._declension is None:
+            self._declension = Declension()
+
+        return self._declension
+
+    def surname_forms(self, surnames: Iterable[str]) -> Dict[str, List[str]]:
+        """
+        Returns {normalized surname: sorted normalized forms of both genders}, as Surname.normalized_forms().
+        """
+        names: set[str] = {normalize_text(surname) for surname in surnames}
+        version: str = BatchDeclension.rules_version(DeclensionCache.KIND_SURNAME)
+        found: Dict[str, List[str]] = self._cache.get_many(DeclensionCache.KIND_SURNAME, version, names)
+        computed: Dict[str, List[str]] = {
+            name: sorted(Surname(name).normalized_forms())
+            for name in names
+            if name not in found
+        }
+
+        self._cache.put_many(DeclensionCache.KIND_SURNAME, version, computed)
+        found.update(computed)
+
+        return found
+
+    def full_name_forms(self, full_names: Iterable[str]) -> Dict[str, List[str]]:
+        """
+        Returns {normalized full name: Declension.decline_full_name() forms}.
+        """
+        names: set[str] = {normalize_text(full_name) for full_name in full_names}
+        version: str = BatchDeclension.rules_version(DeclensionCache.KIND_FULL_NAME)
+        found: Dict[str, List[str]] = self._cache.get_many(DeclensionCache.KIND_FULL_NAME, version, names)
+        computed: Dict[str, List[str]] = {
+            name: self._get_declension().decline_full_name(name)
+            for name in names
+            if name not in found
+        }
+
+        self._cache.put_many(DeclensionCache.KIND_FULL_NAME, version, computed)
+        found.update(computed)
+
+        return found
+
+    def prepare_search_terms(self, search_terms: Optional[Iterable[dict]]) -> None:
+        """
+        Fills the cache for surname and full name terms ({text, type} dicts) of a list record.
+        Called where search_terms are written, so search tasks only read the cache.
+        """
+        surnames: List[str] = []
+        full_names: List[str] = []
+
+        for term in search_terms or []:
+            if not isinstance(term, dict) or not term.get("text"):
+                continue
+
+            if term.get("type") == EType.SURNAME.value:
+                surnames.append(term["text"])
+            elif term.get("type") == EType.FULL_NAME.value:
+                full_names.append(term["text"])
+
+        self.surname_forms(surnames)
+        self.full_name_forms(full_names)
@@ -1,11 +1,12 @@
 from enum import Enum
-from typing import List, Optional, Tuple, Union, Dict
+from functools import partial
+from typing import Callable, List, Optional, Tuple, Union, Dict
 
 from services.fulltext_search.phrase import EType, Phrase
 from services.fulltext_search.strategies.full_name_strategy import FullNameStrategy
 from services.progress.combined_progress.combined_progress import CombinedProgress
 from services.pymorphy_service import CYRILLIC_PATTERN
-from services.tokenization import Token, TokenDictionary
+from services.tokenization import Token, TokenDictionary, TokenSequence
 from services.tokenization.tokenizer import Tokenizer
 from services.utils.regex_pattern import RegexPattern
 from services.fulltext_search.search_match import FTSMatch
@@ -13,6 +14,10 @@ from services.fulltext_search.strategies import (
     FuzzyWordsPunctStrategy,
     SurnameStrategy,
 )
+from services.fulltext_search.strategies.base_strategy import BaseSearchStrategy
+# after strategies: prefilter depends on the surname declension they import
+from services.fulltext_search.phrase_prefilter import PhrasePrefilter
+from services.fulltext_search.sharded_search import ShardedSearch
 
 USE_STEM_FALLBACK = True
 STOP_WORDS_RU = {
@@ -53,12 +58,18 @@ class SearchStrategy(Enum):
     FULL_NAME = "full_name"
 
 
+# (progress total, run(on_source_token_proceed) -> strategy results)
+StrategyJob = Tuple[int, Callable[[Callable[[int, int], None]], List[Tuple[Union[Phrase, str], List[FTSMatch]]]]]
+
+
 class FulltextSearch:
     """
     Implements fulltext search algorithms.
 
     Provides methods for text tokenization and matching
     by words and phrases using lemmatization and stemming.
+
+    Large token streams are searched in shards by a process pool (see ShardedSearch).
     """
 
     _default_strategy = FuzzyWordsPunctStrategy()
@@ -67,25 +78,26 @@ class FulltextSearch:
 
     def __init__(
         self,
-        source: Union[str, List[Token]],
+        source: Union[str, TokenSequence],
         combined_progress: Optional[CombinedProgress] = None,
     ):
         """
         Initialize FulltextSearch with source text or tokens.
 
         Args:
-            source: Source text (str) or list of tokens to search in
+            source: Source text (str), list of tokens or TokenStream to search in
             combined_progress: When source is str, passed to Tokenizer for particle progress
         """
         self._tokenizer: Tokenizer = Tokenizer(combined_progress)
         self._progress: Optional[CombinedProgress] = combined_progress
 
         if isinstance(source, str):
-            self.source_tokens: List[Token] = self._tokenizer.tokenize_text(source)
+            self.source_tokens: TokenSequence = self._tokenizer.tokenize_stream(source)
         else:
-            self.source_tokens: List[Token] = source
+            self.source_tokens: TokenSequence = source
 
         self.dictionary: TokenDictionary = TokenDictionary(self.source_tokens)
+        self.prefilter: PhrasePrefilter = PhrasePrefilter(self.source_tokens, self.dictionary)
 
     @staticmethod
     def _get_strategy(strategy: Optional[SearchStrategy] = None):
@@ -125,6 +137,7 @@ class FulltextSearch:
         search_phrases: List[Tuple[Phrase, Union[str, List[Token]]]],
         search_patterns: Optional[Dict[str, RegexPattern]] = None,
         text_strategy: Optional[SearchStrategy] = None,
+        prefiltered: bool = False,
     ) -> List[Tuple[Union[Phrase, str], List[FTSMatch]]]:
         self._update_progress_value(0)
         """
@@ -134,6 +147,7 @@ class FulltextSearch:
             search_phrases: List of (phrase, text_or_tokens) tuples
             text_strategy: Search strategy for Phrases with type TEXT (default: FUZZY_WORDS_PUNCT)
             search_patterns: Optional dictionary of {pattern_name: RegexPattern} for regex-based search
+            prefiltered: Phrases were already filtered by self.prefilter, skip filtering them again
 
         Returns:
             List of (phrase or str, matches) tuples where matches is list of FTSMatch objects
@@ -161,6 +175,12 @@ class FulltextSearch:
             elif phrase.phrase_type == EType.FULL_NAME and  phrase.source_list.search_full_names:
                 full_name_phrases_tokens.append(pair)
 
+        # drop phrases absent from the document before strategies run
+        if not prefiltered:
+            text_phrases_tokens = self.prefilter.filter(text_phrases_tokens)
+            surname_phrases_tokens = self.prefilter.filter(surname_phrases_tokens)
+            full_name_phrases_tokens = self.prefilter.filter(full_name_phrases_tokens)
+
         phrase_to_matches: Dict[Union[int, str], Tuple[Union[Phrase, str], List[FTSMatch]]] = {}
 
         def _add_matches(phrase: Union[Phrase, str], matches: List[FTSMatch]) -> None:
@@ -176,74 +196,52 @@ class FulltextSearch:
             prev_matches.extend(matches)
             phrase_to_matches[phrase_id] = (phrase, prev_matches)
 
-        def _on_source_token_proceed(proceed, total):
-            if total == 0:
-                self._update_progress_value(value=100)
-                return
-
-            threshold = max(round(total * 0.05), 1)
-
-            if proceed % threshold != 0:
-                return
-
-            self._update_progress_value(value=proceed / total * 100)
-
         patterns: Dict[str, RegexPattern] = search_patterns if search_patterns is not None else {}
 
         # progress total
         text_search_all_phrases_total = len(text_phrases_tokens)
         surnames_search_all_phrases_total = len(self.source_tokens) + len(surname_phrases_tokens)
         full_name_search_all_phrases_total = len(self.source_tokens) + len(full_name_phrases_tokens)
-        progress_total = (
-            + text_search_all_phrases_total
-            + surnames_search_all_phrases_total
-            + full_name_search_all_phrases_total
-        )
+
+        # large streams are searched in shards by a process pool
+        sharded_search: Optional[ShardedSearch] = ShardedSearch.create(self.source_tokens)
+
+        # [start] strategies to run, in results merge order
+        jobs: List[StrategyJob] = []
 
         if len(text_phrases_tokens) > 0 or len(patterns) > 0:
             regex_arg: Optional[Dict[str, RegexPattern]] = patterns if len(patterns) > 0 else None
 
-            text_results: List[Tuple[Union[Phrase, str], List[FTSMatch]]] = (
-                text_strategy_instance.search_all_phrases(
-                    source_tokens=self.source_tokens,
-                    search_phrases=text_phrases_tokens,
-                    dictionary=self.dictionary,
-                    regex_patterns=regex_arg,
-                    on_source_token_proceed=lambda proceed, total: _on_source_token_proceed(proceed, progress_total),
-                )
-            )
-
-            for phrase, matches in text_results:
-                _add_matches(phrase, matches)
+            jobs.append(self._strategy_job(
+                text_strategy_instance,
+                text_phrases_tokens,
+                text_search_all_phrases_total,
+                sharded_search,
+                dictionary=self.dictionary,
+                regex_patterns=regex_arg,
+            ))
 
         if len(surname_phrases_tokens) > 0:
-            surname_results: List[Tuple[Union[Phrase, str], List[FTSMatch]]] = (
-                surname_strategy_instance.search_all_phrases(
-                    source_tokens=self.source_tokens,
-                    search_phrases=surname_phrases_tokens,
-                    on_source_token_proceed=lambda proceed, total: _on_source_token_proceed(
-                        text_search_all_phrases_total + proceed,
-                        progress_total
-                    ),
-                )
-            )
-
-            for phrase, matches in surname_results:
-                _add_matches(phrase, matches)
+            jobs.append(self._strategy_job(
+                surname_strategy_instance,
+                surname_phrases_tokens,
+                surnames_search_all_phrases_total,
+                sharded_search,
+            ))
 
         if len(full_name_phrases_tokens) > 0:
-            full_name_results: List[Tuple[Union[Phrase, str], List[FTSMatch]]] = (
-                full_name_strategy_instance.search_all_phrases(
-                    source_tokens=self.source_tokens,
-                    search_phrases=full_name_phrases_tokens,
-                    on_source_token_proceed=lambda proceed, total: _on_source_token_proceed(
-                        text_search_all_phrases_total + surnames_search_all_phrases_total + proceed,
-                        progress_total
-                    ),
-                )
-            )
+            jobs.append(self._strategy_job(
+                full_name_strategy_instance,
+                full_name_phrases_tokens,
+                full_name_search_all_phrases_total,
+                sharded_search,
+            ))
+        # [end]
+
+        progress_total: int = sum(job_total for job_total, _ in jobs)
 
-            for phrase, matches in full_name_results:
+        for strategy_results in self._run_strategies(jobs, progress_total):
+            for phrase, matches in strategy_results:
                 _add_matches(phrase, matches)
 
         result: List[Tuple[Union[Phrase, str], List[FTSMatch]]] = []
@@ -277,6 +275,71 @@ class FulltextSearch:
         self._update_progress_value(100)
         return result
 
+    def _strategy_job(
+        self,
+        strategy: BaseSearchStrategy,
+        search_phrases: List[Tuple[Phrase, List[Token]]],
+        progress_total: int,
+        sharded_search: Optional[ShardedSearch],
+        **kwargs,
+    ) -> StrategyJob:
+        """Job running the strategy over the whole source or over its shards."""
+        if sharded_search is not None:
+            return progress_total, lambda on_proceed: sharded_search.search_all_phrases(
+                strategy,
+                search_phrases,
+                progress_total,
+                on_source_token_proceed=on_proceed,
+                **kwargs,
+            )
+
+        return progress_total, lambda on_proceed: strategy.search_all_phrases(
+            source_tokens=self.source_tokens,
+            search_phrases=search_phrases,
+            on_source_token_proceed=on_proceed,
+            **kwargs,
+        )
+
+    def _run_strategies(
+        self,
+        jobs: List[StrategyJob],
+        progress_total: int,
+    ) -> List[List[Tuple[Union[Phrase, str], List[FTSMatch]]]]:
+        """
+        Runs strategy jobs one after another, reporting their source token progress as one value.
+
+        Streams below the sharding size are not sent to the shard pool: shipping the stream and
+        phrases to a worker and merging the matches back costs more than the name strategies.
+
+        Returns:
+            Results of every job in the jobs order
+        """
+        # per job proceeded count, finished jobs count as their whole total
+        proceeded: List[int] = [0] * len(jobs)
+
+        def _on_source_token_proceed(job_idx: int, proceed: int, total: int) -> None:
+            proceeded[job_idx] = proceed
+
+            if progress_total == 0:
+                self._update_progress_value(value=100)
+                return
+
+            threshold = max(round(progress_total * 0.05), 1)
+            proceed_total: int = sum(proceeded)
+
+            if proceed_total % threshold != 0:
+                return
+
+            self._update_progress_value(value=proceed_total / progress_total * 100)
+
+        results: List[List[Tuple[Union[Phrase, str], List[FTSMatch]]]] = []
+
+        for job_idx, (job_total, run) in enumerate(jobs):
+            results.append(run(partial(_on_source_token_proceed, job_idx)))
+            proceeded[job_idx] = job_total
+
+        return results
+
     @staticmethod
     def _is_stop_word(lemma: str) -> bool:
         """Checks if lemma is a stop word."""
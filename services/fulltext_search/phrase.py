@@ -15,7 +15,11 @@ class Phrase:
     source_list: "WordsList"
     tokens: List[Token]
     phrase_type: EType
-    model: db.Model
+    # id of the list record model, loaded on first access of model
+    model_id: Optional[int]
+    _model: Optional[db.Model]
+    # precomputed declension surfaces for SURNAME and FULL_NAME phrases
+    declined_forms: Optional[List[str]]
     # full text imagination of search object
 
     def __init__(
@@ -25,13 +29,33 @@ class Phrase:
             phrase_original: Optional[str] = None,
             phrase_type: EType = EType.TEXT,
             model: db.Model = None,
+            tokens: Optional[List[Token]] = None,
+            declined_forms: Optional[List[str]] = None,
+            model_id: Optional[int] = None,
     ) -> None:
         self.source_list = source_list
         self.phrase = phrase
         self.phrase_original = phrase_original
-        self.tokens = Tokenizer(None).tokenize_text(phrase)
+        self.tokens = tokens if tokens is not None else Tokenizer(None).tokenize_text(phrase)
         self.phrase_type = phrase_type
-        self.model = model
+        self._model = model
+        self.model_id = model_id if model_id is not None else getattr(model, 'id', None)
+        self.declined_forms = declined_forms
+
+    @property
+    def model(self) -> Optional[db.Model]:
+        if self._model is None and self.model_id is not None and self.source_list is not None:
+            self.source_list.attach_models([self])
+
+        return self._model
+
+    @model.setter
+    def model(self, model: Optional[db.Model]) -> None:
+        self._model = model
+
+    @property
+    def is_model_loaded(self) -> bool:
+        return self._model is not None or self.model_id is None
 
     def _source_to_serializable(self) -> Optional[str]:
         return self.source_list.key
@@ -0,0 +1,122 @@
+from array import array
+from collections import deque
+from typing import Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+from services.tokenization import Token, TokenSequence, TokenStream
+
+# (phrase index, phrase length in words)
+PhraseOutput = Tuple[int, int]
+
+
+class PhraseAutomaton:
+    """
+    Aho–Corasick automaton over word match keys (see Token.match_key).
+
+    Phrases are compiled once; scan() finds every phrase occurrence in one
+    linear pass over source words, punctuation and spaces are skipped.
+    """
+
+    PROGRESS_STEPS: int = 100
+
+    def __init__(self) -> None:
+        self._goto: List[Dict[Hashable, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._own_outputs: List[List[PhraseOutput]] = [[]]
+        self._outputs: List[List[PhraseOutput]] = []
+        self._is_compiled: bool = False
+        self.phrases_count: int = 0
+
+    def add_phrase(self, phrase_idx: int, search_words: List[Token]) -> 'PhraseAutomaton':
+        """Adds phrase words (WORD tokens only) under given phrase index."""
+        if len(search_words) == 0:
+            return self
+
+        state = 0
+
+        for word in search_words:
+            key: Hashable = word.match_key()
+            next_state: Optional[int] = self._goto[state].get(key)
+
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._own_outputs.append([])
+                self._goto[state][key] = next_state
+
+            state = next_state
+
+        self._own_outputs[state].append((phrase_idx, len(search_words)))
+        self._is_compiled = False
+        self.phrases_count += 1
+
+        return self
+
+    def compile(self) -> 'PhraseAutomaton':
+        """Builds failure links (BFS) and merges outputs along them."""
+        queue: Deque[int] = deque()
+        self._outputs = [list(outputs) for outputs in self._own_outputs]
+
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            queue.append(state)
+
+        while queue:
+            state = queue.popleft()
+
+            for key, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail_state = self._fail[state]
+
+                while fail_state and key not in self._goto[fail_state]:
+                    fail_state = self._fail[fail_state]
+
+                self._fail[next_state] = self._goto[fail_state].get(key, 0)
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+
+        self._is_compiled = True
+
+        return self
+
+    def scan(
+        self,
+        source_tokens: TokenSequence,
+        on_word_proceed: Optional[Callable[[int, int], None]] = None,
+    ) -> List[Tuple[int, int, int]]:
+        """
+        Finds all phrase occurrences.
+
+        Returns:
+            List of (phrase_idx, start_token_idx, end_token_idx) ordered by end position
+        """
+        if not self._is_compiled:
+            self.compile()
+
+        words_total: int = TokenStream.count_words_of(source_tokens)
+        word_indices: array = array('q')
+        occurrences: List[Tuple[int, int, int]] = []
+        goto: List[Dict[Hashable, int]] = self._goto
+        fail: List[int] = self._fail
+        outputs: List[List[PhraseOutput]] = self._outputs
+        progress_step: int = max(words_total // PhraseAutomaton.PROGRESS_STEPS, 1)
+        state = 0
+
+        for token_idx, text, lemma, stem in TokenStream.iter_words_of(source_tokens):
+            word_indices.append(token_idx)
+            word_pos: int = len(word_indices) - 1
+            # same key as Token.match_key
+            key: Hashable = (lemma, stem) if lemma and stem else text
+
+            while state and key not in goto[state]:
+                state = fail[state]
+
+            state = goto[state].get(key, 0)
+
+            for phrase_idx, length in outputs[state]:
+                start_token_idx: int = word_indices[word_pos - length + 1]
+                occurrences.append((phrase_idx, start_token_idx, token_idx))
+
+            if on_word_proceed is not None and (word_pos + 1) % progress_step == 0:
+                on_word_proceed(word_pos + 1, words_total)
+
+        return occurrences
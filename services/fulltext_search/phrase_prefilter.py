@@ -0,0 +1,94 @@
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from services.fulltext_search.batch_declension import BatchDeclension
+from services.fulltext_search.phrase import EType, Phrase
+from services.tokenization import Token, TokenDictionary, TokenSequence, TokenStream, TokenType
+from services.utils import normalize_text
+
+
+class PhrasePrefilter:
+    """
+    Drops phrases that cannot occur in the document before strategy dispatch.
+
+    Text phrases need every word in the TokenDictionary (by text or lemma and stem).
+    Surnames and full names need every word of at least one declined form in the
+    normalized word vocabulary of the document. The check never drops a phrase
+    the strategies could match.
+    """
+
+    def __init__(self, source_tokens: TokenSequence, dictionary: TokenDictionary) -> None:
+        self._dictionary: TokenDictionary = dictionary
+        self._vocabulary: Set[str] = {
+            normalize_text(text)
+            for _, text, _, _ in TokenStream.iter_words_of(source_tokens)
+        }
+        self._prefixes: Set[str] = {word[:3] for word in self._vocabulary}
+
+    def _has_form(self, form: str, separator: str) -> bool:
+        if form in self._vocabulary:
+            return True
+
+        words: List[str] = form.split(separator)
+
+        return len(words) > 1 and all(word in self._vocabulary for word in words)
+
+    def _has_text_phrase(self, tokens: List[Token]) -> bool:
+        words: List[Token] = [t for t in tokens if t.type == TokenType.WORD]
+
+        # phrases without words are left to the strategy
+        return all(self._dictionary.has_token(word) for word in words)
+
+    def filter(
+        self,
+        search_phrases: List[Tuple[Phrase, List[Token]]],
+        on_phrase_proceed: Optional[Callable[[int], None]] = None,
+    ) -> List[Tuple[Phrase, List[Token]]]:
+        """
+        Args:
+            search_phrases: (phrase, tokens) pairs of any EType
+            on_phrase_proceed: Called with the number of checked phrases
+
+        Returns:
+            Pairs of phrases that may occur in the document, in the given order
+        """
+        batch_declension: BatchDeclension = BatchDeclension()
+        surname_forms: Dict[str, List[str]] = batch_declension.surname_forms(
+            phrase.phrase
+            for phrase, _ in search_phrases
+            if phrase.phrase_type == EType.SURNAME and phrase.declined_forms is None
+        )
+        # as FullNameStrategy: not precomputed names are declined only when their prefix occurs
+        full_name_forms: Dict[str, List[str]] = batch_declension.full_name_forms(
+            phrase.phrase
+            for phrase, _ in search_phrases
+            if phrase.phrase_type == EType.FULL_NAME
+            and phrase.declined_forms is None
+            and normalize_text(phrase.phrase)[:3] in self._prefixes
+        )
+        filtered: List[Tuple[Phrase, List[Token]]] = []
+
+        for i, (phrase, tokens) in enumerate(search_phrases):
+            if phrase.phrase_type == EType.SURNAME:
+                forms: List[str] = (
+                    phrase.declined_forms
+                    if phrase.declined_forms is not None
+                    else surname_forms[normalize_text(phrase.phrase)]
+                )
+                is_occurring: bool = any(self._has_form(form, '-') for form in forms)
+            elif phrase.phrase_type == EType.FULL_NAME:
+                forms: List[str] = (
+                    phrase.declined_forms
+                    if phrase.declined_forms is not None
+                    else full_name_forms.get(normalize_text(phrase.phrase), [])
+                )
+                is_occurring: bool = any(self._has_form(form, ' ') for form in forms)
+            else:
+                is_occurring: bool = self._has_text_phrase(tokens)
+
+            if is_occurring:
+                filtered.append((phrase, tokens))
+
+            if on_phrase_proceed is not None:
+                on_phrase_proceed(i + 1)
+
+        return filtered
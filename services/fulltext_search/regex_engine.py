@@ -0,0 +1,284 @@
+import bisect
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+import numpy as np
+
+from services.utils.regex_pattern import RegexPattern
+
+try:
+    # Python 3.11+
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_parse
+
+# (pattern, match start, match end) in the searched text
+RegexHit = Tuple[RegexPattern, int, int]
+
+# characters matched by \s in str patterns
+_WHITESPACE_CODES: np.ndarray = np.array([code for code in range(0x3000 + 1) if chr(code).isspace()], dtype=np.uint32)
+# character classes a word-local pattern may use: they never match whitespace
+_WORD_LOCAL_CATEGORIES = {sre_parse.CATEGORY_WORD, sre_parse.CATEGORY_DIGIT, sre_parse.CATEGORY_NOT_SPACE}
+# zero-width assertions that read the same at run edges as in the whole text
+_WORD_LOCAL_AT = {sre_parse.AT_BOUNDARY, sre_parse.AT_NON_BOUNDARY, sre_parse.AT_BEGINNING, sre_parse.AT_BEGINNING_STRING}
+_REPEATS = {sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, getattr(sre_parse, 'POSSESSIVE_REPEAT', sre_parse.MAX_REPEAT)}
+_GROUPS = {sre_parse.SUBPATTERN, getattr(sre_parse, 'ATOMIC_GROUP', sre_parse.SUBPATTERN)}
+
+
+class _PatternPlan:
+    """
+    Compiled pattern with its literal prefilter.
+
+    literals: strings one of which every match contains (None - unknown).
+    is_word_local: matches never contain whitespace and read the same in a
+    whitespace-free run as in the whole text, so only runs with a literal are searched.
+    """
+
+    # class of at most this many chars is expanded into literals
+    MAX_CLASS_CHARS: int = 4
+    MAX_LITERALS: int = 32
+    # shorter literals do not pay for the prefilter
+    MIN_LITERAL_LENGTH: int = 2
+
+    def __init__(self, pattern: str) -> None:
+        self.compiled: re.Pattern = re.compile(pattern)
+        self.literals: Optional[FrozenSet[str]] = None
+        self.is_word_local: bool = False
+        self.literals_regex: Optional[re.Pattern] = None
+
+        try:
+            parsed = sre_parse.parse(pattern)
+        except (re.error, RecursionError):
+            return
+
+        if parsed.state.flags & re.IGNORECASE:
+            return
+
+        literals: Optional[FrozenSet[str]] = _PatternPlan._required_literals(parsed)
+
+        if literals is None or min(len(literal) for literal in literals) < _PatternPlan.MIN_LITERAL_LENGTH:
+            return
+
+        self.literals = literals
+        self.is_word_local = _PatternPlan._is_word_local(parsed)
+        # longest first: the literal alternation must not stop at a shorter prefix
+        self.literals_regex = re.compile('|'.join(re.escape(literal) for literal in sorted(literals, key=len, reverse=True)))
+
+    @staticmethod
+    def _group_body(op, av):
+        # SUBPATTERN: (group, add_flags, del_flags, body), ATOMIC_GROUP: body
+        return av[-1] if op == sre_parse.SUBPATTERN else av
+
+    @staticmethod
+    def _fixed_chars(op, av) -> Optional[Set[str]]:
+        """Chars a single-char item may match, None when not a small fixed set."""
+        if op == sre_parse.LITERAL:
+            return {chr(av)}
+
+        if op != sre_parse.IN:
+            return None
+
+        chars: Set[str] = set()
+
+        for item_op, item_av in av:
+            if item_op == sre_parse.LITERAL:
+                chars.add(chr(item_av))
+            elif item_op == sre_parse.RANGE and item_av[1] - item_av[0] < _PatternPlan.MAX_CLASS_CHARS:
+                chars.update(chr(code) for code in range(item_av[0], item_av[1] + 1))
+            else:
+                return None
+
+        return chars if len(chars) <= _PatternPlan.MAX_CLASS_CHARS else None
+
+    @staticmethod
+    def _required_literals(subpattern) -> Optional[FrozenSet[str]]:
+        """Best set of strings one of which every match of the sequence contains."""
+        best: Optional[FrozenSet[str]] = None
+        run: Set[str] = {''}
+
+        def _consider(candidate: Optional[Set[str]]) -> None:
+            nonlocal best
+
+            if not candidate or '' in candidate:
+                return
+
+            # longer shortest literal first, then fewer literals
+            quality: Tuple[int, int] = (min(len(literal) for literal in candidate), -len(candidate))
+
+            if best is None or quality > (min(len(literal) for literal in best), -len(best)):
+                best = frozenset(candidate)
+
+        for op, av in subpattern:
+            chars: Optional[Set[str]] = _PatternPlan._fixed_chars(op, av)
+
+            if chars is not None:
+                if len(run) * len(chars) > _PatternPlan.MAX_LITERALS:
+                    _consider(run)
+                    run = {''}
+
+                run = {prefix + char for prefix in run for char in chars}
+                continue
+
+            # zero-width: the run of chars goes on
+            if op == sre_parse.AT:
+                continue
+
+            _consider(run)
+            run = {''}
+
+            if op in _GROUPS:
+                add_flags: int = av[1] if op == sre_parse.SUBPATTERN else 0
+
+                if not add_flags & re.IGNORECASE:
+                    _consider(_PatternPlan._required_literals(_PatternPlan._group_body(op, av)))
+            elif op in _REPEATS and av[0] >= 1:
+                _consider(_PatternPlan._required_literals(av[2]))
+            elif op == sre_parse.BRANCH:
+                branches = [_PatternPlan._required_literals(branch) for branch in av[1]]
+
+                if all(branch is not None for branch in branches):
+                    union: Set[str] = set().union(*branches)
+
+                    if len(union) <= _PatternPlan.MAX_LITERALS:
+                        _consider(union)
+
+        _consider(run)
+
+        return best
+
+    @staticmethod
+    def _is_word_local(subpattern) -> bool:
+        for op, av in subpattern:
+            if op == sre_parse.LITERAL:
+                if chr(av).isspace():
+                    return False
+            elif op == sre_parse.IN:
+                for item_op, item_av in av:
+                    if item_op == sre_parse.LITERAL and chr(item_av).isspace():
+                        return False
+                    if item_op == sre_parse.RANGE and any(
+                        item_av[0] <= code <= item_av[1] for code in _WHITESPACE_CODES.tolist()
+                    ):
+                        return False
+                    if item_op == sre_parse.CATEGORY and item_av not in _WORD_LOCAL_CATEGORIES:
+                        return False
+                    if item_op not in (sre_parse.LITERAL, sre_parse.RANGE, sre_parse.CATEGORY):
+                        return False
+            elif op == sre_parse.AT:
+                if av not in _WORD_LOCAL_AT:
+                    return False
+            elif op in _GROUPS:
+                if not _PatternPlan._is_word_local(_PatternPlan._group_body(op, av)):
+                    return False
+            elif op in _REPEATS:
+                if not _PatternPlan._is_word_local(av[2]):
+                    return False
+            elif op == sre_parse.BRANCH:
+                if not all(_PatternPlan._is_word_local(branch) for branch in av[1]):
+                    return False
+            else:
+                # any char, negations, lookarounds, backreferences
+                return False
+
+        return True
+
+
+class RegexEngine:
+    """
+    Finds matches of several RegexPatterns with literal prefiltering.
+
+    Every pattern gets the literals one of which each of its matches contains.
+    Patterns whose literals are absent from the text are skipped. Patterns that
+    never match whitespace run only on the whitespace-free runs of the text
+    with a literal hit; the others scan the whole text. Plans are cached per
+    list by its pattern strings, so a list of any size keeps its compiled plans
+    until its patterns change.
+
+    Results are the same as pattern.finditer over the whole text for each pattern.
+    """
+
+    # lists whose plans are kept; a changed list is a new entry, the old one ages out
+    PLAN_SETS_CACHE_SIZE: int = 32
+
+    # pattern strings of a list -> their plans
+    _plan_sets: 'OrderedDict[Tuple[str, ...], List[_PatternPlan]]' = OrderedDict()
+    _plan_sets_lock: threading.Lock = threading.Lock()
+
+    def __init__(self, regex_patterns: List[RegexPattern]) -> None:
+        self._regex_patterns: List[RegexPattern] = regex_patterns
+        self._plans: List[Optional[_PatternPlan]] = [None] * len(regex_patterns)
+        indices_by_list: Dict[int, List[int]] = {}
+
+        for i, regex_pattern in enumerate(regex_patterns):
+            indices_by_list.setdefault(id(regex_pattern.source_list), []).append(i)
+
+        for indices in indices_by_list.values():
+            plans: List[_PatternPlan] = RegexEngine._plans_of(tuple(regex_patterns[i].pattern for i in indices))
+
+            for i, plan in zip(indices, plans):
+                self._plans[i] = plan
+
+    @staticmethod
+    def _plans_of(patterns: Tuple[str, ...]) -> List[_PatternPlan]:
+        with RegexEngine._plan_sets_lock:
+            plans: Optional[List[_PatternPlan]] = RegexEngine._plan_sets.get(patterns)
+
+            if plans is not None:
+                RegexEngine._plan_sets.move_to_end(patterns)
+                return plans
+
+        plans = [_PatternPlan(pattern) for pattern in patterns]
+
+        with RegexEngine._plan_sets_lock:
+            RegexEngine._plan_sets[patterns] = plans
+
+            if len(RegexEngine._plan_sets) > RegexEngine.PLAN_SETS_CACHE_SIZE:
+                RegexEngine._plan_sets.popitem(last=False)
+
+        return plans
+
+    @staticmethod
+    def _whitespace_positions(text: str) -> List[int]:
+        codes: np.ndarray = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+
+        return np.flatnonzero(np.isin(codes, _WHITESPACE_CODES)).tolist()
+
+    def search(self, text: str) -> List[RegexHit]:
+        """
+        Returns:
+            Matches pattern by pattern (in the given order), each pattern in text order
+        """
+        hits: List[RegexHit] = []
+        whitespace_positions: Optional[List[int]] = None
+
+        for regex_pattern, plan in zip(self._regex_patterns, self._plans):
+            if plan.literals is not None and not any(literal in text for literal in plan.literals):
+                continue
+
+            if not plan.is_word_local:
+                hits.extend((regex_pattern, match.start(), match.end()) for match in plan.compiled.finditer(text))
+                continue
+
+            if whitespace_positions is None:
+                whitespace_positions = RegexEngine._whitespace_positions(text)
+
+            # [start] search whitespace-free runs around literal hits
+            run_end: int = -1
+
+            for literal_match in plan.literals_regex.finditer(text):
+                if literal_match.start() < run_end:
+                    continue
+
+                separator_idx: int = bisect.bisect_right(whitespace_positions, literal_match.start())
+                run_start: int = whitespace_positions[separator_idx - 1] + 1 if separator_idx > 0 else 0
+                run_end = whitespace_positions[separator_idx] if separator_idx < len(whitespace_positions) else len(text)
+
+                hits.extend(
+                    (regex_pattern, match.start(), match.end())
+                    for match in plan.compiled.finditer(text, run_start, run_end)
+                )
+            # [end]
+
+        return hits
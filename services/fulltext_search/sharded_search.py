@@ -0,0 +1,276 @@
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional, Tuple, Type, Union
+
+import numpy as np
+
+from services.fulltext_search.check_id_collection import CheckIdCollection
+from services.fulltext_search.phrase import Phrase
+from services.fulltext_search.search_match import FTSMatch, FTSRegexMatch, FTSTextMatch
+from services.fulltext_search.strategies.base_strategy import BaseSearchStrategy
+from services.tokenization import Token, TokenDictionary, TokenSequence, TokenStream, TokenType
+from services.utils.regex_pattern import RegexPattern
+from services.utils.worker_processes import get_spawn_context
+
+# (start token idx, end token idx, tokens count) in global positions
+ShardMatch = Tuple[int, int, int]
+# (phrase index, owned matches) for every phrase the strategy returned
+ShardResult = List[Tuple[int, List[ShardMatch]]]
+# (first token of the shard, first token of the next shard)
+OwnPart = Tuple[int, int]
+
+# process pool shared by all searches of this process, created on first use
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock: threading.Lock = threading.Lock()
+
+
+def _get_executor(workers_count: int) -> ProcessPoolExecutor:
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            # spawn: forking a process with app threads (socketio, executor) is unsafe
+            _executor = ProcessPoolExecutor(
+                max_workers=workers_count,
+                mp_context=get_spawn_context(),
+            )
+
+        return _executor
+
+
+def _drop_executor(executor: ProcessPoolExecutor) -> None:
+    """Forgets a broken pool, so the next search starts a new one."""
+    global _executor
+
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _search_shard(
+    strategy_type: Type[BaseSearchStrategy],
+    shard_tokens: TokenStream,
+    search_phrases: List[Tuple[Phrase, List[Token]]],
+    with_dictionary: bool,
+    own_part: OwnPart,
+) -> ShardResult:
+    """Worker: searches one shard and keeps the matches that start in its own part."""
+    own_start, own_stop = own_part
+    phrase_indices: Dict[int, int] = {id(phrase): i for i, (phrase, _) in enumerate(search_phrases)}
+    results: List[Tuple[Union[Phrase, str], List[FTSMatch]]] = strategy_type().search_all_phrases(
+        source_tokens=shard_tokens,
+        search_phrases=search_phrases,
+        dictionary=TokenDictionary(shard_tokens) if with_dictionary else None,
+    )
+    shard_result: ShardResult = []
+
+    for phrase, matches in results:
+        owned: List[ShardMatch] = [
+            (match.start_token_idx + own_start, match.end_token_idx + own_start, len(match.tokens))
+            for match in matches
+            if match.start_token_idx + own_start < own_stop
+        ]
+
+        # empty results (phrases without words) are kept as the strategy returned them
+        if len(owned) > 0 or len(matches) == 0:
+            shard_result.append((phrase_indices[id(phrase)], owned))
+
+    return shard_result
+
+
+class ShardedSearch:
+    """
+    Runs a search strategy over shards of a large TokenStream in a process pool.
+
+    Shards are cut at word boundaries and overlap the next shard by the longest
+    phrase (in words), so every match lies whole in the shard where it starts.
+    Matches outside the own part of a shard are dropped, the rest are mapped
+    back to global token indices and get check ids from one collection, as
+    with a serial search. Regex patterns span characters, not words, and are
+    searched over the whole stream in the calling process.
+    All searches of a process (concurrent tasks too) share one pool of
+    FULLTEXT_SEARCH_SHARD_WORKERS processes, CPU count by default.
+    Streams below SHARD_MIN_WORDS and FULLTEXT_SEARCH_SHARD_WORKERS=1 are not sharded.
+    """
+
+    WORKERS_ENV: str = "FULLTEXT_SEARCH_SHARD_WORKERS"
+    SHARD_MIN_WORDS: int = 500000
+    # full names are matched by word trigrams
+    MIN_OVERLAP_WORDS: int = 2
+
+    def __init__(self, source_tokens: TokenStream, workers_count: int) -> None:
+        self._source_tokens: TokenStream = source_tokens
+        self._workers_count: int = workers_count
+        self._word_indices: np.ndarray = source_tokens.word_indices()
+
+    @staticmethod
+    def get_workers_count(words_count: int) -> int:
+        if words_count < ShardedSearch.SHARD_MIN_WORDS:
+            return 1
+
+        workers: str = os.environ.get(ShardedSearch.WORKERS_ENV, "")
+
+        if workers.isdigit() and int(workers) > 0:
+            return int(workers)
+
+        return max(os.cpu_count() or 1, 1)
+
+    @staticmethod
+    def create(source_tokens: TokenSequence) -> Optional['ShardedSearch']:
+        """ShardedSearch for large streams, None when serial search is preferable."""
+        if not isinstance(source_tokens, TokenStream):
+            return None
+
+        workers_count: int = ShardedSearch.get_workers_count(source_tokens.count_words())
+
+        if workers_count <= 1:
+            return None
+
+        return ShardedSearch(source_tokens, workers_count)
+
+    def _is_shard_start(self, token_idx: int) -> bool:
+        # tail of a double surname "Кара - Мурза" is read together with its head
+        return not (
+            token_idx >= 2
+            and self._source_tokens.text(token_idx - 1) == '-'
+            and self._source_tokens.type(token_idx - 2) == TokenType.WORD
+        )
+
+    def _plan_shards(self, overlap_words: int) -> List[Tuple[int, int, int]]:
+        """(own part start, shard stop, own part stop) token indices of every shard."""
+        words_count: int = len(self._word_indices)
+        shard_words: int = -(-words_count // self._workers_count)
+        own_starts: List[int] = [0]
+
+        # [start] own parts start at words where a serial scan starts a match too
+        for word_pos in range(shard_words, words_count, shard_words):
+            while word_pos < words_count and not self._is_shard_start(int(self._word_indices[word_pos])):
+                word_pos += 1
+
+            if word_pos < words_count and int(self._word_indices[word_pos]) > own_starts[-1]:
+                own_starts.append(int(self._word_indices[word_pos]))
+        # [end]
+
+        own_stops: List[int] = own_starts[1:] + [len(self._source_tokens)]
+        shards: List[Tuple[int, int, int]] = []
+
+        for own_start, own_stop in zip(own_starts, own_stops):
+            # words of the next shard a match started here may reach
+            next_word_pos: int = int(np.searchsorted(self._word_indices, own_stop))
+            last_word_pos: int = min(next_word_pos + overlap_words, words_count) - 1
+            shard_stop: int = (
+                max(int(self._word_indices[last_word_pos]) + 1, own_stop)
+                if last_word_pos >= next_word_pos
+                else own_stop
+            )
+            shards.append((own_start, shard_stop, own_stop))
+
+        return shards
+
+    def search_all_phrases(
+        self,
+        strategy: BaseSearchStrategy,
+        search_phrases: List[Tuple[Phrase, List[Token]]],
+        progress_total: int,
+        dictionary: Optional[TokenDictionary] = None,
+        regex_patterns: Optional[Dict[str, RegexPattern]] = None,
+        on_source_token_proceed: Optional[Callable[[int, int], None]] = None,
+    ) -> List[Tuple[Union[Phrase, str], List[FTSMatch]]]:
+        """
+        Same results as strategy.search_all_phrases over the whole stream.
+
+        Args:
+            strategy: Strategy to run in every shard
+            search_phrases: List of (phrase, tokens) tuples
+            progress_total: Progress units reported when all shards are done
+            dictionary: Shards build their own TokenDictionary when given
+            regex_patterns: Optional dictionary of {pattern_name: RegexPattern} for regex-based search
+            on_source_token_proceed: Called as shards complete
+
+        Returns:
+            List of (phrase or str, matches) tuples where matches is list of FTSMatch objects
+        """
+        check_id_collection: CheckIdCollection = CheckIdCollection()
+        regex_matches_map: Dict[Tuple[int, int], FTSRegexMatch] = {}
+
+        for regex_match in strategy.search_regex_matches(self._source_tokens, regex_patterns=regex_patterns):
+            key = (regex_match.start_token_idx, regex_match.end_token_idx)
+            regex_match.check_id = check_id_collection[key]
+            regex_matches_map[key] = regex_match
+
+        # [start] search shards
+        # only what strategies read crosses the process boundary: no lists, no models
+        shard_phrases: List[Tuple[Phrase, List[Token]]] = [
+            (
+                Phrase(
+                    phrase=phrase.phrase,
+                    phrase_type=phrase.phrase_type,
+                    tokens=[],
+                    declined_forms=phrase.declined_forms,
+                ),
+                [Token(t.text, t.start, t.end, t.type, t.lemma, t.stem) for t in search_tokens],
+            )
+            for phrase, search_tokens in search_phrases
+        ]
+        longest_phrase_words: int = max(
+            (sum(1 for t in search_tokens if t.type == TokenType.WORD) for _, search_tokens in search_phrases),
+            default=0,
+        )
+        overlap_words: int = max(longest_phrase_words - 1, ShardedSearch.MIN_OVERLAP_WORDS)
+        executor: ProcessPoolExecutor = _get_executor(self._workers_count)
+        futures: List[Future] = []
+        shard_results: List[ShardResult] = []
+        phrase_matches: Dict[int, List[FTSMatch]] = {}
+
+        try:
+            for own_start, shard_stop, own_stop in (self._plan_shards(overlap_words) if search_phrases else []):
+                futures.append(executor.submit(
+                    _search_shard,
+                    type(strategy),
+                    self._source_tokens.slice(own_start, shard_stop),
+                    shard_phrases,
+                    dictionary is not None,
+                    (own_start, own_stop),
+                ))
+
+            for future in futures:
+                shard_results.append(future.result())
+
+                if on_source_token_proceed is not None:
+                    on_source_token_proceed(len(shard_results) * progress_total // len(futures), progress_total)
+        except BrokenProcessPool:
+            _drop_executor(executor)
+            raise
+        finally:
+            for future in futures:
+                future.cancel()
+
+        # shards are merged in document order, so matches keep the serial order
+        for shard_result in shard_results:
+            for phrase_idx, shard_matches in shard_result:
+                phrase: Phrase = search_phrases[phrase_idx][0]
+                matches: List[FTSMatch] = phrase_matches.setdefault(phrase_idx, [])
+
+                for start_token_idx, end_token_idx, tokens_count in shard_matches:
+                    matches.append(FTSTextMatch(
+                        tokens=self._source_tokens[start_token_idx:start_token_idx + tokens_count],
+                        start_token_idx=start_token_idx,
+                        end_token_idx=end_token_idx,
+                        search_phrase=phrase,
+                        check_id=check_id_collection[(start_token_idx, end_token_idx)],
+                    ))
+        # [end]
+
+        result_matches: List[Tuple[Union[Phrase, str], List[FTSMatch]]] = [
+            (search_phrases[phrase_idx][0], phrase_matches[phrase_idx])
+            for phrase_idx in sorted(phrase_matches)
+        ]
+
+        for regex_match in regex_matches_map.values():
+            result_matches.append(('regex ' + regex_match.regex_info.pattern_name, [regex_match]))
+
+        return result_matches
@@ -1,13 +1,16 @@
 import uuid
+from bisect import bisect_right
+from itertools import accumulate
 from abc import ABC, abstractmethod
 from typing import Callable, Dict, List, Optional, Tuple, Union
 
 from services.fulltext_search.phrase import Phrase
+from services.fulltext_search.regex_engine import RegexEngine
 from services.fulltext_search.search_match import FTSMatch
 from services.utils.regex_pattern import RegexPattern
 from services.fulltext_search.search_match import FTSRegexMatch
 
-from services.tokenization import Token, TokenDictionary
+from services.tokenization import Token, TokenDictionary, TokenSequence
 
 
 class BaseSearchStrategy(ABC):
@@ -16,7 +19,7 @@ class BaseSearchStrategy(ABC):
     @abstractmethod
     def search_all_phrases(
         self,
-        source_tokens: List[Token],
+        source_tokens: TokenSequence,
         search_phrases: List[Tuple[Phrase, List[Token]]],
         dictionary: Optional[TokenDictionary] = None,
         regex_patterns: Optional[Dict[str, RegexPattern]] = None,
@@ -26,7 +29,7 @@ class BaseSearchStrategy(ABC):
 
     def search_regex_matches(
         self,
-        source_tokens: 'List[Token]',
+        source_tokens: TokenSequence,
         regex_patterns: Optional[Dict[str, RegexPattern]] = None,
         greedy: bool = False,
     ) -> List[FTSRegexMatch]:
@@ -49,49 +52,39 @@ class BaseSearchStrategy(ABC):
         if not source_tokens or not regex_patterns:
             return []
 
-        # Build concatenated text and token position mapping
-        concatenated_text = ''
-        token_positions: List[Tuple[int, int]] = []
-
-        for token in source_tokens:
-            start_pos = len(concatenated_text)
-            concatenated_text += token.text
-            end_pos = len(concatenated_text)
-            token_positions.append((start_pos, end_pos))
+        # Build concatenated text and token end offsets in it
+        token_texts: List[str] = [token.text for token in source_tokens]
+        concatenated_text: str = ''.join(token_texts)
+        token_ends: List[int] = list(accumulate(len(text) for text in token_texts))
 
         concatenated_text_lower: str = concatenated_text.lower()
         matches: List[FTSRegexMatch] = []
 
-        # Search all patterns in concatenated text
-        for pattern_name, regex_pattern in regex_patterns.items():
-            compiled_pattern = regex_pattern.compiled
-
-            for match in compiled_pattern.finditer(concatenated_text_lower):
-                match_start = match.start()
-                match_end = match.end()
+        # Search all patterns in concatenated text, pattern by pattern
+        regex_engine: RegexEngine = RegexEngine(list(regex_patterns.values()))
 
-                # Find tokens that cover this match
-                start_token_idx = self._find_token_by_position(token_positions, match_start)
-                end_token_idx = self._find_token_by_position(token_positions, match_end - 1)
+        for regex_pattern, match_start, match_end in regex_engine.search(concatenated_text_lower):
+            # Find tokens that cover this match
+            start_token_idx = self._find_token_by_position(token_ends, match_start)
+            end_token_idx = self._find_token_by_position(token_ends, match_end - 1)
 
-                if start_token_idx is not None and end_token_idx is not None:
-                    matches.append(FTSRegexMatch(
-                        tokens=source_tokens[start_token_idx:end_token_idx + 1],
-                        start_token_idx=start_token_idx,
-                        end_token_idx=end_token_idx,
-                        regex_info=regex_pattern,
-                        check_id = uuid.uuid1(),
-                    ))
+            if start_token_idx is not None and end_token_idx is not None:
+                matches.append(FTSRegexMatch(
+                    tokens=source_tokens[start_token_idx:end_token_idx + 1],
+                    start_token_idx=start_token_idx,
+                    end_token_idx=end_token_idx,
+                    regex_info=regex_pattern,
+                    check_id = uuid.uuid1(),
+                ))
 
         return matches
 
     @staticmethod
     def _find_token_by_position(
-        token_positions: List[Tuple[int, int]],
+        token_ends: List[int],
         position: int
     ) -> Optional[int]:
-        """Find token index that contains given position in concatenated text."""
-        for idx, (start_pos, end_pos) in enumerate(token_positions):
-            if start_pos <= position < end_pos:
-                return idx
-        return None
+        """Find token index that contains given position in concatenated text (binary search over end offsets)."""
+        idx: int = bisect_right(token_ends, position)
+
+        return idx if idx < len(token_ends) else None
@@ -1,11 +1,11 @@
-from typing import Callable, Dict, List, Optional, Tuple, Union
+from typing import Callable, Dict, List, Optional, Set, Tuple, Union
 
-from services.declension_name import Declension
+from services.fulltext_search.batch_declension import BatchDeclension
 from services.fulltext_search.check_id_collection import CheckIdCollection
 from services.fulltext_search.phrase import Phrase
 from services.fulltext_search.search_match import FTSMatch, FTSTextMatch
 from services.fulltext_search.strategies.base_strategy import BaseSearchStrategy
-from services.tokenization import Token, TokenDictionary, TokenType
+from services.tokenization import Token, TokenDictionary, TokenSequence, TokenType
 from services.utils import normalize_text
 from services.utils.regex_pattern import RegexPattern
 
@@ -15,24 +15,51 @@ class FullNameStrategy(BaseSearchStrategy):
     def _norm_surname(value: str) -> str:
         return value.strip().casefold() if value else ""
 
-    def _read_full_name(self, i: int, source_tokens: list[Token]) -> Optional[tuple[str, int, int]]:
-        words = []
-        j = i
+    @staticmethod
+    def _prefix(value: str) -> str:
+        return value[:min(len(value), 3)]
 
-        for token in source_tokens[i:]:
-            if token.type == TokenType.WORD:
-                words.append(normalize_text(token.text))
+    @staticmethod
+    def _build_forms_index(
+        search_phrases: List[Tuple[Phrase, List[Token]]],
+        source_prefixes: Set[str],
+        on_phrase_proceed: Callable[[], None],
+    ) -> Dict[str, List[int]]:
+        """
+        Map every declined "surname firstname patronymic" form to indices of phrases producing it.
+
+        Phrases without precomputed forms are read from the declension cache (declined
+        on a miss) only when the document has a word with the phrase prefix.
+        """
+        forms_index: Dict[str, List[int]] = {}
+        cached_forms: Dict[str, List[str]] = BatchDeclension().full_name_forms(
+            phrase.phrase
+            for phrase, _ in search_phrases
+            if phrase.declined_forms is None
+            and FullNameStrategy._prefix(normalize_text(phrase.phrase)) in source_prefixes
+        )
+
+        for phrase_idx, (phrase, _) in enumerate(search_phrases):
+            token_text_norm: str = normalize_text(phrase.phrase)
+
+            if phrase.declined_forms is not None:
+                search_names: List[str] = phrase.declined_forms
+            elif token_text_norm in cached_forms:
+                search_names: List[str] = cached_forms[token_text_norm]
+            else:
+                on_phrase_proceed()
+                continue
 
-            if len(words) == 3:
-                return ' '.join(words), i, j
+            for search_name in set(search_names):
+                forms_index.setdefault(search_name, []).append(phrase_idx)
 
-            j += 1
+            on_phrase_proceed()
 
-        return None
+        return forms_index
 
     def search_all_phrases(
             self,
-            source_tokens: list[Token],
+            source_tokens: TokenSequence,
             search_phrases: List[Tuple[Phrase, List[Token]]],
             dictionary: Optional[TokenDictionary] = None,
             regex_patterns: Optional[Dict[str, RegexPattern]] = None,
@@ -53,58 +80,54 @@ class FullNameStrategy(BaseSearchStrategy):
                 on_source_token_proceed(progress_step, progress_max_steps)
         # [end]
 
-        # [start] build token index
-        source_tokens_index: dict[str, list[tuple[int, Token]]] = {}
+        # [start] collect words
+        word_indices: List[int] = []
+        word_texts: List[str] = []
 
         for i, token in enumerate(source_tokens):
-            token_text_norm: str = normalize_text(token.text)
-            prefix_len = min(len(token_text_norm), 3)
-            key: str = token_text_norm[:prefix_len]
-
-            if key not in source_tokens_index:
-                source_tokens_index[key] = []
+            if token.type == TokenType.WORD:
+                word_indices.append(i)
+                word_texts.append(normalize_text(token.text))
 
-            source_tokens_index[key].append((i, token))
             _continue_progress()
         # [end]
 
-        # [start] search
-        check_id_collection: CheckIdCollection = CheckIdCollection()
-        matches = []
-        declension_service = Declension()
+        forms_index: Dict[str, List[int]] = FullNameStrategy._build_forms_index(
+            search_phrases,
+            {FullNameStrategy._prefix(word_text) for word_text in word_texts},
+            _continue_progress,
+        )
 
-        for phrase, _ in search_phrases:
-            token_text_norm: str = normalize_text(phrase.phrase)
-            prefix_len = min(len(token_text_norm), 3)
-            key: str = token_text_norm[:prefix_len]
-
-            if key not in source_tokens_index:
-                continue
-
-            source_tokens_candidates: list[tuple[int, Token]] = source_tokens_index[key]
-            search_names = declension_service.decline_full_name(token_text_norm)
+        # [start] search: sliding window over word trigrams
+        check_id_collection: CheckIdCollection = CheckIdCollection()
+        phrase_matches: Dict[int, List[FTSMatch]] = {}
 
-            for item in source_tokens_candidates:
-                i, token = item
-                full_name_data: Optional[tuple[str, int, int]] = self._read_full_name(i, source_tokens)
+        if forms_index:
+            for k in range(len(word_texts) - 2):
+                phrase_indices: Optional[List[int]] = forms_index.get(
+                    f"{word_texts[k]} {word_texts[k + 1]} {word_texts[k + 2]}"
+                )
 
-                if full_name_data is None:
+                if phrase_indices is None:
                     continue
 
-                source_name, i, j = full_name_data
+                i, j = word_indices[k], word_indices[k + 2]
 
-                if source_name in search_names:
-                    match = FTSTextMatch(
+                for phrase_idx in phrase_indices:
+                    phrase_matches.setdefault(phrase_idx, []).append(FTSTextMatch(
                         tokens=source_tokens[i:j],
                         start_token_idx=i,
                         end_token_idx=j,
-                        search_phrase=phrase,
+                        search_phrase=search_phrases[phrase_idx][0],
                         check_id=check_id_collection[(i, j)],
-                    )
+                    ))
+        # [end]
 
-                    matches.append((phrase, [match]))
+        # phrase order, then document order - as with per-phrase search
+        matches = []
 
-            _continue_progress()
-        # [end]
+        for phrase_idx in sorted(phrase_matches):
+            for match in phrase_matches[phrase_idx]:
+                matches.append((search_phrases[phrase_idx][0], [match]))
 
         return matches
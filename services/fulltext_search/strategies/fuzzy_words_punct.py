@@ -1,11 +1,13 @@
-import uuid
 from typing import Callable, Dict, List, Optional, Tuple, Union
 
+import numpy as np
+
 from services.fulltext_search.check_id_collection import CheckIdCollection
 from services.fulltext_search.strategies.base_strategy import BaseSearchStrategy
 from services.fulltext_search.phrase import Phrase
+from services.fulltext_search.phrase_automaton import PhraseAutomaton
 from services.fulltext_search.search_match import FTSTextMatch, FTSRegexMatch, FTSMatch
-from services.tokenization import Token, TokenType, TokenDictionary
+from services.tokenization import Token, TokenType, TokenDictionary, TokenSequence, TokenStream
 from services.utils.regex_pattern import RegexPattern
 
 
@@ -16,6 +18,10 @@ class FuzzyWordsPunctStrategy(BaseSearchStrategy):
     Words must match in strict order by lemma/stem, but punctuation is ignored.
     """
 
+    # anchored verification replaces the full document scan while anchor
+    # candidates of all phrases stay below this share of source words
+    ANCHORED_MAX_CANDIDATES_RATIO: float = 0.25
+
     @staticmethod
     def _compare_token_sequences(
         source_tokens: List[Token],
@@ -47,78 +53,101 @@ class FuzzyWordsPunctStrategy(BaseSearchStrategy):
 
         return True
 
-    def _verify_phrase_match(
-        self,
-        source_tokens: 'List[Token]',
-        search_words: 'List[Token]',
-        start_token_idx: int,
-        phrase: Phrase,
-    ) -> Optional[FTSTextMatch]:
+    @staticmethod
+    def _plan_phrases(
+        phrases_words: List[List[Token]],
+        dictionary: TokenDictionary,
+    ) -> List[Optional[Tuple[int, int]]]:
+        """
+        Phrase plans: (anchor word offset, anchor candidates count) per phrase, None for phrases without words.
+        The anchor is the phrase word with the smallest posting list in the document dictionary.
         """
-        Verify if phrase matches starting from start_token_idx.
+        plans: List[Optional[Tuple[int, int]]] = []
 
-        Args:
-            source_tokens: Source tokens
-            search_words: Search words (only words, no punctuation)
-            start_token_idx: Starting token index
-            phrase: Phrase being searched
+        for words in phrases_words:
+            plan: Optional[Tuple[int, int]] = None
+
+            for offset, word in enumerate(words):
+                count: int = dictionary.count_candidate_positions(word)
+
+                if plan is None or count < plan[1]:
+                    plan = (offset, count)
+
+                if count == 0:
+                    break
+
+            plans.append(plan)
+
+        return plans
+
+    @staticmethod
+    def _scan_anchored(
+        source_tokens: TokenSequence,
+        phrases_words: List[List[Token]],
+        plans: List[Optional[Tuple[int, int]]],
+        dictionary: TokenDictionary,
+        on_phrase_proceed: Optional[Callable[[int, int], None]] = None,
+    ) -> List[Tuple[int, int, int]]:
+        """
+        Finds phrase occurrences from anchor candidates, verifying words in both directions from the anchor.
+        Words compare by Token.is_equal; for phrases whose match keys are exact (see
+        TokenDictionary.is_match_key_exact) results are the same as PhraseAutomaton.scan().
 
         Returns:
-            FTSMatch if match found, None otherwise
+            List of (phrase_idx, start_token_idx, end_token_idx) ordered by end position
         """
-        source_i = start_token_idx
-        search_j = 0
-        words_matched = 0
-        source_len = len(source_tokens)
-        matched_tokens: 'List[Token]' = []
-
-        while source_i < source_len and search_j < len(search_words):
-            source_token = source_tokens[source_i]
-
-            if source_token.type in (TokenType.PUNCTUATION, TokenType.SPACE):
-                matched_tokens.append(source_token)
-                source_i += 1
-                continue
-
-            search_token: Token = search_words[search_j]
-
-            if source_token.type == TokenType.WORD:
-                if source_token.is_equal(search_token):
-                    matched_tokens.append(source_token)
-                    source_i += 1
-                    search_j += 1
-                    words_matched += 1
-                else:
-                    return None
-            else:
-                return None
-
-        if words_matched == len(search_words):
-            end_token_idx = source_i - 1
-            return FTSTextMatch(
-                tokens=matched_tokens,
-                start_token_idx=start_token_idx,
-                end_token_idx=end_token_idx,
-                search_phrase=phrase,
-                check_id = uuid.uuid1(),
-            )
-        return None
+        word_indices: np.ndarray = TokenStream.word_indices_of(source_tokens)
+        words_count: int = len(word_indices)
+        occurrences: List[Tuple[int, int, int]] = []
+
+        for phrase_idx, (words, plan) in enumerate(zip(phrases_words, plans)):
+            if plan is not None and plan[1] > 0:
+                anchor_offset: int = plan[0]
+                # anchor first, then words to the left and to the right of it
+                check_order: List[int] = (
+                    [anchor_offset]
+                    + list(range(anchor_offset - 1, -1, -1))
+                    + list(range(anchor_offset + 1, len(words)))
+                )
+                candidates: np.ndarray = dictionary.find_candidate_positions(words[anchor_offset])
+                # word ordinal of the phrase start for every anchor candidate
+                starts: List[int] = (np.searchsorted(word_indices, candidates) - anchor_offset).tolist()
+
+                for start_w in starts:
+                    end_w: int = start_w + len(words) - 1
+
+                    if start_w < 0 or end_w >= words_count:
+                        continue
+
+                    if all(
+                        source_tokens[int(word_indices[start_w + k])].is_equal(words[k])
+                        for k in check_order
+                    ):
+                        occurrences.append((phrase_idx, int(word_indices[start_w]), int(word_indices[end_w])))
+
+            if on_phrase_proceed is not None:
+                on_phrase_proceed(phrase_idx + 1, len(phrases_words))
+
+        occurrences.sort(key=lambda occurrence: occurrence[2])
+
+        return occurrences
 
     def search_all_phrases(
         self,
-        source_tokens: 'List[Token]',
+        source_tokens: TokenSequence,
         search_phrases: List[Tuple[Phrase, List[Token]]],
         dictionary: Optional[TokenDictionary] = None,
         regex_patterns: Optional[Dict[str, RegexPattern]] = None,
         on_source_token_proceed: Optional[Callable[[int, int], None]] = None,
     ) -> List[Tuple[Union[Phrase, str], List[FTSMatch]]]:
         """
-        Search all phrases in one pass using dictionary optimization.
+        Search all phrases in one pass with the phrase automaton.
 
         Args:
             source_tokens: Source tokens
             search_phrases: List of (phrase, tokens) tuples
-            dictionary: Optional dictionary for faster lookup
+            dictionary: Source dictionary; when anchors of all phrases are rare, phrases are
+                verified from their rarest words instead of scanning the whole document
             regex_patterns: Optional dictionary of {pattern_name: RegexPattern} for regex-based search
 
         Returns:
@@ -127,9 +156,6 @@ class FuzzyWordsPunctStrategy(BaseSearchStrategy):
         if not source_tokens or not (search_phrases or regex_patterns):
             return []
 
-        if dictionary is None:
-            dictionary = TokenDictionary(source_tokens)
-
         result_matches: List[Tuple[Union[Phrase, str], List[FTSMatch]]] = []
         # unique identifiers groups matches with same source
         check_id_collection: CheckIdCollection = CheckIdCollection()
@@ -146,34 +172,75 @@ class FuzzyWordsPunctStrategy(BaseSearchStrategy):
                 regex_matches_map[key] = regex_match
         # [end]
 
-        # [start] search text matches
-        proceed = 0
-
-        for phrase, search_tokens in search_phrases:
-            search_words: list[Token] = [t for t in search_tokens if t.type == TokenType.WORD]
-
-            if len(search_words) == 0:
-                result_matches.append((phrase, []))
-                continue
-
-            first_word = search_words[0]
-            candidate_starts = dictionary.find_candidate_positions(first_word)
-            matches: List[FTSTextMatch] = []
-
-            for start_idx in candidate_starts:
-                text_match: FTSTextMatch = self._verify_phrase_match(source_tokens, search_words, start_idx, phrase)
-
-                if text_match:
-                    text_match.check_id = check_id_collection[(text_match.start_token_idx, text_match.end_token_idx)]
-                    matches.append(text_match)
+        # [start] search text matches: anchored on rare words or in one pass over source words
+        phrases_words: List[List[Token]] = [
+            [t for t in search_tokens if t.type == TokenType.WORD]
+            for _, search_tokens in search_phrases
+        ]
+        phrases_matches: List[List[FTSMatch]] = [[] for _ in search_phrases]
+        words_total: int = TokenStream.count_words_of(source_tokens)
+        max_candidates: float = words_total * FuzzyWordsPunctStrategy.ANCHORED_MAX_CANDIDATES_RATIO
+        plans: Optional[List[Optional[Tuple[int, int]]]] = (
+            FuzzyWordsPunctStrategy._plan_phrases(phrases_words, dictionary)
+            if dictionary is not None and len(search_phrases) <= max_candidates
+            else None
+        )
+
+        if plans is not None and sum(plan[1] for plan in plans if plan is not None) <= max_candidates:
+            occurrences: List[Tuple[int, int, int]] = FuzzyWordsPunctStrategy._scan_anchored(
+                source_tokens,
+                phrases_words,
+                plans,
+                dictionary,
+                on_phrase_proceed=on_source_token_proceed,
+            )
+        else:
+            # a phrase word equal by text to source words with another key is verified by is_equal
+            is_key_exact: List[bool] = [
+                dictionary is None or all(dictionary.is_match_key_exact(word) for word in words)
+                for words in phrases_words
+            ]
+            automaton: PhraseAutomaton = PhraseAutomaton()
+
+            for phrase_idx, search_words in enumerate(phrases_words):
+                if is_key_exact[phrase_idx]:
+                    automaton.add_phrase(phrase_idx, search_words)
+
+            def _on_word_proceed(proceed: int, total: int) -> None:
+                if on_source_token_proceed is not None:
+                    on_source_token_proceed(proceed * len(search_phrases) // total, len(search_phrases))
+
+            occurrences: List[Tuple[int, int, int]] = automaton.scan(source_tokens, on_word_proceed=_on_word_proceed)
+
+            if not all(is_key_exact):
+                inexact_words: List[List[Token]] = [
+                    [] if is_exact else words
+                    for is_exact, words in zip(is_key_exact, phrases_words)
+                ]
+                occurrences.extend(FuzzyWordsPunctStrategy._scan_anchored(
+                    source_tokens,
+                    inexact_words,
+                    FuzzyWordsPunctStrategy._plan_phrases(inexact_words, dictionary),
+                    dictionary,
+                ))
+                occurrences.sort(key=lambda occurrence: occurrence[2])
+
+        for phrase_idx, start_token_idx, end_token_idx in occurrences:
+            phrase, _ = search_phrases[phrase_idx]
+            phrases_matches[phrase_idx].append(FTSTextMatch(
+                tokens=source_tokens[start_token_idx:end_token_idx + 1],
+                start_token_idx=start_token_idx,
+                end_token_idx=end_token_idx,
+                search_phrase=phrase,
+                check_id=check_id_collection[(start_token_idx, end_token_idx)],
+            ))
 
+        for (phrase, search_tokens), matches in zip(search_phrases, phrases_matches):
             if len(matches) > 0:
                 result_matches.append((phrase, matches))
-
-            proceed += 1
-
-            if on_source_token_proceed is not None:
-                on_source_token_proceed(proceed, len(search_phrases))
+            elif not any(t.type == TokenType.WORD for t in search_tokens):
+                result_matches.append((phrase, []))
+        # [end]
 
         # [start] merge text and regex matches
         for start, end in regex_matches_map.keys():
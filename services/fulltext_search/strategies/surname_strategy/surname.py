@@ -1,3 +1,5 @@
+from typing import Iterable, Optional
+
 from services.utils import normalize_text
 
 from .declension import (
@@ -12,13 +14,15 @@ class Surname:
     """Nominative-base surname: precomputed declension surfaces for check()."""
     surname: str
 
-    def __init__(self, surname: str) -> None:
+    def __init__(self, surname: str, normalized_forms: Optional[Iterable[str]] = None) -> None:
         stripped: str = surname.strip()
         self.surname: str = stripped
         normalized_key: str = normalize_text(stripped)
 
         self.is_dictionary_exception: bool = normalized_key in EXCEPTION_FORMS
-        self._normalized_forms: frozenset[str] = self._build_normalized_forms()
+        self._normalized_forms: frozenset[str] = (
+            frozenset(normalized_forms) if normalized_forms is not None else self._build_normalized_forms()
+        )
 
         self.is_indeclinable: bool = len(self._normalized_forms) == 1
 
@@ -46,6 +50,9 @@ class Surname:
 
         return frozenset(acc)
 
+    def normalized_forms(self) -> frozenset[str]:
+        return self._normalized_forms
+
     def check(self, source: str) -> bool:
         normalized_source: str = normalize_text(source)
 
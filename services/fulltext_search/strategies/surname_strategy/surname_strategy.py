@@ -1,11 +1,12 @@
 from typing import Callable, Dict, List, Optional, Tuple, Union
 
+from services.fulltext_search.batch_declension import BatchDeclension
 from services.fulltext_search.check_id_collection import CheckIdCollection
 from services.fulltext_search.phrase import Phrase
 from services.fulltext_search.search_match import FTSMatch, FTSTextMatch
 from services.fulltext_search.strategies.base_strategy import BaseSearchStrategy
 from services.fulltext_search.strategies.surname_strategy.surname import Surname
-from services.tokenization import Token, TokenDictionary, TokenType
+from services.tokenization import Token, TokenDictionary, TokenSequence, TokenType
 from services.utils import normalize_text
 from services.utils.regex_pattern import RegexPattern
 
@@ -15,9 +16,36 @@ class SurnameStrategy(BaseSearchStrategy):
     def _norm_surname(value: str) -> str:
         return value.strip().casefold() if value else ""
 
+    @staticmethod
+    def _build_forms_index(
+        search_phrases: List[Tuple[Phrase, List[Token]]],
+        on_phrase_proceed: Callable[[], None],
+    ) -> Dict[str, List[int]]:
+        """
+        Map every normalized declined form to indices of phrases producing it.
+        """
+        forms_index: Dict[str, List[int]] = {}
+        # phrases without precomputed forms (user lists) go through the declension cache
+        cached_forms: Dict[str, List[str]] = BatchDeclension().surname_forms(
+            phrase.phrase for phrase, _ in search_phrases if phrase.declined_forms is None
+        )
+
+        for phrase_idx, (phrase, _) in enumerate(search_phrases):
+            surname = Surname(
+                phrase.phrase,
+                phrase.declined_forms if phrase.declined_forms is not None else cached_forms[normalize_text(phrase.phrase)],
+            )
+
+            for form in surname.normalized_forms():
+                forms_index.setdefault(form, []).append(phrase_idx)
+
+            on_phrase_proceed()
+
+        return forms_index
+
     def search_all_phrases(
         self,
-        source_tokens: list[Token],
+        source_tokens: TokenSequence,
         search_phrases: List[Tuple[Phrase, List[Token]]],
         dictionary: Optional[TokenDictionary] = None,
         regex_patterns: Optional[Dict[str, RegexPattern]] = None,
@@ -39,8 +67,11 @@ class SurnameStrategy(BaseSearchStrategy):
 
         # [end]
 
-        # [start] build token index
-        source_tokens_index: dict[str, list[tuple[int, int, list[Token]]]] = {}
+        forms_index: Dict[str, List[int]] = SurnameStrategy._build_forms_index(search_phrases, _continue_progress)
+
+        # [start] search
+        check_id_collection: CheckIdCollection = CheckIdCollection()
+        phrase_matches: Dict[int, List[FTSMatch]] = {}
         i = 0
 
         while i < len(source_tokens):
@@ -57,60 +88,30 @@ class SurnameStrategy(BaseSearchStrategy):
             # [end]
 
             if double_surname:
-                token_text_norm: str = normalize_text(''.join([token.text, next_token_1.text, next_token_2.text]))
-                prefix_len = min(len(token_text_norm), 3)
-                key: str = token_text_norm[:prefix_len]
-
-                if key not in source_tokens_index:
-                    source_tokens_index[key] = []
-
-                source_tokens_index[key].append((i, i + 3, [token, next_token_1, next_token_2]))
-                _continue_progress(3)
-                i += 3
+                tokens: List[Token] = [token, next_token_1, next_token_2]
+                j = i + 3
             else:
-                token_text_norm: str = normalize_text(token.text)
-                prefix_len = min(len(token_text_norm), 3)
-                key: str = token_text_norm[:prefix_len]
-
-                if key not in source_tokens_index:
-                    source_tokens_index[key] = []
-
-                source_tokens_index[key].append((i, i, [token]))
-                _continue_progress()
-                i += 1
+                tokens: List[Token] = [token]
+                j = i
+
+            for phrase_idx in forms_index.get(normalize_text(''.join([t.text for t in tokens])), ()):
+                phrase_matches.setdefault(phrase_idx, []).append(FTSTextMatch(
+                    tokens=tokens,
+                    start_token_idx=i,
+                    end_token_idx=j,
+                    search_phrase=search_phrases[phrase_idx][0],
+                    check_id=check_id_collection[(i, j)],
+                ))
+
+            _continue_progress(len(tokens))
+            i += len(tokens)
         # [end]
 
-        # [start] search
-        check_id_collection: CheckIdCollection = CheckIdCollection()
+        # phrase order, then document order - as with per-phrase search
         matches = []
 
-        for phrase, _ in search_phrases:
-            token_text_norm: str = normalize_text(phrase.phrase)
-            prefix_len = min(len(token_text_norm), 3)
-            key: str = token_text_norm[:prefix_len]
-            surname = Surname(phrase.phrase)
-
-            if key not in source_tokens_index:
-                continue
-
-            source_tokens_candidates: list[tuple[int, int, list[Token]]] = source_tokens_index[key]
-
-            for item in source_tokens_candidates:
-                i, j, tokens = item
-                tokens_text: str = ''.join([token.text for token in tokens])
-
-                if surname.check(tokens_text):
-                    match = FTSTextMatch(
-                        tokens=tokens,
-                        start_token_idx=i,
-                        end_token_idx=j,
-                        search_phrase=phrase,
-                        check_id=check_id_collection[(i, j)],
-                    )
-
-                    matches.append((phrase, [match]))
-
-            _continue_progress()
-        # [end]
+        for phrase_idx in sorted(phrase_matches):
+            for match in phrase_matches[phrase_idx]:
+                matches.append((search_phrases[phrase_idx][0], [match]))
 
         return matches
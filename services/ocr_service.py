@@ -11,7 +11,7 @@ import time
 import re # Импортирован re для использования регулярных выражений
 import cv2
 import numpy as np
-from typing import Optional
+from typing import List, Optional
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -72,6 +72,68 @@ def ocr_single_character(img_pil: Image.Image, languages: str = OCR_LANGUAGES) -
         return None
 
 
+# Отступ между символами в полосе для пакетного распознавания
+OCR_STRIP_GAP = 24
+
+
+def ocr_characters_strip(images: List[Image.Image], languages: str = OCR_LANGUAGES) -> List[List[str]]:
+    """
+    Распознает набор отдельных символов одним вызовом Tesseract.
+
+    Символы выкладываются в одну строку с отступами, результат
+    image_to_boxes сопоставляется символам по центру рамки.
+
+    Args:
+        images: PIL Images с одним символом каждый
+        languages: Языки для Tesseract
+
+    Returns:
+        Символы всех рамок, попавших в изображение, для каждого изображения
+        (пустой список - не распознано; больше одного - глиф прочитан неоднозначно)
+    """
+    if not images:
+        return []
+
+    gray_images = [img.convert('L') for img in images]
+    height = max(img.height for img in gray_images) + OCR_STRIP_GAP * 2
+    width = sum(img.width for img in gray_images) + OCR_STRIP_GAP * (len(gray_images) + 1)
+    strip = Image.new('L', (width, height), 255)
+    tile_ranges = []
+    x = OCR_STRIP_GAP
+
+    for img in gray_images:
+        strip.paste(img, (x, OCR_STRIP_GAP))
+        tile_ranges.append((x, x + img.width))
+        x += img.width + OCR_STRIP_GAP
+
+    try:
+        boxes = pytesseract.image_to_boxes(strip, lang=languages, config='--psm 7')
+    except pytesseract.TesseractNotFoundError:
+        logger_ocr.error("Tesseract не найден! Установите Tesseract OCR и добавьте его в PATH, или укажите путь в переменной окружения TESSERACT_PATH")
+        return [[] for _ in images]
+    except Exception as e_ocr:
+        logger_ocr.warning(f"Ошибка OCR для полосы символов: {e_ocr}")
+        return [[] for _ in images]
+
+    result: List[List[str]] = [[] for _ in images]
+
+    # строка: "<символ> <left> <bottom> <right> <top> <page>"
+    for line in boxes.splitlines():
+        parts = line.split(' ')
+
+        if len(parts) < 6 or not parts[0].strip():
+            continue
+
+        center_x = (int(parts[1]) + int(parts[3])) / 2
+
+        for i, (tile_start, tile_end) in enumerate(tile_ranges):
+            if tile_start <= center_x <= tile_end:
+                result[i].append(parts[0])
+                break
+
+    return result
+
+
 # --- Новая функция для обработки переносов ---
 def _handle_hyphenation(df: pd.DataFrame) -> pd.DataFrame:
     """
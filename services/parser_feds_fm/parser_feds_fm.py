@@ -5,9 +5,12 @@ from extensions import db
 from typing import List, Dict
 
 from models.extremists_terrorists import ExtremistArea, ExtremistType, ExtremistTerrorist
+from services.fulltext_search.batch_declension import BatchDeclension
 from services.parser.parser import Parser
 from services.parser_feds_fm.registry_loader import RegistryLoader
+from services.words_list.phrase_list_index import PhraseListIndex
 from services.words_list.search_term import EType
+from services.enum import WordsListKey
 from services.parser_feds_fm.process_raw_international import ProcessRawInternational
 from services.parser_feds_fm.process_raw_russian import ProcessRawRussian
 
@@ -131,6 +134,8 @@ class ParserFedsFM(ProcessRawInternational, ProcessRawRussian, Parser):
                     item["names"] = self._parse_ru_ul_name(item["raw"])
 
             item["search_terms"] = self._build_search_terms(item["names"], item["area"], item["type"])
+
+        BatchDeclension().prepare_search_terms(term for item in rich_data for term in item["search_terms"])
         # [end]
 
         # [start] sync DB international data
@@ -229,4 +234,5 @@ class ParserFedsFM(ProcessRawInternational, ProcessRawRussian, Parser):
         # [end]
 
         db.session.commit()
+        PhraseListIndex.invalidate(WordsListKey.EXTREMISTS_TERRORISTS)
         print("Parse: Done!")
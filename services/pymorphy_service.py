@@ -7,6 +7,7 @@ import nltk
 import re
 from collections import defaultdict # Оставляем, используется в get_highlight_phrase_map
 import functools
+import hashlib
 
 # --- Константы и Глобальные переменные ---
 MORPH = None
@@ -67,6 +68,21 @@ def ensure_models_loaded():
     load_nltk_lemmatizer()
     load_nltk_stemmers()
 
+def models_fingerprint():
+    """
+    Отпечаток версий загруженных моделей для ключей постоянных кэшей лемм.
+    None, если хотя бы одна модель не загружена и леммы/стеммы считаются fallback'ом.
+    """
+    if MORPH is None or LEMMATIZER_EN is None or STEMMER_RU in (None, 'failed') or STEMMER_EN in (None, 'failed'):
+        return None
+    meta = MORPH.dictionary.meta
+    parts = (
+        'pymorphy3', pymorphy3.__version__, MORPH.lang,
+        str(meta.get('format_version')), str(meta.get('source_revision')), str(meta.get('corpus_revision')),
+        'nltk', nltk.__version__,
+    )
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:16]
+
 # --- Внутренние кэшируемые функции для логики ---
 @functools.lru_cache(maxsize=100000)
 def _get_lemma_cached(cleaned_word):
@@ -1,5 +1,6 @@
 from services.tokenization.dictionary import TokenDictionary
 from services.tokenization.token import Token, TokenType
+from services.tokenization.token_stream import TokenStream, TokenView, TokenSequence
 from services.tokenization.tokenizer import Tokenizer
 
-__all__ = ['Token', 'TokenType', 'Tokenizer', 'TokenDictionary']
+__all__ = ['Token', 'TokenType', 'Tokenizer', 'TokenDictionary', 'TokenStream', 'TokenView', 'TokenSequence']
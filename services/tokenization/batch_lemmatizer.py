@@ -0,0 +1,61 @@
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from services import pymorphy_service
+from services.tokenization.lemma_cache import LemmaCache, LemmaStem
+
+
+class BatchLemmatizer:
+    """
+    Lemmatizes and stems the unique word forms of a document in one pass.
+
+    Words are cleaned like pymorphy_service._get_lemma does, looked up in the
+    persistent LemmaCache, and only misses go through morphology. The cache is
+    bypassed while any morphology model is not loaded: fallback results must
+    not poison it.
+    """
+
+    def __init__(self, cache: Optional[LemmaCache] = None) -> None:
+        self._cache: LemmaCache = cache if cache is not None else LemmaCache.get_instance()
+
+    def lemmatize(
+        self,
+        words: Iterable[str],
+        on_word_proceed: Optional[Callable[[int, int], None]] = None,
+    ) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+        """
+        Returns {word: (lemma, stem)} for every given word.
+
+        Args:
+            words: Word forms (duplicates are fine)
+            on_word_proceed: Called with (proceed, total) unique words while morphology runs
+        """
+        cleaned_by_word: Dict[str, Optional[str]] = {
+            word: pymorphy_service._clean_word(word)
+            for word in set(words)
+        }
+        unique_cleaned: set[str] = {c for c in cleaned_by_word.values() if c is not None}
+        fingerprint: Optional[str] = pymorphy_service.models_fingerprint()
+        morph_by_cleaned: Dict[str, LemmaStem] = (
+            self._cache.get_many(fingerprint, unique_cleaned) if fingerprint is not None else {}
+        )
+        misses: list[str] = [c for c in unique_cleaned if c not in morph_by_cleaned]
+        computed: Dict[str, LemmaStem] = {}
+
+        for i, cleaned in enumerate(misses):
+            computed[cleaned] = (
+                pymorphy_service._get_lemma_cached(cleaned),
+                pymorphy_service._get_stem_cached(cleaned),
+            )
+
+            if on_word_proceed is not None:
+                on_word_proceed(i + 1, len(misses))
+
+        if fingerprint is not None:
+            self._cache.put_many(fingerprint, computed)
+
+        morph_by_cleaned.update(computed)
+
+        return {
+            word: morph_by_cleaned[cleaned] if cleaned is not None else (None, None)
+            for word, cleaned in cleaned_by_word.items()
+        }
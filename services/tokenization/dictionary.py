@@ -1,57 +1,180 @@
-from collections import defaultdict
-from typing import List, Dict, Set
+from typing import Dict, List, Optional
 
-from services.tokenization.token import Token, TokenType
+import numpy as np
+
+from services.tokenization.token import Token
+from services.tokenization.token_stream import TokenSequence, TokenStream
+
+_NONE_ID: int = -1
+# (lemma, stem) key of a text whose words differ in it
+_AMBIGUOUS_ID: int = -2
+_EMPTY_POSITIONS: np.ndarray = np.empty(0, dtype=np.int32)
+
+
+class _PostingIndex:
+    """
+    Int keys -> sorted int32 token positions, stored as one CSR array.
+    """
+
+    def __init__(self, keys: np.ndarray, positions: np.ndarray) -> None:
+        # stable sort keeps positions ascending inside every posting list
+        order: np.ndarray = np.argsort(keys, kind='stable')
+        sorted_keys: np.ndarray = keys[order]
+
+        self._positions: np.ndarray = positions[order]
+        keys_unique, offsets = np.unique(sorted_keys, return_index=True)
+        # plain python lookups: per-token calls are too small for numpy scalar overhead
+        self._slots: Dict[int, int] = {key: slot for slot, key in enumerate(keys_unique.tolist())}
+        self._offsets: List[int] = offsets.tolist() + [len(sorted_keys)]
+
+    def get(self, key: int) -> np.ndarray:
+        slot: Optional[int] = self._slots.get(key)
+
+        if slot is None:
+            return _EMPTY_POSITIONS
+
+        return self._positions[self._offsets[slot]:self._offsets[slot + 1]]
+
+    def count(self, key: int) -> int:
+        slot: Optional[int] = self._slots.get(key)
+
+        return self._offsets[slot + 1] - self._offsets[slot] if slot is not None else 0
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._slots
 
 
 class TokenDictionary:
     """
-    Dictionary for fast token lookup by lemma, stem, and text.
-    Provides O(1) lookup for token positions by different attributes.
+    Dictionary of source word positions consistent with Token.is_equal.
+
+    Strings are interned to ints; posting lists are sorted numpy int arrays
+    keyed by text and by the composite (lemma, stem) key, so candidate lookup
+    returns exact hits and posting lists merge vectorially.
     """
 
-    def __init__(self, source_tokens: List[Token]) -> None:
-        self.lemma_index: Dict[str, List[int]] = defaultdict(list)
-        self.stem_index: Dict[str, List[int]] = defaultdict(list)
-        self.text_index: Dict[str, List[int]] = defaultdict(list)
-        self.text_lower_index: Dict[str, List[int]] = defaultdict(list)
+    def __init__(self, source_tokens: TokenSequence) -> None:
         self.source_tokens = source_tokens
+        self._string_ids: Dict[str, int] = {}
+
+        positions: List[int] = []
+        text_ids: List[int] = []
+        lower_ids: List[int] = []
+        lemma_stem_ids: List[int] = []
+
+        for i, text, lemma, stem in TokenStream.iter_words_of(source_tokens):
+            positions.append(i)
+            text_ids.append(self._intern(text))
+            lower_ids.append(self._intern(text.lower()))
+            lemma_stem_ids.append(self._lemma_stem_key(self._intern(lemma), self._intern(stem)))
+
+        positions_array: np.ndarray = np.array(positions, dtype=np.int32)
+        lemma_stem_array: np.ndarray = np.array(lemma_stem_ids, dtype=np.int64)
+        has_lemma_stem: np.ndarray = lemma_stem_array != _NONE_ID
+
+        self._text_index: _PostingIndex = _PostingIndex(np.array(text_ids, dtype=np.int64), positions_array)
+        self._text_lower_index: _PostingIndex = _PostingIndex(np.array(lower_ids, dtype=np.int64), positions_array)
+        self._lemma_stem_index: _PostingIndex = _PostingIndex(
+            lemma_stem_array[has_lemma_stem],
+            positions_array[has_lemma_stem],
+        )
+
+        # [start] (lemma, stem) key of the words of every text
+        text_array: np.ndarray = np.array(text_ids, dtype=np.int64)
+        order: np.ndarray = np.argsort(text_array, kind='stable')
+        sorted_texts: np.ndarray = text_array[order]
+        sorted_keys: np.ndarray = lemma_stem_array[order]
+        starts: np.ndarray = np.flatnonzero(np.diff(sorted_texts, prepend=-1))
+        min_keys: np.ndarray = np.minimum.reduceat(sorted_keys, starts) if len(starts) else sorted_keys
+        max_keys: np.ndarray = np.maximum.reduceat(sorted_keys, starts) if len(starts) else sorted_keys
+        self._text_lemma_stem: Dict[int, int] = dict(zip(
+            sorted_texts[starts].tolist(),
+            np.where(min_keys == max_keys, min_keys, _AMBIGUOUS_ID).tolist(),
+        ))
+        # [end]
+
+    def _intern(self, value: Optional[str]) -> int:
+        if not value:
+            return _NONE_ID
 
-        for i, token in enumerate(source_tokens):
-            if token.type == TokenType.WORD:
-                if token.lemma:
-                    self.lemma_index[token.lemma].append(i)
-                if token.stem:
-                    self.stem_index[token.stem].append(i)
-                self.text_index[token.text].append(i)
-                self.text_lower_index[token.text.lower()].append(i)
-
-    def find_candidate_positions(self, token: Token) -> Set[int]:
-        candidates: Set[int] = set()
-        if token.lemma:
-            candidates.update(self.lemma_index.get(token.lemma, []))
-        if token.stem:
-            candidates.update(self.stem_index.get(token.stem, []))
-        if token.text:
-            candidates.update(self.text_index.get(token.text, []))
-            candidates.update(self.text_lower_index.get(token.text.lower(), []))
-        return candidates
+        return self._string_ids.setdefault(value, len(self._string_ids))
+
+    @staticmethod
+    def _lemma_stem_key(lemma_id: int, stem_id: int) -> int:
+        if lemma_id == _NONE_ID or stem_id == _NONE_ID:
+            return _NONE_ID
+
+        # Cantor pairing: unique int64 for a pair of interned ids
+        return (lemma_id + stem_id) * (lemma_id + stem_id + 1) // 2 + stem_id
+
+    def _token_keys(self, token: Token) -> tuple[int, int]:
+        """(text id, (lemma, stem) key) of a search token; _NONE_ID when not in the document."""
+        text_id: int = self._string_ids.get(token.text, _NONE_ID) if token.text else _NONE_ID
+        lemma_id: int = self._string_ids.get(token.lemma, _NONE_ID) if token.lemma else _NONE_ID
+        stem_id: int = self._string_ids.get(token.stem, _NONE_ID) if token.stem else _NONE_ID
+
+        return text_id, self._lemma_stem_key(lemma_id, stem_id)
+
+    def find_candidate_positions(self, token: Token) -> np.ndarray:
+        """Sorted positions of source words equal to token (by text, or by lemma and stem)."""
+        text_id, lemma_stem_key = self._token_keys(token)
+        by_text: np.ndarray = self._text_index.get(text_id) if text_id != _NONE_ID else _EMPTY_POSITIONS
+        by_lemma_stem: np.ndarray = (
+            self._lemma_stem_index.get(lemma_stem_key) if lemma_stem_key != _NONE_ID else _EMPTY_POSITIONS
+        )
+
+        if len(by_lemma_stem) == 0:
+            return by_text
+
+        if len(by_text) == 0:
+            return by_lemma_stem
+
+        return np.union1d(by_text, by_lemma_stem)
+
+    def count_candidate_positions(self, token: Token) -> int:
+        """Upper bound of len(find_candidate_positions(token)) without building the array."""
+        text_id, lemma_stem_key = self._token_keys(token)
+
+        return (
+            (self._text_index.count(text_id) if text_id != _NONE_ID else 0)
+            + (self._lemma_stem_index.count(lemma_stem_key) if lemma_stem_key != _NONE_ID else 0)
+        )
+
+    def is_match_key_exact(self, token: Token) -> bool:
+        """
+        True when source words with the token's match key are exactly the ones is_equal accepts.
+
+        Words with equal match keys are always equal; is_equal also accepts a word
+        with the same text and another key, e.g. when lemmas of the token and of
+        the document come from different lemmatizer states.
+        """
+        text_id: int = self._string_ids.get(token.text, _NONE_ID) if token.text else _NONE_ID
+        source_key: Optional[int] = self._text_lemma_stem.get(text_id)
+
+        if source_key is None:
+            return True
+
+        if token.lemma and token.stem:
+            _, lemma_stem_key = self._token_keys(token)
+
+            return lemma_stem_key != _NONE_ID and source_key == lemma_stem_key
+
+        # text key: equal only to words without lemma or stem
+        return source_key == _NONE_ID
 
     def has_token(self, token: Token) -> bool:
-        if token.lemma and token.lemma in self.lemma_index:
-            for idx in self.lemma_index[token.lemma]:
-                if token.is_equal(self.source_tokens[idx]):
-                    return True
-        if token.stem and token.stem in self.stem_index:
-            for idx in self.stem_index[token.stem]:
-                if token.is_equal(self.source_tokens[idx]):
-                    return True
-        if token.text:
-            if token.text in self.text_index:
-                return True
-            if token.text.lower() in self.text_lower_index:
-                return True
-        return False
+        text_id, lemma_stem_key = self._token_keys(token)
+
+        if text_id != _NONE_ID and text_id in self._text_index:
+            return True
+
+        if lemma_stem_key != _NONE_ID and lemma_stem_key in self._lemma_stem_index:
+            return True
+
+        # case-insensitive text presence, as before
+        lower_id: int = self._string_ids.get(token.text.lower(), _NONE_ID) if token.text else _NONE_ID
+
+        return lower_id != _NONE_ID and lower_id in self._text_lower_index
 
     def filter_tokens(self, tokens: List[Token]) -> List[Token]:
         return [t for t in tokens if self.has_token(t)]
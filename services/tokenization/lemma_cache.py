@@ -0,0 +1,110 @@
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from services.utils.get_project_root import get_project_root
+
+# (lemma, stem)
+LemmaStem = Tuple[str, str]
+
+
+class LemmaCache:
+    """
+    Persistent cross-process word -> (lemma, stem) cache in a SQLite file.
+
+    Survives pymorphy_service.reset_caches() and worker restarts. One connection
+    per process (re-opened after fork), guarded by a lock for thread executors.
+    Rows are keyed by pymorphy_service.models_fingerprint(), so an upgrade of
+    morphology libraries or dictionaries never reuses old lemmas. The table keeps
+    at most MAX_ROWS latest rows; older ones, including those of previous
+    fingerprints, are evicted on insert.
+    """
+
+    FORMAT_VERSION: int = 2
+    PATH_ENV: str = "LEMMA_CACHE_PATH"
+    MAX_ROWS_ENV: str = "LEMMA_CACHE_MAX_ROWS"
+    DEFAULT_MAX_ROWS: int = 2_000_000
+    # keep below SQLite host parameters limit
+    QUERY_CHUNK_SIZE: int = 500
+
+    _instance: Optional['LemmaCache'] = None
+
+    def __init__(self, path: Path, max_rows: Optional[int] = None) -> None:
+        self._path: Path = path
+        self._max_rows: int = max_rows if max_rows is not None else int(
+            os.environ.get(LemmaCache.MAX_ROWS_ENV, LemmaCache.DEFAULT_MAX_ROWS)
+        )
+        self._lock: threading.Lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    @staticmethod
+    def get_instance() -> 'LemmaCache':
+        if LemmaCache._instance is None:
+            default_path: Path = get_project_root() / "cache" / f"lemma_cache.v{LemmaCache.FORMAT_VERSION}.sqlite3"
+            LemmaCache._instance = LemmaCache(Path(os.environ.get(LemmaCache.PATH_ENV, default_path)))
+
+        return LemmaCache._instance
+
+    def _get_connection(self) -> sqlite3.Connection:
+        if self._connection is not None and self._pid == os.getpid():
+            return self._connection
+
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        connection: sqlite3.Connection = sqlite3.connect(str(self._path), timeout=30, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS morph ("
+            "fingerprint TEXT NOT NULL, word TEXT NOT NULL, lemma TEXT NOT NULL, stem TEXT NOT NULL, "
+            "PRIMARY KEY (fingerprint, word))"
+        )
+        connection.commit()
+
+        self._connection = connection
+        self._pid = os.getpid()
+
+        return connection
+
+    def get_many(self, fingerprint: str, words: Iterable[str]) -> Dict[str, LemmaStem]:
+        """Returns cached (lemma, stem) of the models fingerprint for known words; unknown words are absent."""
+        words_list: List[str] = list(words)
+        found: Dict[str, LemmaStem] = {}
+
+        if len(words_list) == 0:
+            return found
+
+        with self._lock:
+            connection: sqlite3.Connection = self._get_connection()
+
+            for i in range(0, len(words_list), LemmaCache.QUERY_CHUNK_SIZE):
+                chunk: List[str] = words_list[i:i + LemmaCache.QUERY_CHUNK_SIZE]
+                placeholders: str = ",".join("?" * len(chunk))
+                rows = connection.execute(
+                    f"SELECT word, lemma, stem FROM morph WHERE fingerprint = ? AND word IN ({placeholders})",
+                    [fingerprint, *chunk],
+                )
+
+                for word, lemma, stem in rows:
+                    found[word] = (lemma, stem)
+
+        return found
+
+    def put_many(self, fingerprint: str, items: Dict[str, LemmaStem]) -> None:
+        if len(items) == 0:
+            return
+
+        with self._lock:
+            connection: sqlite3.Connection = self._get_connection()
+            connection.executemany(
+                "INSERT OR IGNORE INTO morph (fingerprint, word, lemma, stem) VALUES (?, ?, ?, ?)",
+                [(fingerprint, word, lemma, stem) for word, (lemma, stem) in items.items()],
+            )
+            # rowids grow with inserts, so this drops the oldest rows by a rowid range
+            connection.execute(
+                "DELETE FROM morph WHERE rowid <= (SELECT MAX(rowid) FROM morph) - ?",
+                (self._max_rows,),
+            )
+            connection.commit()
@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple, Union
 
 
 class TokenType(Enum):
@@ -9,6 +9,8 @@ class TokenType(Enum):
 
 
 class Token:
+    __slots__ = ('text', 'start', 'end', 'type', 'lemma', 'stem')
+
     text: str
     start: int
     end: int
@@ -44,6 +46,18 @@ class Token:
 
         return False
 
+    def match_key(self) -> Union[str, Tuple[str, str]]:
+        """
+        Hashable equality key consistent with is_equal for tokens of one tokenizer:
+        (lemma, stem) when both are known, otherwise the token text. Equal keys mean
+        equal tokens; tokens with equal text and different keys are still equal by
+        is_equal (see TokenDictionary.is_match_key_exact).
+        """
+        if self.lemma and self.stem:
+            return self.lemma, self.stem
+
+        return self.text
+
     def to_dict(self) -> Dict[str, Any]:
         return {
             'text': self.text,
@@ -0,0 +1,271 @@
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple, Union, overload
+
+import numpy as np
+
+from services.tokenization.token import Token, TokenType
+
+_TYPE_BY_CODE: Tuple[TokenType, ...] = (TokenType.WORD, TokenType.PUNCTUATION, TokenType.SPACE)
+_CODE_BY_TYPE: Dict[TokenType, int] = {t: code for code, t in enumerate(_TYPE_BY_CODE)}
+_WORD_CODE: int = _CODE_BY_TYPE[TokenType.WORD]
+_NONE_ID: int = -1
+
+# (token index, text, lemma, stem)
+WordRow = Tuple[int, str, Optional[str], Optional[str]]
+
+
+class TokenStream:
+    """
+    Columnar token storage for large documents.
+
+    Positions and types live in int arrays, text/lemma/stem are ids of interned
+    strings. Indexing returns lightweight TokenView objects, so code written
+    for List[Token] keeps working; hot loops should use iter_words().
+    """
+
+    def __init__(self) -> None:
+        self._starts: array = array('q')
+        self._ends: array = array('q')
+        self._types: array = array('b')
+        self._text_ids: array = array('l')
+        self._lemma_ids: array = array('l')
+        self._stem_ids: array = array('l')
+        self._strings: List[str] = []
+        self._string_ids: Dict[str, int] = {}
+
+    def _intern(self, value: Optional[str]) -> int:
+        if value is None:
+            return _NONE_ID
+
+        string_id: Optional[int] = self._string_ids.get(value)
+
+        if string_id is None:
+            string_id = len(self._strings)
+            self._strings.append(value)
+            self._string_ids[value] = string_id
+
+        return string_id
+
+    def _string(self, string_id: int) -> Optional[str]:
+        return self._strings[string_id] if string_id != _NONE_ID else None
+
+    def append(
+        self,
+        text: str,
+        start: int,
+        end: int,
+        type: TokenType,
+        lemma: Optional[str] = None,
+        stem: Optional[str] = None,
+    ) -> int:
+        """Appends token row and returns its index."""
+        self._starts.append(start)
+        self._ends.append(end)
+        self._types.append(_CODE_BY_TYPE[type])
+        self._text_ids.append(self._intern(text))
+        self._lemma_ids.append(self._intern(lemma))
+        self._stem_ids.append(self._intern(stem))
+
+        return len(self._starts) - 1
+
+    def set_morph(self, idx: int, lemma: Optional[str], stem: Optional[str]) -> 'TokenStream':
+        self._lemma_ids[idx] = self._intern(lemma)
+        self._stem_ids[idx] = self._intern(stem)
+
+        return self
+
+    @staticmethod
+    def from_tokens(tokens: List[Token]) -> 'TokenStream':
+        stream: TokenStream = TokenStream()
+
+        for t in tokens:
+            stream.append(t.text, t.start, t.end, t.type, t.lemma, t.stem)
+
+        return stream
+
+    def slice(self, start: int, stop: int) -> 'TokenStream':
+        """Standalone stream of rows [start, stop) holding only the strings they use."""
+        stream: TokenStream = TokenStream()
+        stream._starts = self._starts[start:stop]
+        stream._ends = self._ends[start:stop]
+        stream._types = self._types[start:stop]
+
+        columns: List[np.ndarray] = [
+            np.frombuffer(column, dtype=np.dtype(column.typecode))[start:stop]
+            for column in (self._text_ids, self._lemma_ids, self._stem_ids)
+        ]
+        used_ids: np.ndarray = np.unique(np.concatenate(columns))
+        used_ids = used_ids[used_ids != _NONE_ID]
+
+        stream._strings = [self._strings[string_id] for string_id in used_ids.tolist()]
+        stream._string_ids = {value: string_id for string_id, value in enumerate(stream._strings)}
+
+        # old string id -> position in used_ids
+        remapped: List[array] = []
+
+        for column in columns:
+            new_ids: np.ndarray = np.where(column == _NONE_ID, _NONE_ID, np.searchsorted(used_ids, column))
+            remapped.append(array(self._text_ids.typecode, new_ids.astype(column.dtype).tobytes()))
+
+        stream._text_ids, stream._lemma_ids, stream._stem_ids = remapped
+
+        return stream
+
+    def to_tokens(self) -> List[Token]:
+        """Materializes standalone Token objects."""
+        return [
+            Token(
+                text=self.text(i),
+                start=self._starts[i],
+                end=self._ends[i],
+                type=self.type(i),
+                lemma=self.lemma(i),
+                stem=self.stem(i),
+            )
+            for i in range(len(self))
+        ]
+
+    # [start] column accessors
+    def text(self, idx: int) -> str:
+        return self._strings[self._text_ids[idx]]
+
+    def start(self, idx: int) -> int:
+        return self._starts[idx]
+
+    def end(self, idx: int) -> int:
+        return self._ends[idx]
+
+    def type(self, idx: int) -> TokenType:
+        return _TYPE_BY_CODE[self._types[idx]]
+
+    def lemma(self, idx: int) -> Optional[str]:
+        return self._string(self._lemma_ids[idx])
+
+    def stem(self, idx: int) -> Optional[str]:
+        return self._string(self._stem_ids[idx])
+
+    def starts(self) -> array:
+        return self._starts
+
+    def ends(self) -> array:
+        return self._ends
+    # [end]
+
+    def iter_words(self) -> Iterator[WordRow]:
+        strings: List[str] = self._strings
+        types: array = self._types
+        text_ids: array = self._text_ids
+        lemma_ids: array = self._lemma_ids
+        stem_ids: array = self._stem_ids
+
+        for i in range(len(types)):
+            if types[i] != _WORD_CODE:
+                continue
+
+            lemma_id: int = lemma_ids[i]
+            stem_id: int = stem_ids[i]
+            yield (
+                i,
+                strings[text_ids[i]],
+                strings[lemma_id] if lemma_id != _NONE_ID else None,
+                strings[stem_id] if stem_id != _NONE_ID else None,
+            )
+
+    @staticmethod
+    def iter_words_of(tokens: 'TokenSequence') -> Iterator[WordRow]:
+        """Word rows of a TokenStream or a plain token list."""
+        if isinstance(tokens, TokenStream):
+            return tokens.iter_words()
+
+        return (
+            (i, t.text, t.lemma, t.stem)
+            for i, t in enumerate(tokens)
+            if t.type == TokenType.WORD
+        )
+
+    def word_indices(self) -> np.ndarray:
+        """Ascending token indices of words."""
+        return np.flatnonzero(np.frombuffer(self._types, dtype=np.int8) == _WORD_CODE)
+
+    @staticmethod
+    def word_indices_of(tokens: 'TokenSequence') -> np.ndarray:
+        if isinstance(tokens, TokenStream):
+            return tokens.word_indices()
+
+        return np.array([i for i, t in enumerate(tokens) if t.type == TokenType.WORD], dtype=np.int64)
+
+    def count_words(self) -> int:
+        return self._types.count(_WORD_CODE)
+
+    @staticmethod
+    def count_words_of(tokens: 'TokenSequence') -> int:
+        if isinstance(tokens, TokenStream):
+            return tokens.count_words()
+
+        return sum(1 for t in tokens if t.type == TokenType.WORD)
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    @overload
+    def __getitem__(self, idx: int) -> 'TokenView': ...
+
+    @overload
+    def __getitem__(self, idx: slice) -> List['TokenView']: ...
+
+    def __getitem__(self, idx: Union[int, slice]) -> Union['TokenView', List['TokenView']]:
+        if isinstance(idx, slice):
+            return [TokenView(self, i) for i in range(*idx.indices(len(self)))]
+
+        if idx < 0:
+            idx += len(self)
+
+        if not 0 <= idx < len(self):
+            raise IndexError("token index out of range")
+
+        return TokenView(self, idx)
+
+    def __iter__(self) -> Iterator['TokenView']:
+        for i in range(len(self)):
+            yield TokenView(self, i)
+
+
+class TokenView(Token):
+    """Read-only Token facade over one TokenStream row."""
+
+    __slots__ = ('_stream', '_idx')
+
+    def __init__(self, stream: TokenStream, idx: int) -> None:
+        self._stream: TokenStream = stream
+        self._idx: int = idx
+
+    @property
+    def index(self) -> int:
+        return self._idx
+
+    @property
+    def text(self) -> str:
+        return self._stream.text(self._idx)
+
+    @property
+    def start(self) -> int:
+        return self._stream.start(self._idx)
+
+    @property
+    def end(self) -> int:
+        return self._stream.end(self._idx)
+
+    @property
+    def type(self) -> TokenType:
+        return self._stream.type(self._idx)
+
+    @property
+    def lemma(self) -> Optional[str]:
+        return self._stream.lemma(self._idx)
+
+    @property
+    def stem(self) -> Optional[str]:
+        return self._stream.stem(self._idx)
+
+
+TokenSequence = Union[List[Token], TokenStream]
@@ -1,18 +1,20 @@
 import re
 from typing import List, Optional
 
-from services import pymorphy_service
 from services.pymorphy_service import ensure_models_loaded
 from services.progress.combined_progress.combined_progress import CombinedProgress
 
+from services.tokenization.batch_lemmatizer import BatchLemmatizer
 from services.tokenization.token import Token, TokenType
+from services.tokenization.token_stream import TokenStream
 from services.utils.normalize_text import normalize_text
 
 
 class Tokenizer:
     """
     Text tokenizer; reports tokenization progress as 0–100% on CombinedProgress when provided.
-    Intermediate updates are throttled (every PROGRESS_REPORT_EVERY_N_WORDS words); final % is always sent.
+    Intermediate updates are throttled (every PROGRESS_REPORT_EVERY_N_WORDS lemmatized unique words);
+    final % is always sent.
     """
 
     TOKENIZE_PATTERN = re.compile(r"(\w+)|([^\w\s]+)|(\s+)", re.UNICODE)
@@ -21,16 +23,17 @@ class Tokenizer:
 
     def __init__(self, combined_progress: Optional[CombinedProgress] = None) -> None:
         self._combined_progress: Optional[CombinedProgress] = combined_progress
+        self._lemmatizer: BatchLemmatizer = BatchLemmatizer()
 
-    def _report_tokenize_progress(self, end_exclusive: int, text_len: int) -> None:
+    def _report_tokenize_progress(self, proceed: int, total: int) -> None:
         if self._combined_progress is None:
             return
 
-        if text_len <= 0:
+        if total <= 0:
             percent: float = 100.0
         else:
-            covered: int = min(end_exclusive, text_len)
-            percent = 100.0 * float(covered) / float(text_len)
+            covered: int = min(proceed, total)
+            percent = 100.0 * float(covered) / float(total)
 
         self._combined_progress.set_particle_value(
             Tokenizer.PARTICLE_KEY,
@@ -44,20 +47,26 @@ class Tokenizer:
         Returns list of Token with text, start, end, type ('word', 'punct', 'space'),
         lemma and stem for words.
         """
+        return self.tokenize_stream(text).to_tokens()
+
+    def tokenize_stream(self, text: str) -> TokenStream:
+        """
+        Tokenizes text into a columnar TokenStream (preferred for whole documents).
+        Unique word forms are lemmatized in one batch.
+        """
         ensure_models_loaded()
 
-        tokens: List[Token] = []
+        stream: TokenStream = TokenStream()
 
         if not text:
             self._report_tokenize_progress(0, 0)
 
-            return tokens
-
-        text_len: int = len(text)
+            return stream
 
         current_pos = 0
-        words_processed: int = 0
+        word_indices: List[int] = []
 
+        # [start] split text on tokens
         for match in Tokenizer.TOKENIZE_PATTERN.finditer(text):
             start, end = match.span()
             text_token: str = (
@@ -69,60 +78,41 @@ class Tokenizer:
             )
 
             if start > current_pos:
-                missed_text = text[current_pos:start]
-                tokens.append(Token(
-                    text=missed_text,
-                    start=current_pos,
-                    end=start,
-                    type=TokenType.PUNCTUATION,
-                    lemma=None,
-                    stem=None
-                ))
+                stream.append(text[current_pos:start], current_pos, start, TokenType.PUNCTUATION)
 
             token_type = TokenType.PUNCTUATION
-            lemma = None
-            stem = None
 
             if match.group(1):
                 token_type = TokenType.WORD
-                word_lower = text_token.lower()
-                lemma = pymorphy_service._get_lemma(word_lower)
-                stem = pymorphy_service._get_stem(word_lower)
             elif match.group(3):
                 token_type = TokenType.SPACE
 
-            tokens.append(Token(
-                text=text_token,
-                start=start,
-                end=end,
-                type=token_type,
-                lemma=lemma,
-                stem=stem
-            ))
+            token_idx: int = stream.append(text_token, start, end, token_type)
             current_pos = end
 
             if token_type == TokenType.WORD:
-                words_processed += 1
-
-                if (
-                    self._combined_progress is not None
-                    and words_processed % Tokenizer.PROGRESS_REPORT_EVERY_N_WORDS == 0
-                ):
-                    self._report_tokenize_progress(current_pos, text_len)
+                word_indices.append(token_idx)
 
         if current_pos < len(text):
-            remaining_text = text[current_pos:]
-            tokens.append(Token(
-                text=remaining_text,
-                start=current_pos,
-                end=len(text),
-                type=TokenType.PUNCTUATION,
-                lemma=None,
-                stem=None
-            ))
-            current_pos = len(text)
+            stream.append(text[current_pos:], current_pos, len(text), TokenType.PUNCTUATION)
+        # [end]
+
+        # [start] lemmatize unique word forms in one batch
+        def _on_word_proceed(proceed: int, total: int) -> None:
+            if proceed % Tokenizer.PROGRESS_REPORT_EVERY_N_WORDS == 0:
+                self._report_tokenize_progress(proceed, total)
+
+        morph = self._lemmatizer.lemmatize(
+            (stream.text(i) for i in word_indices),
+            on_word_proceed=_on_word_proceed if self._combined_progress is not None else None,
+        )
+
+        for i in word_indices:
+            lemma, stem = morph[stream.text(i)]
+            stream.set_morph(i, lemma, stem)
+        # [end]
 
         if self._combined_progress is not None:
-            self._report_tokenize_progress(current_pos, text_len)
+            self._report_tokenize_progress(1, 1)
 
-        return tokens
+        return stream
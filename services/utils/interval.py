@@ -1,4 +1,6 @@
-from typing import Union
+from typing import Callable, Iterable, List, Tuple, TypeVar, Union
+
+T = TypeVar('T')
 
 
 class Interval:
@@ -37,7 +39,36 @@ class Interval:
         return self.intersection(other) is not None
 
     def union(self, other: 'Interval') -> Union['Interval', None]:
-        if self.intersects(other) is None:
+        if not self.intersects(other):
             return None
 
         return Interval(min(self.begin, other.begin), max(self.end, other.end))
+
+
+def group_overlapping(items: Iterable[T], get_interval: Callable[[T], Interval]) -> List[Tuple[Interval, List[T]]]:
+    """
+    Groups items whose intervals overlap, directly or through other items of the group.
+
+    One sort by begin and one sweep, O(m log m). Groups are ordered by begin,
+    items of a group keep their input order.
+    """
+    keyed: List[Tuple[Interval, int, T]] = sorted(
+        ((get_interval(item), i, item) for i, item in enumerate(items)),
+        key=lambda entry: (entry[0].begin, entry[1]),
+    )
+    groups: List[Tuple[Interval, List[Tuple[int, T]]]] = []
+
+    for interval, i, item in keyed:
+        if len(groups) > 0 and interval.begin <= groups[-1][0].end:
+            group_interval, group_items = groups[-1]
+            group_items.append((i, item))
+
+            if interval.end > group_interval.end:
+                groups[-1] = (Interval(group_interval.begin, interval.end), group_items)
+        else:
+            groups.append((interval, [(i, item)]))
+
+    return [
+        (interval, [item for _, item in sorted(group_items, key=lambda entry: entry[0])])
+        for interval, group_items in groups
+    ]
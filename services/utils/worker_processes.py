@@ -0,0 +1,36 @@
+import multiprocessing
+import os
+import sys
+from multiprocessing.context import SpawnContext
+
+from config.main import get_executor_max_workers
+
+
+def get_worker_processes(env_name: str) -> int:
+    """
+    Number of worker processes one task may spawn.
+
+    Taken from the `env_name` variable if set, otherwise CPUs are divided
+    between the tasks the executor runs at once.
+    """
+    workers: str = os.environ.get(env_name, "")
+
+    if workers.isdigit() and int(workers) > 0:
+        return int(workers)
+
+    return max((os.cpu_count() or 1) // max(get_executor_max_workers(), 1), 1)
+
+
+def get_spawn_context() -> SpawnContext:
+    """
+    Multiprocessing context for worker pools, children start in UTF-8 mode as the parent.
+
+    A spawned child inherits the environment but not the UTF-8 mode: under the C
+    locale the parent gets it by locale coercion, the child sees C.UTF-8 and does
+    not, and importing services.declension_name.declension re-executes it, which
+    breaks the pool. PYTHONUTF8 passes the mode on explicitly.
+    """
+    if sys.flags.utf8_mode:
+        os.environ["PYTHONUTF8"] = "1"
+
+    return multiprocessing.get_context("spawn")
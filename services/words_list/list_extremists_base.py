@@ -5,6 +5,7 @@ from models import ExtremistTerrorist
 from models.extremists_terrorists import ExtremistArea, ExtremistType
 from services.enum import WordsListKey
 from services.fulltext_search.phrase import EType, Phrase
+from services.words_list.phrase_list_index import PhraseListIndex
 from services.words_list.words_list import WordsList
 
 
@@ -20,6 +21,9 @@ class ListExtremistsTerroristsBase(WordsList, ABC):
         super().__init__()
 
     def load(self) -> list[Phrase]:
+        return PhraseListIndex(self).load(self._load_phrases)
+
+    def _load_phrases(self) -> list[Phrase]:
         query = ExtremistTerrorist.query.with_entities(
             ExtremistTerrorist.raw_source,
             ExtremistTerrorist.search_terms
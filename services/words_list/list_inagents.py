@@ -7,6 +7,7 @@ from models.inagents import AgentType
 from services.enum import WordsListKey
 from services.fulltext_search.phrase import EType, Phrase
 from services.words_list import WordsList
+from services.words_list.phrase_list_index import PhraseListIndex
 
 
 def _inagents_active_filter(query):
@@ -26,13 +27,31 @@ class ListInagents(WordsList):
     key = WordsListKey.INAGENTS
     agent_types: ClassVar[List[AgentType]]
 
-    def load(self) -> list[Phrase]:
+    def _query_models(self) -> list[Inagent]:
         query = Inagent.query
 
         if self.agent_types:
             query = query.filter(Inagent.agent_type.in_(self.agent_types))
 
-        models: list[Inagent] = query.all()
+        return query.all()
+
+    def load(self) -> list[Phrase]:
+        # models are queried to build the index only; matched phrases get theirs in attach_models
+        return PhraseListIndex(self).load(lambda: self._load_phrases(self._query_models()))
+
+    def attach_models(self, phrases: List[Phrase]) -> None:
+        phrases = [phrase for phrase in phrases if not phrase.is_model_loaded]
+
+        if not phrases:
+            return
+
+        model_ids = {phrase.model_id for phrase in phrases}
+        models = {inagent.id: inagent for inagent in Inagent.query.filter(Inagent.id.in_(model_ids)).all()}
+
+        for phrase in phrases:
+            phrase.model = models.get(phrase.model_id)
+
+    def _load_phrases(self, models: list[Inagent]) -> list[Phrase]:
         phrases = []
 
         for inagent in models:
@@ -0,0 +1,217 @@
+import os
+import pickle
+import tempfile
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from services import pymorphy_service
+from services.enum import WordsListKey
+from services.fulltext_search.batch_declension import BatchDeclension
+from services.fulltext_search.phrase import EType, Phrase
+from services.tokenization import Token, TokenType
+from services.utils import normalize_text
+from services.utils.get_project_root import get_project_root
+from services.words_list.words_list import WordsList
+
+# (text, start, end, type, lemma, stem)
+TokenRecord = Tuple[str, int, int, str, Optional[str], Optional[str]]
+# (phrase, phrase_original, phrase_type, tokens, model_id, declined_forms)
+PhraseRecord = Tuple[str, Optional[str], str, List[TokenRecord], Optional[int], Optional[List[str]]]
+
+
+class PhraseListIndex:
+    """
+    Versioned on-disk index of precompiled list phrases, built once for all workers.
+
+    Stores tokens (with lemmas and stems), declined surname/full name forms and
+    model ids, so tasks skip tokenization, declension and model queries of
+    predefined lists. Every process unpickles the index once per version and
+    keeps the records; Phrase objects are made from them per task.
+    Each list key has a version file; writers call invalidate() after changing
+    list data. Index files are also keyed by pymorphy_service.models_fingerprint(),
+    and not written while morphology models are not loaded.
+    """
+
+    FORMAT_VERSION: int = 1
+    DIR_ENV: str = "PHRASE_LIST_INDEX_DIR"
+    # version of a list never invalidated
+    INITIAL_VERSION: str = "0"
+
+    # class name -> ((version, models fingerprint), records) loaded in this process
+    _loaded: Dict[str, Tuple[Tuple[str, Optional[str]], List[PhraseRecord]]] = {}
+
+    def __init__(self, words_list: WordsList) -> None:
+        self._words_list: WordsList = words_list
+        self._name: str = type(words_list).__name__
+
+    @staticmethod
+    def get_dir() -> Path:
+        index_dir: Path = Path(os.environ.get(PhraseListIndex.DIR_ENV, get_project_root() / "cache" / "phrase_list_index"))
+        index_dir.mkdir(parents=True, exist_ok=True)
+
+        return index_dir
+
+    @staticmethod
+    def _key_value(key: Union[WordsListKey, str]) -> str:
+        return key.value if isinstance(key, WordsListKey) else str(key)
+
+    @staticmethod
+    def _version_path(key: Union[WordsListKey, str]) -> Path:
+        return PhraseListIndex.get_dir() / f"{PhraseListIndex._key_value(key)}.version"
+
+    @staticmethod
+    def read_version(key: Union[WordsListKey, str]) -> str:
+        version_path: Path = PhraseListIndex._version_path(key)
+
+        if not version_path.is_file():
+            return PhraseListIndex.INITIAL_VERSION
+
+        content: str = version_path.read_text(encoding="utf-8").strip()
+
+        return content if content.isalnum() else PhraseListIndex.INITIAL_VERSION
+
+    @staticmethod
+    def _write_atomic(path: Path, content: bytes) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def invalidate(key: Union[WordsListKey, str]) -> None:
+        """
+        Give the list key a new version and drop its index files. Call after the data change is committed.
+
+        Versions are random tokens, not counters: concurrent writers never write
+        the same version, so no reader keeps an index built before the last change.
+        """
+        key_value: str = PhraseListIndex._key_value(key)
+        version: str = uuid.uuid4().hex
+        PhraseListIndex._write_atomic(PhraseListIndex._version_path(key_value), version.encode("utf-8"))
+
+        for index_path in PhraseListIndex.get_dir().glob(f"{key_value}.*.pickle"):
+            index_path.unlink(missing_ok=True)
+
+    def _index_path(self, version: str, fingerprint: str) -> Path:
+        key_value: str = PhraseListIndex._key_value(self._words_list.key)
+
+        return (
+            PhraseListIndex.get_dir()
+            / f"{key_value}.{self._name}.{version}.{fingerprint}.v{PhraseListIndex.FORMAT_VERSION}.pickle"
+        )
+
+    @staticmethod
+    def _declined_forms(phrases: List[Phrase]) -> List[Optional[List[str]]]:
+        """Declined forms of every phrase, read in bulk from the declension cache."""
+        batch_declension: BatchDeclension = BatchDeclension()
+        surname_forms: Dict[str, List[str]] = batch_declension.surname_forms(
+            phrase.phrase for phrase in phrases if phrase.phrase_type == EType.SURNAME
+        )
+        full_name_forms: Dict[str, List[str]] = batch_declension.full_name_forms(
+            phrase.phrase for phrase in phrases if phrase.phrase_type == EType.FULL_NAME
+        )
+        declined_forms: List[Optional[List[str]]] = []
+
+        for phrase in phrases:
+            if phrase.phrase_type == EType.SURNAME:
+                declined_forms.append(surname_forms[normalize_text(phrase.phrase)])
+            elif phrase.phrase_type == EType.FULL_NAME:
+                declined_forms.append(full_name_forms[normalize_text(phrase.phrase)])
+            else:
+                declined_forms.append(None)
+
+        return declined_forms
+
+    @staticmethod
+    def _to_record(phrase: Phrase, declined_forms: Optional[List[str]]) -> PhraseRecord:
+        tokens: List[TokenRecord] = [
+            (t.text, t.start, t.end, t.type.value, t.lemma, t.stem)
+            for t in phrase.tokens
+        ]
+        model_id: Optional[int] = phrase.model_id
+
+        return (
+            phrase.phrase,
+            phrase.phrase_original,
+            phrase.phrase_type.value,
+            tokens,
+            model_id,
+            declined_forms,
+        )
+
+    def _to_phrase(self, record: PhraseRecord) -> Phrase:
+        text, phrase_original, phrase_type, token_records, model_id, declined_forms = record
+
+        return Phrase(
+            phrase=text,
+            source_list=self._words_list,
+            phrase_original=phrase_original,
+            phrase_type=EType(phrase_type),
+            tokens=[
+                Token(text=t[0], start=t[1], end=t[2], type=TokenType(t[3]), lemma=t[4], stem=t[5])
+                for t in token_records
+            ],
+            declined_forms=declined_forms,
+            model_id=model_id,
+        )
+
+    @staticmethod
+    def _read(index_path: Path) -> Optional[List[PhraseRecord]]:
+        if not index_path.is_file():
+            return None
+
+        with open(index_path, "rb") as f:
+            payload: Dict[str, Any] = pickle.load(f)
+
+        if payload.get("format") != PhraseListIndex.FORMAT_VERSION:
+            return None
+
+        return payload["records"]
+
+    def _records(self, build: Callable[[], List[Phrase]]) -> List[PhraseRecord]:
+        pymorphy_service.ensure_models_loaded()
+        state: Tuple[str, Optional[str]] = (
+            PhraseListIndex.read_version(self._words_list.key),
+            pymorphy_service.models_fingerprint(),
+        )
+        version, fingerprint = state
+        loaded: Optional[Tuple[Tuple[str, Optional[str]], List[PhraseRecord]]] = PhraseListIndex._loaded.get(self._name)
+
+        if loaded is not None and loaded[0] == state:
+            return loaded[1]
+
+        index_path: Optional[Path] = self._index_path(version, fingerprint) if fingerprint is not None else None
+        records: Optional[List[PhraseRecord]] = PhraseListIndex._read(index_path) if index_path is not None else None
+
+        if records is None:
+            phrases: List[Phrase] = build()
+            records = [
+                PhraseListIndex._to_record(phrase, declined_forms)
+                for phrase, declined_forms in zip(phrases, PhraseListIndex._declined_forms(phrases))
+            ]
+
+            if index_path is not None:
+                payload: Dict[str, Any] = {
+                    "format": PhraseListIndex.FORMAT_VERSION,
+                    "records": records,
+                }
+                PhraseListIndex._write_atomic(index_path, pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL))
+
+        PhraseListIndex._loaded[self._name] = (state, records)
+
+        return records
+
+    def load(self, build: Callable[[], List[Phrase]]) -> List[Phrase]:
+        """
+        Load list phrases from the index, building it with `build` on a miss.
+
+        Args:
+            build: Loads phrases from DB (tokenized as usual)
+
+        Returns:
+            Phrases with model_id; models are loaded by WordsList.attach_models
+        """
+        return [self._to_phrase(record) for record in self._records(build)]
@@ -5,6 +5,7 @@ from extensions import db
 from models import ListPhrase, ListRecord, PhraseRecord
 from services.fulltext_search.phrase import Phrase
 from services.words_list.list_logs import ListLogs
+from services.words_list.phrase_list_index import PhraseListIndex
 from services.words_list.words_list import WordsList
 
 
@@ -46,8 +47,12 @@ class SimpleList(WordsList):
             db.session.add(link)
 
         db.session.commit()
+        PhraseListIndex.invalidate(self.key)
 
     def load(self) -> List[Phrase]:
+        return PhraseListIndex(self).load(self._load_phrases)
+
+    def _load_phrases(self) -> List[Phrase]:
         list_record = self._get_list_record()
         rows = (
             ListPhrase.query.filter_by(list_id=list_record.id)
@@ -63,6 +68,7 @@ class SimpleList(WordsList):
         ListPhrase.query.filter_by(list_id=list_record.id).delete(synchronize_session=False)
         ListLogs(list_record.id).clear()
         db.session.commit()
+        PhraseListIndex.invalidate(self.key)
 
     def count_phrases(self) -> int:
         list_record = self._get_list_record()
@@ -1,9 +1,12 @@
 from abc import ABC, abstractmethod
-from typing import ClassVar
+from typing import ClassVar, List, TYPE_CHECKING
 
 from services.enum import WordsListKey
 from services.words_list.list_colors import ListColor
 
+if TYPE_CHECKING:
+    from services.fulltext_search.phrase import Phrase
+
 
 class WordsList(ListColor, ABC):
     key: ClassVar[WordsListKey]
@@ -22,3 +25,7 @@ class WordsList(ListColor, ABC):
     @staticmethod
     def patterns() -> dict:
         return {}
+
+    def attach_models(self, phrases: List['Phrase']) -> None:
+        """Loads Phrase.model of phrases by their model_id; lists without models do nothing."""
+        pass
@@ -0,0 +1,18 @@
+import os
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR: Path = Path(__file__).resolve().parents[2]
+
+
+@pytest.fixture
+def clean_locale_env() -> dict:
+    """Environment of a host without locale settings: the interpreter gets UTF-8 mode by C locale coercion only."""
+    env: dict = {
+        name: value for name, value in os.environ.items()
+        if not name.startswith('LC_') and name not in ('LANG', 'LANGUAGE', 'PYTHONUTF8', 'PYTHONIOENCODING')
+    }
+    env['PYTHONPATH'] = os.pathsep.join([str(ROOT_DIR), str(ROOT_DIR / 'tests')])
+
+    return env
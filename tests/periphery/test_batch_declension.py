@@ -0,0 +1,33 @@
+from services.declension_name.declension_cache import DeclensionCache
+from services.fulltext_search.batch_declension import BatchDeclension
+from services.fulltext_search.strategies.surname_strategy.surname import Surname
+
+
+class TestBatchDeclension:
+    def test_surname_forms_round_trip(self, tmp_path):
+        path = tmp_path / 'declension.sqlite3'
+        computed = BatchDeclension(DeclensionCache(path)).surname_forms(['Иванов', 'иванов'])
+
+        assert computed == {'иванов': sorted(Surname('иванов').normalized_forms())}
+
+        # a new cache instance reads forms from the file
+        cache = DeclensionCache(path)
+        version = BatchDeclension.rules_version(DeclensionCache.KIND_SURNAME)
+        assert cache.get_many(DeclensionCache.KIND_SURNAME, version, ['иванов']) == computed
+
+    def test_cached_forms_are_used(self, tmp_path):
+        cache = DeclensionCache(tmp_path / 'declension.sqlite3')
+        version = BatchDeclension.rules_version(DeclensionCache.KIND_SURNAME)
+        cache.put_many(DeclensionCache.KIND_SURNAME, version, {'иванов': ['cached']})
+
+        assert BatchDeclension(cache).surname_forms(['Иванов']) == {'иванов': ['cached']}
+
+    def test_other_rules_version_is_not_used(self, tmp_path):
+        cache = DeclensionCache(tmp_path / 'declension.sqlite3')
+        cache.put_many(DeclensionCache.KIND_SURNAME, 'old', {'иванов': ['cached']})
+
+        assert BatchDeclension(cache).surname_forms(['Иванов'])['иванов'] != ['cached']
+
+    def test_rules_versions_differ_by_kind(self):
+        assert BatchDeclension.rules_version(DeclensionCache.KIND_SURNAME) != \
+            BatchDeclension.rules_version(DeclensionCache.KIND_FULL_NAME)
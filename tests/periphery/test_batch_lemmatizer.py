@@ -0,0 +1,49 @@
+from services import pymorphy_service
+from services.tokenization.batch_lemmatizer import BatchLemmatizer
+from services.tokenization.lemma_cache import LemmaCache
+
+
+class TestBatchLemmatizer:
+    def test_cache_round_trip(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(pymorphy_service, 'models_fingerprint', lambda: 'fp')
+        cache = LemmaCache(tmp_path / 'lemma.sqlite3')
+
+        computed = BatchLemmatizer(cache).lemmatize(['Кошки', 'кошки', 'dogs', '...'])
+
+        assert computed['...'] == (None, None)
+        assert cache.get_many('fp', ['кошки', 'dogs']) == {
+            'кошки': computed['Кошки'],
+            'dogs': computed['dogs'],
+        }
+        assert computed['Кошки'] == computed['кошки']
+
+    def test_cached_values_are_used(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(pymorphy_service, 'models_fingerprint', lambda: 'fp')
+        cache = LemmaCache(tmp_path / 'lemma.sqlite3')
+        cache.put_many('fp', {'кошки': ('кошка-cached', 'кошк-cached')})
+
+        assert BatchLemmatizer(cache).lemmatize(['кошки']) == {'кошки': ('кошка-cached', 'кошк-cached')}
+
+    def test_other_fingerprint_is_not_used(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(pymorphy_service, 'models_fingerprint', lambda: 'new')
+        cache = LemmaCache(tmp_path / 'lemma.sqlite3')
+        cache.put_many('old', {'кошки': ('кошка-old', 'кошк-old')})
+
+        assert BatchLemmatizer(cache).lemmatize(['кошки'])['кошки'][0] != 'кошка-old'
+        assert 'кошки' in cache.get_many('new', ['кошки'])
+
+    def test_cache_bypassed_without_models(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(pymorphy_service, 'models_fingerprint', lambda: None)
+        cache = LemmaCache(tmp_path / 'lemma.sqlite3')
+
+        BatchLemmatizer(cache).lemmatize(['кошки'])
+
+        assert not (tmp_path / 'lemma.sqlite3').exists()
+
+    def test_cache_is_bounded(self, tmp_path):
+        cache = LemmaCache(tmp_path / 'lemma.sqlite3', max_rows=3)
+
+        for i in range(5):
+            cache.put_many('fp', {f'w{i}': (f'l{i}', f's{i}')})
+
+        assert sorted(cache.get_many('fp', [f'w{i}' for i in range(5)])) == ['w2', 'w3', 'w4']
@@ -0,0 +1,206 @@
+import re
+import shutil
+import zipfile
+from concurrent.futures import Future
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List
+
+import pymupdf
+import pytest
+from flask import Flask
+
+from blueprints.tool_highlight import routes
+from blueprints.tool_highlight.routes import highlight_bp
+from services.analysis import AnalyserDocx, AnalyserPdf
+from services.analysis.render_plan import RenderPlan
+from services.enum import WordsListKey
+from services.fulltext_search.phrase import EType, Phrase
+from services.task.result import TaskResult
+from services.utils.color import Color
+from services.words_list import WordsList
+
+DATA_DIR: Path = Path(__file__).resolve().parents[1] / 'pdf' / 'correctness' / '2-pages' / 'data'
+TASK_ID: str = '00000000-0000-4000-8000-000000000025'
+
+
+class ColoredList(WordsList):
+    key = WordsListKey.CUSTOM
+
+    def __init__(self) -> None:
+        self.highlight_color = Color('#ffff00')
+
+    def count_phrases(self) -> int:
+        return 0
+
+
+def _analyse_data() -> SimpleNamespace:
+    words_list = ColoredList()
+    words: List[str] = [w.strip() for w in (DATA_DIR / 'search.txt').read_text(encoding='utf-8').split('\n') if w.strip()]
+
+    return SimpleNamespace(
+        phrases=[Phrase(word, words_list, None, EType.TEXT) for word in words],
+        regex_patterns=None,
+    )
+
+
+def _save_render_plan(analyser, plan_path: Path) -> None:
+    analyser.set_analyse_data(_analyse_data())
+    analyser.analyse_and_highlight(highlight=False)
+    analyser.render_plan.save(str(plan_path))
+
+
+def _docx_parts(path: Path) -> Dict[str, bytes]:
+    with zipfile.ZipFile(path) as package:
+        # comment dates are the time of writing
+        return {
+            name: re.sub(rb'w:date="[^"]*"', b'', package.read(name))
+            for name in package.namelist() if name.endswith('.xml')
+        }
+
+
+def _pdf_annots(path: Path) -> list:
+    with pymupdf.open(path) as document:
+        return [
+            [(tuple(annot.rect), annot.colors['stroke'], annot.info['title'], annot.info['content']) for annot in page.annots()]
+            for page in document
+        ]
+
+
+class TestRenderPlan:
+    def test_docx_render_equals_highlight(self, tmp_path):
+        source: str = str(DATA_DIR / 'source.docx')
+        highlighted = AnalyserDocx(source)
+        highlighted.set_analyse_data(_analyse_data())
+        highlighted.analyse_and_highlight()
+        highlighted.save(str(tmp_path / 'highlighted.docx'))
+        _save_render_plan(AnalyserDocx(source), tmp_path / 'plan.json')
+
+        rendered = AnalyserDocx(source)
+        rendered.render(RenderPlan.load(str(tmp_path / 'plan.json')))
+        rendered.save(str(tmp_path / 'rendered.docx'))
+
+        assert len(highlighted.render_plan.docx_segments) > 0
+        assert _docx_parts(tmp_path / 'rendered.docx') == _docx_parts(tmp_path / 'highlighted.docx')
+
+    @pytest.mark.parametrize('stream', [False, True])
+    def test_pdf_render_equals_highlight(self, tmp_path, stream):
+        source: str = str(DATA_DIR / 'source.pdf')
+        highlighted = AnalyserPdf(source)
+        highlighted.set_analyse_data(_analyse_data())
+        highlighted.analyse_and_highlight(stream=stream)
+        highlighted.save(str(tmp_path / 'highlighted.pdf'))
+        searched = AnalyserPdf(source)
+        searched.set_analyse_data(_analyse_data())
+        searched.analyse_and_highlight(stream=stream, highlight=False)
+        searched.render_plan.save(str(tmp_path / 'plan.json'))
+
+        rendered = AnalyserPdf(source)
+        rendered.render(RenderPlan.load(str(tmp_path / 'plan.json')))
+        rendered.save(str(tmp_path / 'rendered.pdf'))
+
+        assert len(highlighted.render_plan.pdf_annots) > 0
+        assert _pdf_annots(tmp_path / 'rendered.pdf') == _pdf_annots(tmp_path / 'highlighted.pdf')
+
+
+class FakeExecutor:
+    def __init__(self) -> None:
+        self.submitted: List[Future] = []
+
+    def submit(self, fn, *args) -> Future:
+        future: Future = Future()
+        self.submitted.append(future)
+
+        return future
+
+
+@pytest.fixture
+def task_results(monkeypatch) -> Dict[str, dict]:
+    results: Dict[str, dict] = {}
+    monkeypatch.setattr(TaskResult, 'load', staticmethod(lambda task_id: results.get(task_id)))
+    monkeypatch.setattr(TaskResult, 'save', staticmethod(lambda task_id, data: results.__setitem__(task_id, data)))
+
+    return results
+
+
+@pytest.fixture
+def flask_app(tmp_path, task_results, monkeypatch):
+    monkeypatch.setattr(routes, '_RENDER_FUTURES_REGISTRY', {})
+    app = Flask(__name__)
+    app.config['RESULT_DIR_HIGHLIGHT'] = str(tmp_path)
+    app.extensions['executor'] = FakeExecutor()
+    app.register_blueprint(highlight_bp)
+
+    return app
+
+
+def _pending_result(file_ext: str) -> dict:
+    return {
+        'result_filename': f'highlighted_{TASK_ID}{file_ext}',
+        'render_pending': True,
+        'render_params': {
+            'is_docx_source': file_ext == '.docx',
+            'render_plan_filename': f'source_{TASK_ID}.render.json',
+        },
+    }
+
+
+class TestDeferredRender:
+    def test_download_starts_render_once(self, flask_app, task_results, tmp_path):
+        task_results[TASK_ID] = _pending_result('.pdf')
+        executor: FakeExecutor = flask_app.extensions['executor']
+        url: str = f'/download-result/highlighted_{TASK_ID}.pdf'
+
+        with flask_app.test_client() as client:
+            responses = [client.get(url) for _ in range(2)]
+
+            assert [response.status_code for response in responses] == [202, 202]
+            assert responses[0].headers['Refresh'] == str(routes._RENDER_RETRY_SECONDS)
+            assert len(executor.submitted) == 1
+
+            # finished job is forgotten, the rendered file is sent
+            executor.submitted[0].set_result(None)
+            assert TASK_ID not in routes._RENDER_FUTURES_REGISTRY
+            (tmp_path / f'highlighted_{TASK_ID}.pdf').write_bytes(b'%PDF-')
+            response = client.get(url)
+
+            assert response.status_code == 200
+            assert response.data == b'%PDF-'
+
+    def test_not_pending_is_not_started(self, flask_app, task_results, tmp_path):
+        task_results[TASK_ID] = dict(_pending_result('.pdf'), render_pending=False)
+
+        with flask_app.test_request_context():
+            assert not routes._start_deferred_render(f'highlighted_{TASK_ID}.pdf', str(tmp_path))
+            assert not routes._start_deferred_render('unknown.pdf', str(tmp_path))
+
+        assert flask_app.extensions['executor'].submitted == []
+
+    def test_render_job_uses_plan(self, flask_app, task_results, tmp_path, monkeypatch):
+        shutil.copy(DATA_DIR / 'source.docx', tmp_path / f'source_{TASK_ID}.docx')
+        _save_render_plan(AnalyserDocx(str(DATA_DIR / 'source.docx')), tmp_path / f'source_{TASK_ID}.render.json')
+        task_results[TASK_ID] = _pending_result('.docx')
+        monkeypatch.setattr(routes, '_analyse_document', pytest.fail)
+
+        with flask_app.app_context():
+            routes._perform_highlight_render(TASK_ID, str(tmp_path))
+
+        result: dict = task_results[TASK_ID]
+        assert result['render_pending'] is False
+        assert 'render_error' not in result
+        assert not (tmp_path / f'source_{TASK_ID}.render.json').exists()
+        assert b'<w:comment ' in _docx_parts(tmp_path / result['result_filename'])['word/comments.xml']
+
+    def test_render_job_error(self, flask_app, task_results, tmp_path):
+        shutil.copy(DATA_DIR / 'source.pdf', tmp_path / f'source_{TASK_ID}.pdf')
+        task_results[TASK_ID] = _pending_result('.pdf')
+
+        # no render plan
+        with flask_app.app_context():
+            routes._perform_highlight_render(TASK_ID, str(tmp_path))
+
+        result: dict = task_results[TASK_ID]
+        assert result['render_pending'] is False
+        assert result['result_filename'] is None
+        assert result['render_error']
+        assert sorted(path.name for path in tmp_path.iterdir()) == [f'source_{TASK_ID}.pdf']
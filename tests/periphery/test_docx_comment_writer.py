@@ -0,0 +1,68 @@
+import re
+from io import BytesIO
+
+from docx import Document
+from lxml import etree
+
+from services.analysis.docx_comment_writer import DocxCommentWriter
+
+
+class TestDocxCommentWriter:
+    comments = [
+        ((0, 1), 'Список "А" & <Б>', 'Найдено:\tслово\nвторая  строка '),
+        ((1, 1), 'Автор', ''),
+        ((0, 2), 'Автор', 'перенос\rстроки'),
+    ]
+
+    @staticmethod
+    def _document():
+        document = Document()
+        paragraph = document.add_paragraph()
+
+        for text in ('один ', 'два ', 'три'):
+            paragraph.add_run(text)
+
+        return document, paragraph
+
+    @staticmethod
+    def _xml(element) -> str:
+        # comment dates differ by the time of writing
+        return re.sub(r'w:date="[^"]*"', '', etree.tostring(element, encoding='unicode'))
+
+    def test_same_xml_as_add_comment(self):
+        expected_document, expected_paragraph = self._document()
+        document, paragraph = self._document()
+        # taken before comments: reference runs are added to the paragraph
+        expected_runs = expected_paragraph.runs
+        runs = paragraph.runs
+        comment_writer = DocxCommentWriter(document)
+
+        for (first, last), author, text in self.comments:
+            expected_document.add_comment(runs=expected_runs[first:last + 1], text=text, author=author, initials='')
+            comment_writer.add([run._r for run in runs[first:last + 1]], author=author, text=text)
+
+        comment_writer.write()
+
+        assert self._xml(document.element.body) == self._xml(expected_document.element.body)
+        assert self._xml(document.part._comments_part.element) == \
+            self._xml(expected_document.part._comments_part.element)
+
+    def test_round_trip(self):
+        document, paragraph = self._document()
+        runs = paragraph.runs
+        document.add_comment(runs=runs[2], text='существующий', author='Автор', initials='')
+        comment_writer = DocxCommentWriter(document)
+
+        for (first, last), author, text in self.comments:
+            comment_writer.add([run._r for run in runs[first:last + 1]], author=author, text=text)
+
+        comment_writer.write()
+        stream = BytesIO()
+        document.save(stream)
+        reopened = Document(BytesIO(stream.getvalue()))
+
+        assert [(comment.comment_id, comment.author, comment.text) for comment in reopened.comments] == [
+            (0, 'Автор', 'существующий'),
+            # w:br is read back as a line feed
+            *[(i + 1, author, text.replace('\r', '\n')) for i, (_, author, text) in enumerate(self.comments)],
+        ]
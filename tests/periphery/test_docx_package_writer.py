@@ -0,0 +1,101 @@
+import io
+import zipfile
+
+from docx import Document
+from docx.opc.constants import CONTENT_TYPE as CT
+from PIL import Image
+
+from services.analysis.docx_comment_writer import DocxCommentWriter
+from services.analysis.docx_package_writer import DocxPackageWriter
+
+
+class _Unseekable(io.RawIOBase):
+    """Output ZipFile writes with data descriptors after every entry."""
+
+    def __init__(self) -> None:
+        self.buffer = io.BytesIO()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        return self.buffer.write(data)
+
+
+class TestDocxPackageWriter:
+    @staticmethod
+    def _source(tmp_path, with_data_descriptors: bool = False) -> str:
+        image = io.BytesIO()
+        Image.new('RGB', (8, 8), (200, 10, 10)).save(image, format='PNG')
+        document = Document()
+        document.add_paragraph('Первый абзац')
+        document.add_picture(io.BytesIO(image.getvalue()))
+        stream = io.BytesIO()
+        document.save(stream)
+        path = tmp_path / 'source.docx'
+
+        if not with_data_descriptors:
+            path.write_bytes(stream.getvalue())
+            return str(path)
+
+        output = _Unseekable()
+
+        with zipfile.ZipFile(stream) as source_zip, zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            for info in source_zip.infolist():
+                with source_zip.open(info) as source_entry, zip_file.open(info.filename, 'w') as entry:
+                    entry.write(source_entry.read())
+
+        path.write_bytes(output.buffer.getvalue())
+        return str(path)
+
+    @staticmethod
+    def _modify(document) -> None:
+        paragraph = document.paragraphs[0]
+        paragraph.add_run(' и добавленный текст')
+        comment_writer = DocxCommentWriter(document)
+        comment_writer.add([paragraph.runs[-1]._r], author='Автор', text='комментарий')
+        comment_writer.write()
+
+    @staticmethod
+    def _entries(path: str) -> list:
+        with zipfile.ZipFile(path) as zip_file:
+            assert zip_file.testzip() is None
+            return [(info.filename, zip_file.read(info)) for info in zip_file.infolist()]
+
+    def _check(self, tmp_path, with_data_descriptors: bool) -> None:
+        source_path = self._source(tmp_path, with_data_descriptors)
+        expected_document = Document(source_path)
+        self._modify(expected_document)
+        expected_path = str(tmp_path / 'expected.docx')
+        expected_document.save(expected_path)
+
+        document = Document(source_path)
+        self._modify(document)
+        output_path = str(tmp_path / 'output.docx')
+        modified_parts = [
+            part for part in document.part.package.iter_parts()
+            if part.content_type in (CT.WML_DOCUMENT_MAIN, CT.WML_COMMENTS)
+        ]
+        DocxPackageWriter(source_path).save(document, output_path, modified_parts)
+
+        assert self._entries(output_path) == self._entries(expected_path)
+
+        reopened = Document(output_path)
+        assert reopened.paragraphs[0].text == 'Первый абзац и добавленный текст'
+        assert [comment.text for comment in reopened.comments] == ['комментарий']
+        assert len(reopened.inline_shapes) == 1
+
+        # unchanged parts keep their compressed bytes
+        with zipfile.ZipFile(source_path) as source_zip, zipfile.ZipFile(output_path) as output_zip:
+            image_name = next(name for name in source_zip.namelist() if name.startswith('word/media/'))
+            source_info = source_zip.getinfo(image_name)
+            output_info = output_zip.getinfo(image_name)
+
+            assert (output_info.CRC, output_info.compress_size, output_info.compress_type) == \
+                (source_info.CRC, source_info.compress_size, source_info.compress_type)
+
+    def test_same_package_as_document_save(self, tmp_path):
+        self._check(tmp_path, with_data_descriptors=False)
+
+    def test_source_with_data_descriptors(self, tmp_path):
+        self._check(tmp_path, with_data_descriptors=True)
@@ -0,0 +1,76 @@
+from io import BytesIO
+
+from docx import Document
+from docx.oxml.ns import qn
+
+from services.analysis.docx_run_splitter import DocxRunSplitter
+
+
+class TestDocxRunSplitter:
+    @staticmethod
+    def _paragraph():
+        document = Document()
+        paragraph = document.add_paragraph()
+        paragraph.add_run('Привет, ')
+        paragraph.add_run('большой').bold = True
+        paragraph.add_run(' мир')
+        paragraph.runs[2].add_tab()
+        paragraph.add_run('конец')
+
+        return document, paragraph
+
+    @staticmethod
+    def _fill(run):
+        shd = run.rPr.find(qn('w:shd')) if run.rPr is not None else None
+
+        return shd.get(qn('w:fill')) if shd is not None else None
+
+    def test_split_keeps_text_and_shades_ranges(self):
+        document, paragraph = self._paragraph()
+        text = paragraph.text
+        splitter = DocxRunSplitter([run._r for run in paragraph.runs])
+        # crosses runs, ends inside the bold one; the second overlaps it
+        first = splitter.add([(4, 11)], 'AAAAAA')
+        second = splitter.add([(9, 17), (20, 23)], 'BBBBBB')
+
+        highlight_runs = splitter.apply()
+
+        assert paragraph.text == text
+        assert ''.join(run.text for run in highlight_runs[first]) == text[4:11]
+        assert ''.join(run.text for run in highlight_runs[second]) == text[9:17] + text[20:23]
+        # overlap is filled by the highlight added last, run properties are kept
+        assert [(run.text, self._fill(run._r), run.bold) for run in paragraph.runs] == [
+            ('Прив', None, None),
+            ('ет, ', 'AAAAAA', None),
+            ('б', 'AAAAAA', True),
+            ('ол', 'BBBBBB', True),
+            ('ьшой', 'BBBBBB', True),
+            (' м', 'BBBBBB', None),
+            ('ир\t', None, None),
+            ('кон', 'BBBBBB', None),
+            ('ец', None, None),
+        ]
+
+    def test_whole_run_is_shaded_in_place(self):
+        document, paragraph = self._paragraph()
+        bold_run = paragraph.runs[1]._r
+        splitter = DocxRunSplitter([run._r for run in paragraph.runs])
+        splitter.add([(8, 15)], 'CCCCCC')
+
+        assert splitter.apply() == [[bold_run]]
+        assert len(paragraph.runs) == 4
+        assert self._fill(bold_run) == 'CCCCCC'
+
+    def test_round_trip(self):
+        document, paragraph = self._paragraph()
+        text = paragraph.text
+        splitter = DocxRunSplitter([run._r for run in paragraph.runs])
+        splitter.add([(2, 20)], 'DDDDDD')
+        splitter.apply()
+        stream = BytesIO()
+
+        document.save(stream)
+        reopened = Document(BytesIO(stream.getvalue())).paragraphs[0]
+
+        assert reopened.text == text
+        assert [self._fill(run._r) for run in reopened.runs] == [self._fill(run._r) for run in paragraph.runs]
@@ -0,0 +1,69 @@
+from io import BytesIO
+
+from docx import Document
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+
+from services.analysis.docx_text_extractor import DocxTextExtractor
+
+
+class TestDocxTextExtractor:
+    @staticmethod
+    def _document():
+        document = Document()
+        document.add_paragraph('начало')
+        table = document.add_table(rows=2, cols=2)
+        table.cell(0, 0).text = 'a1'
+        table.cell(0, 1).text = 'b1'
+        merged = table.cell(1, 0).merge(table.cell(1, 1))
+        merged.text = 'объединённая'
+        nested = table.cell(0, 1).add_table(rows=1, cols=1)
+        nested.cell(0, 0).text = 'вложенная'
+        paragraph = document.add_paragraph('ссылка: ')
+        paragraph._p.append(parse_xml(
+            f'<w:hyperlink {nsdecls("w", "r")} r:id="rId99"><w:r><w:t>пример</w:t></w:r></w:hyperlink>'
+        ))
+        document.element.body.insert(len(document.element.body) - 1, parse_xml(
+            f'<w:sdt {nsdecls("w")}><w:sdtContent><w:p><w:r><w:t>поле</w:t></w:r></w:p></w:sdtContent></w:sdt>'
+        ))
+        document.add_paragraph('')
+
+        return document
+
+    @staticmethod
+    def _paragraphs(document) -> list:
+        extractor = DocxTextExtractor(document.element.body)
+
+        return [(paragraph.path, ''.join(r.text for r in paragraph.element.r_lst)) for paragraph in extractor.paragraphs]
+
+    def test_reading_order_and_paths(self):
+        assert self._paragraphs(self._document()) == [
+            ('body/p[0]', 'начало'),
+            ('body/tbl[0]/tr[0]/tc[0]/p[0]', 'a1'),
+            ('body/tbl[0]/tr[0]/tc[1]/p[0]', 'b1'),
+            ('body/tbl[0]/tr[0]/tc[1]/tbl[0]/tr[0]/tc[0]/p[0]', 'вложенная'),
+            ('body/tbl[0]/tr[0]/tc[1]/p[1]', ''),
+            ('body/tbl[0]/tr[1]/tc[0]/p[0]', 'объединённая'),
+            ('body/p[1]', 'ссылка: '),
+            ('body/sdt[0]/sdtContent/p[0]', 'поле'),
+            ('body/p[2]', ''),
+        ]
+
+    def test_segments_and_text(self):
+        extractor = DocxTextExtractor(self._document().element.body)
+        segments = extractor.segments()
+
+        assert [segment.text for segment in segments] == [
+            'начало', 'a1', 'b1', 'вложенная', 'объединённая', 'ссылка: ', 'пример', 'поле',
+        ]
+        assert extractor.text == DocxTextExtractor.SEGMENT_SEPARATOR.join(segment.text for segment in segments)
+        assert all(extractor.text[s.start:s.start + len(s.text)] == s.text for s in segments)
+        # hyperlink runs are a segment of their paragraph
+        assert segments[6].paragraph is segments[5].paragraph
+
+    def test_paths_survive_round_trip(self):
+        document = self._document()
+        stream = BytesIO()
+        document.save(stream)
+
+        assert self._paragraphs(Document(BytesIO(stream.getvalue()))) == self._paragraphs(document)
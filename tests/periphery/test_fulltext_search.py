@@ -1,5 +1,7 @@
 from services.fulltext_search.fulltext_search import FulltextSearch
-from services.tokenization import TokenType, Tokenizer
+from services.fulltext_search.phrase_automaton import PhraseAutomaton
+from services.fulltext_search.strategies.fuzzy_words_punct import FuzzyWordsPunctStrategy
+from services.tokenization import Token, TokenDictionary, TokenType, Tokenizer
 
 
 class TestFulltextSearch:
@@ -261,8 +263,8 @@ class TestFulltextSearch:
             'expected_indices': [(0, 2), (4, 6)]
         },
         {
-            'source': 'машина едет быстро',
-            'search': 'машины едут',
+            'source': 'красная машина едет',
+            'search': 'красные машины',
             'expected_matches': 1,
             'expected_indices': [(0, 2)]
         },
@@ -298,8 +300,57 @@ class TestFulltextSearch:
         }
     ]
 
+    def test_search_token_sequences(self):
+        for i, test_case in enumerate(self.test_cases_search_token_sequences):
+            source_tokens = Tokenizer(None).tokenize_text(test_case['source'])
+            search_tokens = Tokenizer(None).tokenize_text(test_case['search'])
+            search_words = [t for t in search_tokens if t.type == TokenType.WORD]
+
+            occurrences = PhraseAutomaton().add_phrase(0, search_words).scan(source_tokens)
+            indices = [(start, end) for _, start, end in occurrences]
+
+            assert len(indices) == test_case['expected_matches'], (
+                f"Test case {i + 1} failed:\n"
+                f"  Source: '{test_case['source']}'\n"
+                f"  Search: '{test_case['search']}'\n"
+                f"  Expected matches: {test_case['expected_matches']}\n"
+                f"  Got: {indices}"
+            )
+            assert indices == test_case['expected_indices'], (
+                f"Test case {i + 1} failed:\n"
+                f"  Expected indices: {test_case['expected_indices']}\n"
+                f"  Got: {indices}"
+            )
+
+    def test_search_matches_equal_text_with_other_lemma(self):
+        # phrase lemmas from another lemmatizer state, e.g. a fallback without wordnet
+        phrase_tokens = [
+            Token('red', 0, 3, TokenType.WORD, lemma='red', stem='red'),
+            Token(' ', 3, 4, TokenType.SPACE),
+            Token('tests', 4, 9, TokenType.WORD, lemma='tests', stem='test'),
+        ]
+
+        # few words: automaton scan; many filler words: anchored verification
+        for fillers_count in (0, 20):
+            source_text = 'red tests' + ' x' * fillers_count
+            source_tokens = Tokenizer(None).tokenize_text(source_text)
+
+            for token in source_tokens:
+                if token.text == 'tests':
+                    token.lemma, token.stem = 'test', 'test'
+
+            results = FuzzyWordsPunctStrategy().search_all_phrases(
+                source_tokens,
+                [('red tests', phrase_tokens)],
+                dictionary=TokenDictionary(source_tokens),
+            )
+            indices = [(match.start_token_idx, match.end_token_idx) for _, matches in results for match in matches]
+
+            assert indices == [(0, 2)], f"fillers {fillers_count}: got {indices}"
+
 if __name__ == '__main__':
     test_instance = TestFulltextSearch()
     test_instance.test_compare_token_sequences()
     test_instance.test_tokenize_text()
+    test_instance.test_search_token_sequences()
     print("All tests passed!")
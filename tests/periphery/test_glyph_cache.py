@@ -0,0 +1,31 @@
+import redis
+
+from services.analysis.pdf import glyph_cache as glyph_cache_module
+from services.analysis.pdf.glyph_cache import GlyphCache
+
+
+class FailingRedis:
+    def __init__(self) -> None:
+        self.calls: int = 0
+
+    def mget(self, keys):
+        self.calls += 1
+        raise redis.ConnectionError('down')
+
+
+class TestGlyphCache:
+    def test_retries_after_cooldown(self, monkeypatch):
+        connection = FailingRedis()
+        now = [100.0]
+        monkeypatch.setattr(glyph_cache_module, 'get_redis_connection', lambda **kwargs: connection)
+        monkeypatch.setattr(glyph_cache_module.time, 'monotonic', lambda: now[0])
+        cache = GlyphCache()
+
+        assert cache.get_many(['font:1x1:a']) == {}
+        assert cache.get_many(['font:1x1:a']) == {}
+        assert connection.calls == 1
+
+        now[0] += GlyphCache.RETRY_AFTER + 1
+
+        assert cache.get_many(['font:1x1:a']) == {}
+        assert connection.calls == 2
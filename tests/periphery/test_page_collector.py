@@ -0,0 +1,47 @@
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT_DIR: Path = Path(__file__).resolve().parents[2]
+SOURCE_PDF: Path = ROOT_DIR / 'tests' / 'pdf' / 'correctness' / '2-pages' / 'data' / 'source.pdf'
+
+# parallel collect must give the pages of a serial one
+COLLECT_SCRIPT: str = f'''
+import pymupdf
+from services.analysis.pdf.page_collector import PageCollector
+from services.analysis.pdf.pua_map import PuaMap
+
+def collect(workers):
+    import os
+    os.environ[PageCollector.WORKERS_ENV] = str(workers)
+    with pymupdf.open({str(SOURCE_PDF)!r}) as document:
+        collector = PageCollector(document, {str(SOURCE_PDF)!r}, PuaMap(), (0.0, 1.0, 0.0))
+        return [page.to_text() for page in collector.iter_pages(list(range(len(document))))]
+
+if __name__ == '__main__':
+    PageCollector.PARALLEL_MIN_PAGES = 1
+    PageCollector.CHUNK_PAGES = 1
+    serial = collect(1)
+    assert serial and any(serial)
+    assert collect(2) == serial
+    print('ok')
+'''
+
+
+class TestPageCollector:
+    def test_parallel_collect_in_c_locale(self, tmp_path, clean_locale_env):
+        script: Path = tmp_path / 'collect.py'
+        script.write_text(COLLECT_SCRIPT, encoding='utf-8')
+
+        completed = subprocess.run(
+            [sys.executable, str(script)],
+            cwd=ROOT_DIR,
+            env=clean_locale_env,
+            capture_output=True,
+            text=True,
+            encoding='utf-8',
+            timeout=300,
+        )
+
+        assert completed.returncode == 0, completed.stderr[-2000:]
+        assert completed.stdout.strip().endswith('ok')
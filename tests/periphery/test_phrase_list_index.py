@@ -0,0 +1,102 @@
+from typing import List
+
+from services import pymorphy_service
+from services.enum import WordsListKey
+from services.fulltext_search.phrase import EType, Phrase
+from services.words_list import WordsList
+from services.words_list.phrase_list_index import PhraseListIndex
+
+
+class IndexedList(WordsList):
+    key = WordsListKey.CUSTOM
+
+    def __init__(self) -> None:
+        self.attached: List[Phrase] = []
+
+    def count_phrases(self) -> int:
+        return 0
+
+    def attach_models(self, phrases: List[Phrase]) -> None:
+        self.attached.extend(phrases)
+
+
+class TestPhraseListIndex:
+    def _setup(self, monkeypatch, tmp_path) -> None:
+        monkeypatch.setenv(PhraseListIndex.DIR_ENV, str(tmp_path))
+        monkeypatch.setattr(PhraseListIndex, '_loaded', {})
+        monkeypatch.setattr(pymorphy_service, 'models_fingerprint', lambda: 'fp')
+
+    def test_round_trip(self, monkeypatch, tmp_path):
+        self._setup(monkeypatch, tmp_path)
+        words_list = IndexedList()
+        built = [
+            Phrase('машины едут', words_list, None, EType.TEXT, model_id=7),
+            Phrase('кот', words_list, 'Кот', EType.TEXT),
+        ]
+
+        first = PhraseListIndex(words_list).load(lambda: built)
+        # records of this process are dropped, so the second load reads the file
+        PhraseListIndex._loaded.clear()
+        second = PhraseListIndex(words_list).load(lambda: [])
+
+        for phrases in (first, second):
+            assert [p.phrase for p in phrases] == ['машины едут', 'кот']
+            assert [p.phrase_original for p in phrases] == [None, 'Кот']
+            assert [p.model_id for p in phrases] == [7, None]
+            assert [[(t.text, t.lemma, t.stem) for t in p.tokens] for p in phrases] == \
+                [[(t.text, t.lemma, t.stem) for t in p.tokens] for p in built]
+
+    def test_model_loaded_on_access(self, monkeypatch, tmp_path):
+        self._setup(monkeypatch, tmp_path)
+        words_list = IndexedList()
+        phrase = PhraseListIndex(words_list).load(
+            lambda: [Phrase('кот', words_list, None, EType.TEXT, model_id=7)],
+        )[0]
+
+        assert words_list.attached == []
+        assert phrase.model is None
+        assert words_list.attached == [phrase]
+
+    def test_invalidate_rebuilds(self, monkeypatch, tmp_path):
+        self._setup(monkeypatch, tmp_path)
+        words_list = IndexedList()
+        PhraseListIndex(words_list).load(lambda: [Phrase('кот', words_list, None, EType.TEXT)])
+        version = PhraseListIndex.read_version(words_list.key)
+
+        PhraseListIndex.invalidate(words_list.key)
+
+        assert PhraseListIndex.read_version(words_list.key) != version
+        assert list(tmp_path.glob('*.pickle')) == []
+        phrases = PhraseListIndex(words_list).load(lambda: [Phrase('собака', words_list, None, EType.TEXT)])
+        assert [p.phrase for p in phrases] == ['собака']
+
+    def test_models_fingerprint_keys_index(self, monkeypatch, tmp_path):
+        self._setup(monkeypatch, tmp_path)
+        words_list = IndexedList()
+        PhraseListIndex(words_list).load(lambda: [Phrase('кот', words_list, None, EType.TEXT)])
+
+        monkeypatch.setattr(pymorphy_service, 'models_fingerprint', lambda: 'other')
+        phrases = PhraseListIndex(words_list).load(lambda: [Phrase('собака', words_list, None, EType.TEXT)])
+
+        assert [p.phrase for p in phrases] == ['собака']
+        assert len(list(tmp_path.glob('*.pickle'))) == 2
+
+    def test_not_written_without_models(self, monkeypatch, tmp_path):
+        self._setup(monkeypatch, tmp_path)
+        monkeypatch.setattr(pymorphy_service, 'models_fingerprint', lambda: None)
+        words_list = IndexedList()
+
+        phrases = PhraseListIndex(words_list).load(lambda: [Phrase('кот', words_list, None, EType.TEXT)])
+
+        assert [p.phrase for p in phrases] == ['кот']
+        assert list(tmp_path.glob('*.pickle')) == []
+
+    def test_invalidate_versions_are_unique(self, monkeypatch, tmp_path):
+        self._setup(monkeypatch, tmp_path)
+        versions = set()
+
+        for _ in range(5):
+            PhraseListIndex.invalidate(WordsListKey.CUSTOM)
+            versions.add(PhraseListIndex.read_version(WordsListKey.CUSTOM))
+
+        assert len(versions) == 5
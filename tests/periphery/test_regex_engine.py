@@ -0,0 +1,54 @@
+import random
+import re
+
+from services.fulltext_search.regex_engine import RegexEngine
+from services.utils.regex_pattern import RegexPattern
+from services.words_list.list_profanity import ListProfanity
+
+
+class TestRegexEngine:
+    extra_patterns = {
+        'lookbehind': r'(?<=\s)хуй\w*',
+        'end': r'хуй$',
+        'boundary': r'\bхер\b',
+        'multiline': r'(?m)^хер',
+        'class_repeat': r'хе[рp]+',
+        'backreference': r'(хер)\1',
+        'word_chars': r'х\w*р',
+        'non_boundary': r'\Bхер',
+        'ignorecase': r'(?i)ХЕР',
+        'spaces': r'х\s+у\s+й',
+    }
+    alphabet = list('хуйерпиздаеоx yнёб.,\n\t-') + ['хуй', 'хер', 'пизд', 'ёб', 'пидор', ' по', 'при']
+
+    def _patterns(self, source_list=None) -> list:
+        # without __init__: list color is read from DB there
+        profanity_list = ListProfanity.__new__(ListProfanity)
+        patterns = {**profanity_list.patterns(), **self.extra_patterns}
+
+        return [RegexPattern(name, pattern, source_list) for name, pattern in patterns.items()]
+
+    def test_search_equals_finditer(self):
+        regex_patterns = self._patterns()
+        regex_engine = RegexEngine(regex_patterns)
+        rng = random.Random(0)
+
+        for _ in range(2000):
+            text = ''.join(rng.choice(self.alphabet) for _ in range(rng.randint(0, 60)))
+            expected = [
+                (regex_pattern.pattern_name, match.start(), match.end())
+                for regex_pattern in regex_patterns
+                for match in re.compile(regex_pattern.pattern).finditer(text)
+            ]
+            got = [(regex_pattern.pattern_name, start, end) for regex_pattern, start, end in regex_engine.search(text)]
+
+            assert got == expected, repr(text)
+
+    def test_plans_are_cached_per_list(self):
+        large_list = [RegexPattern(f'p{i}', f'слово{i}', 'large') for i in range(300)]
+        small_list = self._patterns('small')
+
+        plans = RegexEngine(large_list + small_list)._plans
+
+        assert RegexEngine(small_list + large_list)._plans == plans[len(large_list):] + plans[:len(large_list)]
+        assert RegexEngine(large_list[:-1])._plans[0] is not plans[0]
@@ -0,0 +1,79 @@
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+from services.fulltext_search.fulltext_search import FulltextSearch
+from services.fulltext_search.phrase import EType, Phrase
+from services.fulltext_search.sharded_search import ShardedSearch
+from services.tokenization import Tokenizer
+
+
+class SearchedList:
+    search_text = True
+    search_surnames = True
+    search_full_names = True
+
+
+class TestShardedSearch:
+    source_text = ' '.join([
+        'Рыночная экономика России в эти годы менялась.',
+        'Иванову Петру Сергеевичу вручили премию, а Кара-Мурза выступил с докладом.',
+        'Цены росли, экономики соседей тоже; Петров и Иванов спорили о системе.',
+    ] * 40)
+    phrases = [
+        ('рыночная экономика', EType.TEXT),
+        ('в эти годы', EType.TEXT),
+        ('экономики', EType.TEXT),
+        ('система', EType.TEXT),
+        ('Иванов', EType.SURNAME),
+        ('Кара-Мурза', EType.SURNAME),
+        ('Петров', EType.SURNAME),
+        ('Иванов Петр Сергеевич', EType.FULL_NAME),
+    ]
+
+    def _search(self) -> list:
+        source_list = SearchedList()
+        search_phrases = [Phrase(text, source_list, phrase_type=phrase_type) for text, phrase_type in self.phrases]
+        fulltext_search = FulltextSearch(Tokenizer(None).tokenize_stream(self.source_text))
+        results = fulltext_search.search_all([(phrase, phrase.tokens) for phrase in search_phrases])
+        check_groups = defaultdict(set)
+
+        for phrase, matches in results:
+            for match in matches:
+                check_groups[match.check_id].add((phrase.phrase, match.start_token_idx, match.end_token_idx))
+
+        return [
+            (phrase.phrase, [(match.start_token_idx, match.end_token_idx) for match in matches])
+            for phrase, matches in results
+        ] + [sorted(sorted(group) for group in check_groups.values())]
+
+    def test_sharded_equals_serial(self, monkeypatch):
+        monkeypatch.setenv(ShardedSearch.WORKERS_ENV, '1')
+        serial = self._search()
+
+        assert sum(len(matches) for _, matches in serial[:-1]) > 0
+        monkeypatch.setattr(ShardedSearch, 'SHARD_MIN_WORDS', 10)
+
+        # shard bounds move with the count, some of them cut multi-word phrases
+        for workers_count in (2, 3, 5, 7, 11):
+            monkeypatch.setenv(ShardedSearch.WORKERS_ENV, str(workers_count))
+
+            assert self._search() == serial, f"{workers_count} shards"
+
+    def test_sharded_in_c_locale(self, clean_locale_env):
+        # shard workers are spawned; without locale settings they must not re-execute themselves
+        completed = subprocess.run(
+            [
+                sys.executable, '-m', 'pytest', '-q', '-p', 'no:cacheprovider',
+                f'{__file__}::TestShardedSearch::test_sharded_equals_serial',
+            ],
+            cwd=Path(__file__).resolve().parents[2],
+            env=clean_locale_env,
+            capture_output=True,
+            text=True,
+            encoding='utf-8',
+            timeout=600,
+        )
+
+        assert completed.returncode == 0, completed.stdout[-2000:]